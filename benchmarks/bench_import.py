@@ -0,0 +1,61 @@
+"""Benchmark do tempo de importação dos módulos do `mrlab`.
+
+Cada módulo é importado num processo novo com `python -X importtime`; vale o
+menor tempo acumulado entre as repetições. O script termina com erro se algum
+módulo passar do orçamento em `BUDGETS_MS` ou carregar uma dependência pesada
+(numpy, scipy, yaml, pandas) já na importação.
+
+    PYTHONPATH=. python benchmarks/bench_import.py [repeat]
+"""
+import re
+import subprocess
+import sys
+
+# orçamento em milissegundos; inclui a importação da biblioteca padrão
+BUDGETS_MS = {
+    'mrlab' : 100,
+    'mrlab.params' : 100,
+    'mrlab.search' : 120,
+    'mrlab.sweep' : 150,
+    'mrlab.understand' : 150,
+    'mrlab.metrics' : 120,
+    'mrlab.envinfo' : 120,
+    'mrlab.scheduler' : 120,
+}
+
+HEAVY_MODULES = ('numpy', 'scipy', 'yaml', 'pandas')
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+def import_time(module):
+    """Tempo acumulado (ms) da importação de `module` e os módulos pesados carregados."""
+    code = f'import sys, {module}; print(",".join(sys.modules))'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=True,
+    )
+    total = None
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match and not match.group(3) and match.group(4) == module:
+            total = int(match.group(2)) / 1000
+    loaded = set(result.stdout.strip().split(','))
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    return total, heavy
+
+def main(repeat=5):
+    failed = False
+    print(f'{"module":<20} {"best (ms)":>10} {"budget":>8}  heavy')
+    for module, budget in BUDGETS_MS.items():
+        runs = [import_time(module) for _ in range(repeat)]
+        best = min(total for total, _ in runs)
+        heavy = runs[-1][1]
+        over = best > budget or heavy
+        failed = failed or over
+        print(f'{module:<20} {best:>10.1f} {budget:>8}  {",".join(heavy) or "-"}{"  <-- FAIL" if over else ""}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sys.exit(main(repeat))
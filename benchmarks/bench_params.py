@@ -0,0 +1,75 @@
+"""Benchmark de `BaseParams.update`.
+
+Compara o caminho atual com a implementação antiga (`asdict` + checagem dos
+nomes a cada chamada) em uma classe com campos de lista, como nas buscas com
+`GridSearch(initial=...)`. Os dois caminhos copiam as listas: a comparação
+é entre cópias equivalentes, não contra uma cópia rasa que compartilha dados.
+
+    PYTHONPATH=. python benchmarks/bench_params.py [n_calls]
+"""
+import sys
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import List
+from mrlab.params import BaseParams, SlotsParams
+
+@dataclass
+class Params(BaseParams):
+    lr: float = 1e-3
+    batch_size: int = 32
+    optimizer_name: str = 'AdamW'
+    penalization_weights: List[float] = field(default_factory=lambda: [0.1, 0.3, 0.5])
+    layers: List[int] = field(default_factory=lambda: [512, 256, 128, 64])
+    logging_steps: str = 'steps'
+    outputdir: str = 'results'
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+@dataclass(slots=True)
+class SlottedParams(SlotsParams):
+    lr: float = 1e-3
+    batch_size: int = 32
+    optimizer_name: str = 'AdamW'
+    penalization_weights: List[float] = field(default_factory=lambda: [0.1, 0.3, 0.5])
+    layers: List[int] = field(default_factory=lambda: [512, 256, 128, 64])
+    logging_steps: str = 'steps'
+    outputdir: str = 'results'
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def legacy_update(params, **kwargs):
+    valid_fields = {f.name for f in fields(params)}
+    invalid_args = set(kwargs) - valid_fields
+    if invalid_args:
+        raise TypeError(invalid_args)
+    base_dict = asdict(params)
+    del base_dict['_hash_id']
+    base_dict.update(kwargs)
+    return params.__class__(**base_dict)
+
+def timeit(func, params, n_calls, repeat=3):
+    # melhor de `repeat` rodadas, cada uma com 1/repeat das chamadas
+    best = float('inf')
+    n_round = max(n_calls // repeat, 1)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(n_round):
+            func(params, lr=i)
+        best = min(best, time.perf_counter() - start)
+    return best * n_calls / n_round
+
+def main(n_calls=1_000_000):
+    results = {
+        'legacy' : timeit(legacy_update, Params(), n_calls),
+        'update' : timeit(Params.update, Params(), n_calls),
+        'update (slots)' : timeit(SlottedParams.update, SlottedParams(), n_calls),
+    }
+    for name, elapsed in results.items():
+        print(f"{name:>16}: {elapsed:8.3f}s  {n_calls / elapsed:12,.0f} calls/s  "
+              f"x{results['legacy'] / elapsed:.1f}")
+    return results
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
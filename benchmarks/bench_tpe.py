@@ -0,0 +1,64 @@
+"""Benchmark do `TPESearch` contra o `RandomSearch` em objetivos sintéticos.
+
+Para cada objetivo e semente conta quantos trials cada busca precisa até
+chegar a um valor alvo (limitado a `budget`). Os trials são pedidos em lotes
+de `batch` para simular workers em paralelo.
+
+    PYTHONPATH=. python benchmarks/bench_tpe.py [n_seeds]
+"""
+import math
+import sys
+import numpy as np
+from scipy import stats
+from mrlab.search import RandomSearch
+from mrlab.tpe import TPESearch
+
+def quadratic(p):
+    # ótimo em lr = 1e-3, dropout = 0.2, optimizer = 'adamw'
+    penalty = {'adamw' : 0.0, 'adam' : 0.3, 'sgd' : 1.0, 'rmsprop' : 0.6}[p['optimizer']]
+    return (math.log10(p['lr']) + 3) ** 2 + 4 * (p['dropout'] - 0.2) ** 2 + penalty
+
+def branin(p):
+    x, y = p['x'], p['y']
+    a, b, c, r, s, t = 1, 5.1 / (4 * math.pi ** 2), 5 / math.pi, 6, 10, 1 / (8 * math.pi)
+    return a * (y - b * x ** 2 + c * x - r) ** 2 + s * (1 - t) * math.cos(x) + s
+
+OBJECTIVES = {
+    'quadratic' : (quadratic, {
+        'lr' : stats.loguniform(1e-6, 1e-1),
+        'dropout' : stats.uniform(0, 0.8),
+        'optimizer' : ['adamw', 'adam', 'sgd', 'rmsprop'],
+    }, 0.05),
+    'branin' : (branin, {'x' : stats.uniform(-5, 15), 'y' : stats.uniform(0, 15)}, 0.5),
+}
+
+def trials_to_target(make_search, objective, target, budget, batch):
+    search = make_search()
+    for n in range(0, budget, batch):
+        if isinstance(search, TPESearch):
+            proposals = search.ask(batch)
+        else:
+            proposals = [next(search) for _ in range(batch)]
+        for i, params in enumerate(proposals):
+            value = objective(params)
+            if isinstance(search, TPESearch):
+                search.tell(params, value)
+            if value <= target:
+                return n + i + 1
+    return budget
+
+def main(n_seeds=20, budget=300, batch=4):
+    print(f'{"objective":<12} {"search":<8} {"median":>7} {"mean":>7} {"reached":>8}')
+    for name, (objective, values, target) in OBJECTIVES.items():
+        searches = {
+            'random' : lambda seed: RandomSearch(budget, values, seed=seed),
+            'tpe' : lambda seed: TPESearch(budget, values, seed=seed),
+        }
+        for label, make in searches.items():
+            counts = [trials_to_target(lambda: make(seed), objective, target, budget, batch) for seed in range(n_seeds)]
+            reached = sum(c < budget for c in counts)
+            print(f'{name:<12} {label:<8} {np.median(counts):>7.0f} {np.mean(counts):>7.1f} {reached:>5}/{n_seeds}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,245 @@
+"""Benchmarks dos caminhos quentes do `mrlab`.
+
+Cada benchmark roda num tamanho realista, mede a vazão (itens por segundo,
+melhor de `--repeat` rodadas de pelo menos 0,2 s) e o pico de memória
+alocada (tracemalloc, numa rodada à parte) e é comparado com
+`baselines.json`. O script termina com erro se a vazão cair mais que
+`--threshold` em relação à referência.
+
+    PYTHONPATH=. python benchmarks/run_benchmarks.py                # compara
+    PYTHONPATH=. python benchmarks/run_benchmarks.py --save         # grava referência
+    PYTHONPATH=. python benchmarks/run_benchmarks.py -k hash --scale full
+
+As referências dependem da máquina: grave as suas antes de comparar.
+"""
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+from mrlab.params import BaseParams
+
+BASELINES = Path(__file__).with_name('baselines.json')
+
+# tamanhos por escala: 'quick' para o dia a dia, 'full' para os tamanhos reais de uma varredura
+SCALES = {
+    'quick' : {'params' : 10_000, 'folders' : 1_000, 'grid' : 100_000},
+    'full' : {'params' : 1_000_000, 'folders' : 10_000, 'grid' : 1_000_000},
+}
+
+@dataclass
+class WideParams(BaseParams):
+    lr: float = 1e-3
+    batch_size: int = 32
+    optimizer_name: str = 'AdamW'
+    weight_decay: float = 0.01
+    warmup_steps: int = 500
+    max_steps: int = 10_000
+    dropout: float = 0.1
+    hidden_sizes: List[int] = field(default_factory=lambda: [1024, 512, 256, 128])
+    penalization_weights: List[float] = field(default_factory=lambda: [0.1, 0.3, 0.5])
+    augmentations: List[str] = field(default_factory=lambda: ['flip', 'crop', 'jitter'])
+    scheduler: str = 'cosine'
+    seed: int = 0
+    outputdir: str = 'results'
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+
+BENCHMARKS = dict()
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+# Cada benchmark recebe os tamanhos e uma pasta temporária (apagada no fim da
+# medição) e devolve (função a medir, número de itens). A preparação fica fora
+# da medição.
+
+@benchmark
+def grid_iteration(sizes, tmp):
+    from mrlab.search import GridSearch
+    n = sizes['grid']
+    values = {'lr' : [10 ** -i for i in range(10)], 'seed' : list(range(n // 10))}
+    def run():
+        for _ in GridSearch(values):
+            pass
+    return run, n
+
+@benchmark
+def grid_iteration_with_initial(sizes, tmp):
+    from mrlab.search import GridSearch
+    n = sizes['params'] // 10
+    values = {'lr' : [10 ** -i for i in range(10)], 'seed' : list(range(n // 10))}
+    initial = WideParams()
+    def run():
+        for _ in GridSearch(values, initial=initial):
+            pass
+    return run, n
+
+@benchmark
+def random_search_next(sizes, tmp):
+    from scipy import stats
+    from mrlab.search import RandomSearch
+    n = sizes['params'] // 10
+    values = {'lr' : stats.loguniform(1e-5, 1e-1), 'optimizer_name' : ['AdamW', 'SGD'], 'batch_size' : [16, 32, 64]}
+    def run():
+        for _ in RandomSearch(n, values, seed=0):
+            pass
+    return run, n
+
+@benchmark
+def random_search_batch(sizes, tmp):
+    from scipy import stats
+    from mrlab.search import RandomSearch
+    n = sizes['params']
+    values = {'lr' : stats.loguniform(1e-5, 1e-1), 'optimizer_name' : ['AdamW', 'SGD'], 'batch_size' : [16, 32, 64]}
+    def run():
+        RandomSearch(n, values, seed=0).sample_batch()
+    return run, n
+
+@benchmark
+def params_update(sizes, tmp):
+    n = sizes['params']
+    params = WideParams()
+    def run():
+        update = params.update
+        for i in range(n):
+            update(seed=i)
+    return run, n
+
+@benchmark
+def make_hash_id(sizes, tmp):
+    n = sizes['params'] // 10
+    items = [WideParams(seed=i) for i in range(n)]
+    def run():
+        for params in items:
+            params.make_hash_id()
+    return run, n
+
+def _folders(tmp, n):
+    return [WideParams(seed=i, outputdir=tmp) for i in range(n)]
+
+@benchmark
+def get_default_folder(sizes, tmp):
+    items = _folders(tmp, sizes['folders'])
+    for params in items:
+        params.get_default_folder()
+    def run():
+        # pastas já existentes: o caso comum ao retomar uma varredura
+        for params in items:
+            params.get_default_folder()
+    return run, len(items)
+
+@benchmark
+def to_yaml(sizes, tmp):
+    items = _folders(tmp, sizes['folders'])
+    def run():
+        for params in items:
+            params.to_yaml()
+    return run, len(items)
+
+@benchmark
+def from_yaml(sizes, tmp):
+    paths = [params.to_yaml() for params in _folders(tmp, sizes['folders'])]
+    def run():
+        for path in paths:
+            WideParams.from_yaml(path)
+    return run, len(paths)
+
+@benchmark
+def load_many(sizes, tmp):
+    from mrlab import understand
+    paths = [params.to_yaml() for params in _folders(tmp, sizes['folders'])]
+    def run():
+        understand._CONFIG_CACHE.clear()
+        understand.load_many(paths, params_cls=WideParams)
+    return run, len(paths)
+
+@benchmark
+def env_report(sizes, tmp):
+    from mrlab.envinfo import env_report as report
+    report(dest=tmp)
+    n = 20
+    def run():
+        for _ in range(n):
+            report(dest=tmp)
+    return run, n
+
+
+# -------------------------
+# Medição
+# -------------------------
+def measure(name, sizes, repeat, min_time=0.2):
+    with tempfile.TemporaryDirectory(prefix='mrlab-bench-') as tmp:
+        return _measure(BENCHMARKS[name], sizes, tmp, repeat, min_time)
+
+def _measure(setup, sizes, tmp, repeat, min_time):
+    run, n_items = setup(sizes, tmp)
+    start = time.perf_counter()
+    run()
+    # rodadas curtas demais oscilam muito: cada rodada repete `run` até `min_time`
+    loops = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, (time.perf_counter() - start) / loops)
+    # memória numa rodada separada: o tracemalloc deixa o código bem mais lento
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'items' : n_items, 'seconds' : best, 'throughput' : n_items / best, 'peak_mb' : peak / 2 ** 20}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='pattern', default='', help='run only benchmarks whose name contains this')
+    parser.add_argument('--scale', choices=SCALES, default='quick')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed throughput drop (fraction)')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baselines')
+    args = parser.parse_args(argv)
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else dict()
+    scale_baselines = baselines.setdefault(args.scale, dict())
+    failed = []
+    print(f'{"benchmark":<28} {"items":>9} {"items/s":>12} {"baseline":>12} {"change":>8} {"peak MB":>9}')
+    for name in BENCHMARKS:
+        if args.pattern not in name:
+            continue
+        result = measure(name, SCALES[args.scale], args.repeat)
+        reference = scale_baselines.get(name)
+        change = ''
+        if reference is not None:
+            ratio = result['throughput'] / reference['throughput']
+            change = f'{ratio - 1:+.0%}'
+            if ratio < 1 - args.threshold:
+                failed.append(name)
+                change += ' FAIL'
+        print(
+            f'{name:<28} {result["items"]:>9} {result["throughput"]:>12.0f} '
+            f'{reference["throughput"] if reference else float("nan"):>12.0f} {change:>8} {result["peak_mb"]:>9.1f}'
+        )
+        if args.save:
+            scale_baselines[name] = result
+
+    if args.save:
+        BASELINES.write_text(json.dumps(baselines, indent=1, sort_keys=True) + '\n')
+    if failed and not args.save:
+        print(f'\nThroughput dropped more than {args.threshold:.0%} in: {", ".join(failed)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1 @@
-from .params import BaseParams
\ No newline at end of file
+from .params import BaseParams, SlotsParams
\ No newline at end of file
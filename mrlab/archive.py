@@ -0,0 +1,295 @@
+import io
+import os
+import shutil
+import struct
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
+from pathlib import Path, PurePosixPath
+
+PACKED_SUFFIX = '.zip'
+
+# -------------------------
+# Formato
+# -------------------------
+# Uma execução terminada `<pasta>/<hash_id>/` vira um único arquivo
+# `<pasta>/<hash_id>.zip`, sem compressão (ZIP_STORED). O diretório central do
+# zip é o índice: cada membro é lido direto pelo seu offset, sem extrair nada,
+# e arquivos binários (métricas `.mlog`, shards `.npy`) podem ser mapeados em
+# memória dentro do próprio zip. Um inode por execução em vez de dezenas.
+#
+# Os leitores continuam recebendo os caminhos de sempre
+# (`<pasta>/<hash_id>/metrics/metrics.mlog`): quando o arquivo não existe no
+# disco, o caminho é procurado no zip de uma das pastas acima dele.
+# Os escritores (métricas, predições, checkpoints, cache, status) levantam
+# `PackedRunError` numa execução empacotada: `unpack_run` antes de gravar.
+
+# cabeçalho local de um membro: assinatura ... tamanho do nome, tamanho do extra
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+FileStat = namedtuple('FileStat', ['st_mtime_ns', 'st_size'])
+
+class PackedRunError(OSError):
+    pass
+
+def packed_path(folder):
+    """Caminho do arquivo empacotado de uma pasta de execução."""
+    folder = Path(folder)
+    return folder.with_name(folder.name + PACKED_SUFFIX)
+
+def is_packed(folder):
+    return packed_path(folder).is_file()
+
+
+# -------------------------
+# Empacotar e desempacotar
+# -------------------------
+def _folder_of(folder_or_params):
+    if isinstance(folder_or_params, (str, os.PathLike)):
+        return Path(folder_or_params)
+    return Path(folder_or_params.get_default_folder(ensure_exists=False))
+
+def pack_run(folder_or_params, remove=True):
+    """Empacota a pasta de uma execução terminada em `<pasta>.zip`.
+
+    Os arquivos são gravados sem compressão, em ordem, e o zip só aparece no
+    lugar final (os.replace) depois de completo. Com `remove=True` a pasta
+    original é apagada em seguida.
+    """
+    folder = _folder_of(folder_or_params)
+    if not folder.is_dir():
+        raise FileNotFoundError(f'Run folder not found: {folder}')
+    target = packed_path(folder)
+    tmp = target.with_name(f'.{target.name}.{os.getpid()}.tmp')
+    with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            relative = Path(root).relative_to(folder)
+            if relative.parts and not files and not dirs:
+                # pastas vazias também contam (ex.: `checkpoints/` sem nada)
+                zf.write(root, relative.as_posix() + '/')
+            for name in sorted(files):
+                zf.write(os.path.join(root, name), (relative / name).as_posix())
+    os.replace(tmp, target)
+    _forget(target)
+    if remove:
+        shutil.rmtree(folder)
+    return target
+
+def unpack_run(folder_or_params, remove=True):
+    """Extrai uma execução empacotada de volta para a pasta (ex.: para continuar gravando nela)."""
+    folder = _folder_of(folder_or_params)
+    target = packed_path(folder)
+    with zipfile.ZipFile(target, 'r') as zf:
+        zf.extractall(folder)
+    _forget(target)
+    if remove:
+        target.unlink()
+    return folder
+
+def pack_runs(base, only_done=True, remove=True):
+    """Empacota as execuções abaixo de `base`; por padrão só as marcadas como terminadas.
+
+    Uma execução está terminada quando o `status.json` gravado pelo `sweep`
+    diz `done`. Devolve os caminhos dos arquivos criados.
+    """
+    import json
+    from .sweep import DONE, STATUS_FILENAME
+    from .understand import RunIndex
+
+    with RunIndex(base) as index:
+        index.refresh()
+        runs = index.runs()
+    packed = []
+    for run in runs:
+        if not run.path.is_dir():
+            continue
+        if only_done:
+            try:
+                with open(run.path / STATUS_FILENAME, 'r') as f:
+                    if json.load(f).get('state') != DONE:
+                        continue
+            except (FileNotFoundError, ValueError):
+                continue
+        packed.append(pack_run(run.path, remove=remove))
+    return packed
+
+
+# -------------------------
+# Acesso aleatório aos membros
+# -------------------------
+# zips abertos por caminho, do menos ao mais recente; reabertos quando o
+# arquivo muda (mtime ou tamanho). Só os `MAX_OPEN_ZIPS` mais recentes ficam
+# abertos: com milhares de execuções empacotadas os descritores acabariam.
+# Fechar um zip não invalida membros já abertos: o zipfile conta as referências
+# ao arquivo e só o fecha quando o último membro é fechado.
+MAX_OPEN_ZIPS = 64
+_ZIPS = OrderedDict()
+_ZIPS_LOCK = threading.Lock()
+
+def _forget(archive):
+    with _ZIPS_LOCK:
+        entry = _ZIPS.pop(os.fspath(archive), None)
+    if entry is not None:
+        entry[1].close()
+
+def _open_zip(archive):
+    archive = os.fspath(archive)
+    st = os.stat(archive)
+    key = (st.st_mtime_ns, st.st_size)
+    with _ZIPS_LOCK:
+        entry = _ZIPS.get(archive)
+        if entry is not None and entry[0] == key:
+            _ZIPS.move_to_end(archive)
+            return entry[1], entry[2]
+    # a leitura do diretório central fica fora do lock
+    opened = zipfile.ZipFile(archive, 'r')
+    closing = []
+    with _ZIPS_LOCK:
+        previous = _ZIPS.pop(archive, None)
+        if previous is not None:
+            closing.append(previous[1])
+        _ZIPS[archive] = (key, opened, st)
+        while len(_ZIPS) > MAX_OPEN_ZIPS:
+            closing.append(_ZIPS.popitem(last=False)[1][1])
+    for zf in closing:
+        zf.close()
+    return opened, st
+
+def writable_folder(folder):
+    """`folder`, se for possível gravar nele; numa execução empacotada levanta `PackedRunError`."""
+    if os.path.isdir(folder):
+        return folder
+    path = Path(os.path.abspath(folder))
+    for candidate in (path, *path.parents):
+        if not candidate.name:
+            break
+        archive = packed_path(candidate)
+        if archive.is_file():
+            raise PackedRunError(
+                f'Run {candidate} is packed in {archive}: unpack it first with mrlab.archive.unpack_run'
+            )
+    return folder
+
+def locate(path):
+    """(arquivo zip, nome do membro) de um caminho que está dentro de uma execução empacotada, ou None."""
+    path = Path(os.path.abspath(path))
+    for parent in path.parents:
+        if not parent.name:
+            break
+        archive = packed_path(parent)
+        if archive.is_file():
+            return archive, PurePosixPath(*path.relative_to(parent).parts).as_posix()
+    return None
+
+def _locate_member(path):
+    found = locate(path)
+    if found is None:
+        raise FileNotFoundError(f'No such file or directory: {os.fspath(path)!r}')
+    archive, member = found
+    zf, st = _open_zip(archive)
+    try:
+        return archive, zf, st, zf.getinfo(member)
+    except KeyError:
+        raise FileNotFoundError(f'No such file or directory: {os.fspath(path)!r}') from None
+
+def open_file(path, mode='r', newline=None):
+    """Como `open` para leitura, mas também abre arquivos de execuções empacotadas."""
+    if mode not in ('r', 'rb'):
+        raise ValueError(f"mode must be 'r' or 'rb': got {mode!r}")
+    try:
+        return open(path, mode, newline=newline)
+    except FileNotFoundError:
+        pass
+    for attempt in range(3):
+        _, zf, _, info = _locate_member(path)
+        try:
+            f = zf.open(info)
+            break
+        except ValueError:
+            # o zip saiu do cache (e foi fechado) entre a busca e a abertura
+            if attempt == 2:
+                raise
+    if mode == 'rb':
+        return f
+    return io.TextIOWrapper(f, encoding='utf-8', newline=newline)
+
+def member_range(path):
+    """(arquivo zip, offset, tamanho) dos bytes de um membro, para `np.fromfile`/`np.memmap`."""
+    archive, zf, _, info = _locate_member(path)
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f'Member {info.filename!r} of {archive} is compressed')
+    with open(archive, 'rb') as f:
+        f.seek(info.header_offset)
+        fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+    return archive, info.header_offset + _LOCAL_HEADER.size + fields[-2] + fields[-1], info.file_size
+
+def stat(path):
+    """mtime e tamanho de um arquivo; membros empacotados usam o mtime do zip."""
+    try:
+        st = os.stat(path)
+        return FileStat(st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        _, _, st, info = _locate_member(path)
+    return FileStat(st.st_mtime_ns, info.file_size)
+
+def _members_under(path):
+    # (zip aberto, prefixo do membro) de uma pasta dentro de uma execução empacotada
+    path = Path(os.path.abspath(path))
+    archive = packed_path(path)
+    if archive.is_file():
+        return _open_zip(archive), ''
+    found = locate(path)
+    if found is None:
+        return None, None
+    return _open_zip(found[0]), found[1] + '/'
+
+def scandir_files(folder):
+    """[(nome, mtime_ns, tamanho)] dos arquivos de uma pasta, empacotada ou não."""
+    try:
+        with os.scandir(folder) as entries:
+            return [(e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in entries if e.is_file()]
+    except FileNotFoundError:
+        pass
+    opened, prefix = _members_under(folder)
+    if opened is None:
+        return []
+    zf, st = opened
+    result = []
+    for info in zf.infolist():
+        name = info.filename
+        if name.startswith(prefix) and not info.is_dir() and '/' not in name[len(prefix):]:
+            result.append((name[len(prefix):], st.st_mtime_ns, info.file_size))
+    return result
+
+def exists(path):
+    if os.path.exists(path):
+        return True
+    opened, prefix = _members_under(path)
+    if opened is None:
+        return False
+    zf, _ = opened
+    if prefix == '':
+        return True
+    names = zf.namelist()
+    return prefix[:-1] in names or any(name.startswith(prefix) for name in names)
+
+def isdir(path):
+    if os.path.isdir(path):
+        return True
+    opened, prefix = _members_under(path)
+    if opened is None:
+        return False
+    return prefix == '' or any(name.startswith(prefix) for name in opened[0].namelist())
+
+def list_packed_run(archive, arguments_files=('arguments.json', 'arguments.yaml')):
+    """(pastas do topo, arquivo de argumentos ou None) de um zip de execução."""
+    zf, _ = _open_zip(archive)
+    children, args_file = set(), None
+    for name in zf.namelist():
+        head, sep, _ = name.partition('/')
+        if sep:
+            children.add(head)
+        elif name in arguments_files and (args_file is None or name.endswith('.json')):
+            args_file = name
+    return sorted(children), args_file
@@ -0,0 +1,129 @@
+import functools
+import inspect
+import json
+import os
+import re
+import time
+from pathlib import Path
+from .archive import open_file, writable_folder
+from .checkpoints import _pickle_load, _pickle_save
+from .envinfo import get_git_head
+from .sweep import register_run, resume_params
+
+CACHE_FOLDER = 'cache'
+
+def _code_version(code_version, func):
+    if code_version is None:
+        return None
+    if callable(code_version):
+        return code_version()
+    if code_version == 'git':
+        # o repositório que importa é o do código da função, não o diretório atual
+        try:
+            path = Path(inspect.getsourcefile(func)).parent
+        except TypeError:
+            path = '.'
+        return get_git_head(path)
+    return str(code_version)
+
+def _default_stage(func):
+    # `<locals>`/`<lambda>` do __qualname__ não servem em nomes de arquivo
+    return re.sub(r'[^\w.-]+', '_', func.__qualname__.replace('<', '').replace('>', ''))
+
+def _atomic_write(filepath, write):
+    tmp = filepath.with_name(f'.{filepath.name}.{os.getpid()}.tmp')
+    try:
+        write(tmp)
+        os.replace(tmp, filepath)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class _MemoizedRun:
+
+    def __init__(self, func, stage, code_version, save_fn, load_fn, suffix):
+        self.func = func
+        self.stage = stage or _default_stage(func)
+        self.code_version = code_version
+        self.save_fn = save_fn or _pickle_save
+        self.load_fn = load_fn or _pickle_load
+        self.suffix = suffix
+        functools.update_wrapper(self, func)
+
+    def paths(self, params, ensure_exists=False):
+        params = resume_params(params)
+        folder = params.get_default_folder(CACHE_FOLDER, ensure_exists=ensure_exists)
+        return folder / f'{self.stage}.json', folder / f'{self.stage}{self.suffix}'
+
+    def _read_marker(self, params):
+        marker, _ = self.paths(params)
+        try:
+            with open_file(marker, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def is_cached(self, params):
+        info = self._read_marker(params)
+        if info is None:
+            return False
+        version = _code_version(self.code_version, self.func)
+        return version is None or info.get('code_version') == version
+
+    def invalidate(self, params):
+        for filepath in self.paths(params):
+            filepath.unlink(missing_ok=True)
+
+    def __call__(self, params, *args, force=False, **kwargs):
+        # um novo lançamento do script (novo `_timestamp`) usa a pasta da execução anterior
+        params = resume_params(params)
+        marker, result_file = self.paths(params)
+        if not force and self.is_cached(params):
+            return self.load_fn(result_file)
+
+        # execução empacotada: falha antes de calcular, não ao gravar
+        writable_folder(params.get_default_folder(ensure_exists=False))
+        result = self.func(params, *args, **kwargs)
+        register_run(params)
+        marker, result_file = self.paths(params, ensure_exists=True)
+        # o resultado é gravado antes do marcador: marcador presente = resultado completo
+        _atomic_write(result_file, lambda tmp: self.save_fn(result, tmp))
+        info = {
+            'stage' : self.stage,
+            'hash_id' : params.hash_id,
+            'code_version' : _code_version(self.code_version, self.func),
+            'time' : time.time(),
+        }
+        def write_marker(tmp):
+            with open(tmp, 'w') as f:
+                json.dump(info, f)
+        _atomic_write(marker, write_marker)
+        return result
+
+
+def memoized_run(func=None, *, stage=None, code_version='git', save_fn=None, load_fn=None, suffix='.pkl'):
+    """Guarda o resultado de `func(params, ...)` na pasta da execução de `params`.
+
+    O resultado fica em `<pasta da execução>/cache/<stage>.pkl` e um marcador
+    `<stage>.json` indica que ele está completo. Numa nova chamada com os mesmos
+    argumentos o resultado salvo é devolvido sem executar `func`, também num
+    novo lançamento do script (ver `sweep.resume_params`): `func` recebe os
+    params com o `_timestamp` da execução que gravou o cache. Estágios
+    diferentes (ex.: 'preprocess' e 'train') têm caches independentes; sem
+    `stage`, o nome é o `__qualname__` da função (sem `<` e `>`). Só `params`
+    identifica a chamada: demais argumentos não entram na chave.
+
+    `code_version='git'` invalida o cache quando o commit (HEAD) do repositório
+    da função muda; também aceita uma string fixa, uma função ou None (nunca
+    invalida). `force=True` na chamada recalcula e sobrescreve o cache.
+
+        @memoized_run(stage='train')
+        def train(params):
+            ...
+    """
+    def decorator(func):
+        return _MemoizedRun(func, stage, code_version, save_fn, load_fn, suffix)
+    if func is not None:
+        return decorator(func)
+    return decorator
@@ -0,0 +1,196 @@
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+MANIFEST_FILENAME = 'manifest.json'
+
+def _pickle_save(obj, filepath):
+    with open(filepath, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _pickle_load(filepath):
+    from .archive import open_file
+    with open_file(filepath, 'rb') as f:
+        return pickle.load(f)
+
+def _atomic_write_json(filepath, content):
+    tmp = filepath.with_name(f'.{filepath.name}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(content, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filepath)
+
+
+class CheckpointManager:
+    """Salva checkpoints em `params.dir_checkpoints()` numa thread em segundo plano.
+
+    Cada checkpoint é gravado num arquivo temporário e renomeado atomicamente;
+    um `manifest.json` guarda a lista de checkpoints (passo, arquivo, métricas),
+    então `latest()`/`best()` não listam a pasta. A política de retenção mantém
+    os `keep_last` mais recentes e os `keep_best` melhores por `metric`.
+
+    `save_fn(obj, path)`/`load_fn(path)` trocam o pickle padrão (ex.: `torch.save`).
+    O objeto é serializado depois que `save` retorna: passe uma cópia (ex.: um
+    `state_dict` na CPU) se o treino for alterá-lo em seguida.
+    """
+
+    def __init__(self, params, keep_last=None, keep_best=None, metric=None, mode='min',
+                 save_fn=None, load_fn=None, suffix='.pkl', max_pending=2):
+        if keep_best is not None and metric is None:
+            raise ValueError('keep_best requires the name of the metric used to rank checkpoints')
+        if mode not in ('min', 'max'):
+            raise ValueError(f"mode must be 'min' or 'max': got {mode!r}")
+        self.folder = Path(params.dir_checkpoints())
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.metric = metric
+        self.mode = mode
+        self.save_fn = save_fn or _pickle_save
+        self.load_fn = load_fn or _pickle_load
+        self.suffix = suffix
+        self.manifest_path = self.folder / MANIFEST_FILENAME
+        self.entries = self._read_manifest()
+        self._lock = threading.Lock()
+        # limita quantos checkpoints podem estar na fila ao mesmo tempo (memória)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mrlab-checkpoint')
+        self._futures = []
+        self._error = None
+
+    def _read_manifest(self):
+        from .archive import open_file
+        try:
+            with open_file(self.manifest_path, 'r') as f:
+                return json.load(f)['checkpoints']
+        except (FileNotFoundError, ValueError, KeyError):
+            return []
+
+    # -------------------------
+    # Escrita
+    # -------------------------
+    def filename(self, step):
+        return f'checkpoint-{step:08d}{self.suffix}'
+
+    def save(self, obj, step, metrics=None):
+        from .archive import writable_folder
+        self._raise_error()
+        writable_folder(self.folder)
+        # converte aqui: escalares numpy (ex.: `np.float32`) não vão para o json do
+        # manifesto, e um valor inválido precisa falhar antes de gravar o checkpoint
+        values = dict()
+        for name, value in (metrics or {}).items():
+            try:
+                values[name] = float(value)
+            except (TypeError, ValueError):
+                raise TypeError(f'Metric {name!r} must be a number: got {value!r}') from None
+        self._slots.acquire()
+        future = self._executor.submit(self._write_or_record, obj, step, values)
+        future.add_done_callback(self._on_done)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()] + [future]
+        return future
+
+    def _on_done(self, future):
+        self._slots.release()
+
+    def _write_or_record(self, obj, step, metrics):
+        # o erro é guardado antes do future terminar: `wait()` sempre o enxerga
+        try:
+            return self._write(obj, step, metrics)
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            raise
+
+    def _write(self, obj, step, metrics):
+        name = self.filename(step)
+        filepath = self.folder / name
+        tmp = self.folder / f'.{name}.tmp'
+        try:
+            self.save_fn(obj, tmp)
+            with open(tmp, 'rb+') as f:
+                os.fsync(f.fileno())
+            os.replace(tmp, filepath)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        entry = {'step' : step, 'file' : name, 'metrics' : metrics, 'time' : time.time()}
+        with self._lock:
+            entries = [e for e in self.entries if e['step'] != step] + [entry]
+            entries.sort(key=lambda e: e['step'])
+            kept = self._retained(entries)
+            removed = [e for e in entries if e['file'] not in kept]
+            self.entries = [e for e in entries if e['file'] in kept]
+            _atomic_write_json(self.manifest_path, {'checkpoints' : self.entries})
+        for e in removed:
+            try:
+                (self.folder / e['file']).unlink()
+            except FileNotFoundError:
+                pass
+        return filepath
+
+    def _ranked(self, entries):
+        ranked = [e for e in entries if self.metric in e['metrics']]
+        return sorted(ranked, key=lambda e: e['metrics'][self.metric], reverse=self.mode == 'max')
+
+    def _retained(self, entries):
+        if self.keep_last is None and self.keep_best is None:
+            return {e['file'] for e in entries}
+        kept = set()
+        if self.keep_last:
+            kept.update(e['file'] for e in entries[-self.keep_last:])
+        if self.keep_best:
+            kept.update(e['file'] for e in self._ranked(entries)[:self.keep_best])
+        return kept
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def wait(self):
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.exception()
+        self._raise_error()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def latest(self):
+        with self._lock:
+            if not self.entries:
+                return None
+            return self.folder / self.entries[-1]['file']
+
+    def best(self):
+        if self.metric is None:
+            raise ValueError('best() requires the manager to be created with a metric')
+        with self._lock:
+            ranked = self._ranked(self.entries)
+        if not ranked:
+            return None
+        return self.folder / ranked[0]['file']
+
+    def load(self, filepath=None):
+        filepath = self.latest() if filepath is None else filepath
+        if filepath is None:
+            return None
+        return self.load_fn(filepath)
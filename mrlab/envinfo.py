@@ -1,12 +1,18 @@
+import hashlib
+import json
 import os
 import platform
 import re
 import subprocess
 import sys
+import threading
 import types
-import yaml
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from copy import deepcopy
 from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
+from time import monotonic
 
 def get_platform_info():
     info = dict()
@@ -59,14 +65,14 @@ def get_conda_info():
     return { 'conda' : info }
 
 
-def get_cuda_info():
+def get_cuda_info(timeout=None):
     info = dict()
     try :
         out = subprocess.check_output([
             "nvidia-smi",
             "--query-gpu=name,memory.total,memory.used,utilization.gpu",
             "--format=csv,noheader,nounits"
-        ], encoding='utf-8' )
+        ], encoding='utf-8', stderr=subprocess.DEVNULL, timeout=timeout)
         out = re.sub(r'\s+', ' ', out)
         name, mem_totoal, mem_used, utilization = out.split(',')
         info = {
@@ -77,89 +83,159 @@ def get_cuda_info():
         }
     except FileNotFoundError:
         info['error'] = 'nvidia-smi não encontrado. Certifique-se que os drivers NVIDIA estão instalados!'
+    except subprocess.TimeoutExpired:
+        info['error'] = f'nvidia-smi não respondeu em {timeout}s'
     except Exception :
         info['error'] = 'Erro ao obter informações da GPU'
 
     return {'cuda' : info }
 
-def _run_shell(cmd):
+def _run_shell(cmd, timeout=None):
 
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        shell=False,
-        text=True,
-        encoding='utf-8'
-    )
-
-    stdout, stderr = process.communicate()
+    try:
+        process = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            shell=False,
+            text=True,
+            encoding='utf-8',
+            timeout=timeout,
+        )
+    except FileNotFoundError as e:
+        return {'stdout' : '', 'stderr' : str(e), 'returncode' : 127}
+    except subprocess.TimeoutExpired:
+        return {'stdout' : '', 'stderr' : f'timeout after {timeout}s', 'returncode' : None}
 
     # stdout sempre vai ser str pq text=True
     result = {
-        'stdout' : stdout.strip() if isinstance(stdout, str) else stdout,
-        'stderr' : stderr.strip() if isinstance(stderr, str) else stderr,
+        'stdout' : process.stdout.strip() if isinstance(process.stdout, str) else process.stdout,
+        'stderr' : process.stderr.strip() if isinstance(process.stderr, str) else process.stderr,
         'returncode' : process.returncode
     }
     return result
 
-def _get_git_username():
-    label = None
-    result = _run_shell(['git', 'config', '--get', 'user.name'])
-    if result['returncode'] == 0:
-        label = result['stdout']
-    return label
-
-def _get_git_user_email():
-    label = None
-    result = _run_shell(['git', 'config', '--get', 'user.email'])
-    if result['returncode'] == 0:
-        label = result['stdout']
-    return label
+# -------------------------
+# Leitura direta do repositório git (sem subprocessos)
+# -------------------------
+_CONFIG_SECTION = re.compile(r'^\s*\[\s*([^\]\s"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+_CONFIG_ENTRY = re.compile(r'^\s*([A-Za-z][-A-Za-z0-9]*)\s*(?:=\s*(.*?))?\s*$')
+
+def _find_git_dir(path='.'):
+    path = Path(path).resolve()
+    for folder in (path, *path.parents):
+        candidate = folder / '.git'
+        if candidate.is_dir():
+            return candidate
+        if candidate.is_file():
+            # worktrees e submódulos: ".git" é um arquivo "gitdir: <caminho>"
+            content = candidate.read_text().strip()
+            if content.startswith('gitdir:'):
+                return (folder / content[len('gitdir:'):].strip()).resolve()
+    return None
+
+def _common_git_dir(git_dir):
+    commondir = git_dir / 'commondir'
+    if commondir.is_file():
+        return (git_dir / commondir.read_text().strip()).resolve()
+    return git_dir
+
+def _read_git_config(filepath):
+    config = dict()
+    section = None
+    try:
+        lines = Path(filepath).read_text(encoding='utf-8').splitlines()
+    except (OSError, UnicodeDecodeError):
+        return config
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        match = _CONFIG_SECTION.match(line)
+        if match:
+            name, subsection = match.groups()
+            section = name.lower() if subsection is None else f'{name.lower()}.{subsection}'
+            continue
+        match = _CONFIG_ENTRY.match(line)
+        if match and section is not None:
+            key, value = match.groups()
+            value = 'true' if value is None else value.strip('"')
+            config[f'{section}.{key.lower()}'] = value
+    return config
+
+def _git_config_files(git_dir):
+    home = Path.home()
+    xdg = Path(os.environ.get('XDG_CONFIG_HOME', home / '.config'))
+    # ordem de precedência crescente, como no `git config`
+    files = [xdg / 'git' / 'config', home / '.gitconfig']
+    if git_dir is not None:
+        files.append(_common_git_dir(git_dir) / 'config')
+    return files
+
+def _resolve_ref(git_dir, ref):
+    common = _common_git_dir(git_dir)
+    for folder in (git_dir, common):
+        loose = folder / ref
+        if loose.is_file():
+            return loose.read_text().strip()
+    try:
+        with open(common / 'packed-refs', 'r') as f:
+            for line in f:
+                if line.startswith(('#', '^')):
+                    continue
+                sha, _, name = line.strip().partition(' ')
+                if name == ref:
+                    return sha
+    except FileNotFoundError:
+        pass
+    return None
 
-def _get_git_version():
+def _read_git_head(git_dir):
+    try:
+        head = (git_dir / 'HEAD').read_text().strip()
+    except OSError:
+        return None, None
+    if not head.startswith('ref:'):
+        # HEAD destacado: mesmo retorno de `git rev-parse --abbrev-ref HEAD`
+        return 'HEAD', head
+    ref = head[len('ref:'):].strip()
+    branch = ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else ref
+    return branch, _resolve_ref(git_dir, ref)
+
+def get_git_head(path='.'):
+    git_dir = _find_git_dir(path)
+    if git_dir is None:
+        return None
+    return _read_git_head(git_dir)[1]
+
+@lru_cache(maxsize=None)
+def _get_git_version(timeout=5.0):
     label = None
-    result = _run_shell(['git', '--version'])
+    result = _run_shell(['git', '--version'], timeout=timeout)
     if result['returncode'] == 0 :
         label = result['stdout']
     return label
 
-def _get_git_remote_origin():
-    label = None
-    result = _run_shell(['git', 'config', '--get', 'remote.origin.url'])
-    if result['returncode'] == 0:
-        label = result['stdout']
-    return label
-
-def _get_git_commit_hash():
-    label = None
-    result = _run_shell(['git', 'rev-parse', 'HEAD'])
-    if result['returncode'] == 0:
-        label = result['stdout']
-    return label
-
-def _get_git_branch():
-    label = None
-    result = _run_shell(['git', 'rev-parse', '--abbrev-ref', 'HEAD'])
-    if result['returncode'] == 0:
-        label = result['stdout']
-    return label
-
-def _get_git_current_status():
+def _get_git_current_status(timeout=None):
     label = None
-    result = _run_shell(['git', 'status', '--porcelain'])
+    result = _run_shell(['git', 'status', '--porcelain'], timeout=timeout)
     if result['returncode'] == 0:
         label = result['stdout']
     return label
 
-def get_git_repository_info():
+def get_git_repository_info(path='.'):
+    git_dir = _find_git_dir(path)
+    config = dict()
+    for filepath in _git_config_files(git_dir):
+        config.update(_read_git_config(filepath))
+    branch, head = _read_git_head(git_dir) if git_dir is not None else (None, None)
     info = {
-        'username' : _get_git_username(),
-        'email' : _get_git_user_email(),
-        'branch'   : _get_git_branch(),
-        'url'  : _get_git_remote_origin(),
+        'username' : config.get('user.name'),
+        'email' : config.get('user.email'),
+        'branch'   : branch,
+        'url'  : config.get('remote.origin.url') if git_dir is not None else None,
         'version'  : _get_git_version(),
-        'head' : _get_git_commit_hash(),
+        'head' : head,
         # 'status' : _get_git_current_status()
     }
     return {'git' : info }
@@ -193,6 +269,86 @@ def get_torch_info():
     return {'torch' : info}
 
 
+# -------------------------
+# Cache das seções estáticas
+# -------------------------
+STATIC_SECTIONS = {
+    'platform' : get_platform_info,
+    'python' : get_python_info,
+    'conda' : get_conda_info,
+}
+
+def _cache_dir():
+    return Path(os.environ.get('MRLAB_CACHE_DIR', Path.home() / '.cache' / 'mrlab'))
+
+def _environment_fingerprint():
+    # tudo o que pode mudar as seções estáticas entre processos
+    parts = [
+        sys.executable,
+        sys.version,
+        repr(os.uname()) if hasattr(os, 'uname') else platform.node(),
+        str(os.cpu_count()),
+        os.environ.get('CONDA_DEFAULT_ENV', ''),
+        os.environ.get('CONDA_PREFIX', ''),
+    ]
+    return hashlib.md5('\0'.join(parts).encode()).hexdigest()
+
+@lru_cache(maxsize=None)
+def get_static_info(use_cache=True):
+    filepath = _cache_dir() / f'envinfo-{_environment_fingerprint()}.json'
+    if use_cache:
+        try:
+            with open(filepath, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    info = dict()
+    for func in STATIC_SECTIONS.values():
+        info.update(func())
+
+    if use_cache:
+        try:
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            tmp = filepath.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(info, f)
+            os.replace(tmp, filepath)
+        except OSError:
+            pass
+    # json transforma tuplas em listas: o cache em arquivo e o em memória ficam iguais
+    return json.loads(json.dumps(info))
+
+def _submit_daemon(func, name):
+    # thread daemon, não um ThreadPoolExecutor: os workers do pool são
+    # esperados na saída do interpretador e uma seção travada (git no NFS,
+    # import do torch) seguraria o processo inteiro
+    future = Future()
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+    threading.Thread(target=run, name=f'mrlab-envinfo-{name}', daemon=True).start()
+    return future
+
+def _collect_sections(tasks, timeout):
+    info = dict()
+    futures = {name : _submit_daemon(func, name) for name, func in tasks.items()}
+    deadline = monotonic() + timeout if timeout is not None else None
+    for name, future in futures.items():
+        remaining = None if deadline is None else max(deadline - monotonic(), 0)
+        try:
+            info.update(future.result(timeout=remaining))
+        except FuturesTimeoutError:
+            # a seção travada continua na sua thread, sem bloquear a chamada nem a saída
+            info[name] = {'error' : f'Tempo esgotado ao coletar informações ({timeout}s)'}
+        except Exception as e:
+            info[name] = {'error' : repr(e)}
+    return info
+
 def env_report(
             dest='.',
             filename='envsinfo.yaml',
@@ -202,24 +358,31 @@ def env_report(
             with_platform_info=True,
             with_python_info=True,
             with_torch_info=False,
+            timeout=10.0,
+            use_cache=True,
     ):
 
     info = dict()
     info['_timestamp'] = datetime.now().isoformat()
 
-    if with_platform_info:
-        info.update( get_platform_info() )
-    if with_python_info:
-        info.update( get_python_info() )
-    if with_conda_info :
-        info.update( get_conda_info() )
+    static = get_static_info(use_cache=use_cache)
+    wanted = {
+        'platform' : with_platform_info,
+        'python' : with_python_info,
+        'conda' : with_conda_info,
+    }
+    info.update({name : deepcopy(static[name]) for name, wanted in wanted.items() if wanted})
+
+    tasks = dict()
     if with_cuda_info :
-        info.update( get_cuda_info() )
+        tasks['cuda'] = partial(get_cuda_info, timeout=timeout)
     if with_git_info :
-        info.update( get_git_repository_info() )
+        tasks['git'] = get_git_repository_info
     if with_torch_info :
-        info.update( get_torch_info() )
+        tasks['torch'] = get_torch_info
+    info.update(_collect_sections(tasks, timeout))
 
+    import yaml
     filepath = Path(dest, filename)
 
     with open(filepath, 'w') as file :
@@ -0,0 +1,255 @@
+import csv
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+from pathlib import Path
+
+MAGIC = b'MRLM'
+VERSION = 1
+SUFFIX = '.mlog'
+
+# magic, versão, tamanho do cabeçalho json
+_PREAMBLE = struct.Struct('<4sHI')
+
+# -------------------------
+# Formato do arquivo
+# -------------------------
+# [preâmbulo][cabeçalho json][registros float64 de tamanho fixo]
+#
+# Um registro só existe por inteiro: depois de uma queda, o que sobrar no fim
+# do arquivo além do último registro completo é ignorado pelo leitor e
+# descartado pelo escritor ao reabrir o arquivo.
+
+def _make_header(columns):
+    header = json.dumps({'columns' : list(columns), 'dtype' : 'f8', 'byteorder' : sys.byteorder}).encode()
+    # alinha os registros em 8 bytes, assim o leitor pode mapear o arquivo direto
+    padding = -(_PREAMBLE.size + len(header)) % 8
+    header += b' ' * padding
+    return _PREAMBLE.pack(MAGIC, VERSION, len(header)) + header
+
+def read_header(f):
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) < _PREAMBLE.size:
+        raise ValueError('Truncated metrics file header')
+    magic, version, size = _PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError(f'Not a metrics file: bad magic {magic!r}')
+    if version != VERSION:
+        raise ValueError(f'Unsupported metrics file version: {version}')
+    header = json.loads(f.read(size))
+    header['offset'] = _PREAMBLE.size + size
+    return header
+
+
+class MetricsWriter:
+    """Grava métricas por passo em `params.dir_metrics() / (name + '.mlog')`.
+
+    `log` só acrescenta a linha num buffer em memória; uma thread em segundo
+    plano grava o buffer quando ele chega a `flush_rows` linhas ou a cada
+    `flush_interval` segundos. Colunas ausentes numa linha ficam como NaN.
+
+        with MetricsWriter(params, columns=['step', 'loss']) as writer:
+            for step in range(n_steps):
+                writer.log(step=step, loss=loss)
+    """
+
+    def __init__(self, params, name='metrics', columns=None, flush_rows=4096, flush_interval=5.0, fsync=False):
+        from .archive import writable_folder
+        self.filepath = Path(writable_folder(params.dir_metrics()), name + SUFFIX)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.columns = None
+        self._index = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._file = None
+        self._error = None
+        if self.filepath.exists():
+            self._open_existing(columns)
+        elif columns is not None:
+            self._create(columns)
+        self._thread = threading.Thread(target=self._run, name='mrlab-metrics-writer', daemon=True)
+        self._thread.start()
+
+    def _set_columns(self, columns):
+        self.columns = tuple(columns)
+        self._index = {name : i for i, name in enumerate(self.columns)}
+        self._nan_row = [float('nan')] * len(self.columns)
+
+    def _create(self, columns):
+        self._set_columns(columns)
+        tmp = self.filepath.with_name(f'.{self.filepath.name}.{os.getpid()}.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(_make_header(self.columns))
+        os.replace(tmp, self.filepath)
+        self._file = open(self.filepath, 'ab', buffering=0)
+
+    def _open_existing(self, columns):
+        with open(self.filepath, 'rb') as f:
+            header = read_header(f)
+        if columns is not None and tuple(columns) != tuple(header['columns']):
+            raise ValueError(
+                f"Columns {tuple(columns)} do not match the existing file {self.filepath}: {tuple(header['columns'])}"
+            )
+        self._set_columns(header['columns'])
+        record_size = 8 * len(self.columns)
+        size = self.filepath.stat().st_size
+        complete = header['offset'] + (size - header['offset']) // record_size * record_size
+        if complete != size:
+            # registro incompleto de uma execução que caiu
+            os.truncate(self.filepath, complete)
+        self._file = open(self.filepath, 'ab', buffering=0)
+
+    # -------------------------
+    # Escrita
+    # -------------------------
+    def log(self, values=None, **kwargs):
+        if values:
+            kwargs = {**values, **kwargs}
+        if self.columns is None:
+            with self._io_lock:
+                if self.columns is None:
+                    self._create(kwargs)
+        self._raise_error()
+        row = list(self._nan_row)
+        index = self._index
+        for name, value in kwargs.items():
+            try:
+                i = index[name]
+            except KeyError:
+                raise KeyError(f'Unknown metric {name!r} for {self.filepath}: columns are {self.columns}') from None
+            # converte aqui: um valor inválido falha na chamada, não na thread de gravação
+            try:
+                row[i] = float(value)
+            except (TypeError, ValueError):
+                raise TypeError(f'Metric {name!r} must be a number: got {value!r}') from None
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.flush_rows
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        self._write()
+        self._raise_error()
+
+    def _write(self):
+        with self._io_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows or self._file is None:
+                return
+            data = memoryview(array('d', [value for row in rows for value in row])).cast('B')
+            fd = self._file.fileno()
+            position = os.fstat(fd).st_size
+            try:
+                # arquivo sem buffer: cada write vai direto ao disco, talvez em partes
+                while data:
+                    data = data[self._file.write(data):]
+                if self.fsync:
+                    os.fsync(fd)
+            except BaseException:
+                # desfaz a escrita parcial e devolve as linhas ao buffer: nada se perde
+                os.ftruncate(fd, position)
+                with self._lock:
+                    self._buffer[:0] = rows
+                raise
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # a thread sobrevive a erros de gravação (ex.: disco cheio); o erro
+            # é levantado na próxima chamada de `log`, `flush` ou `close`
+            try:
+                self._write()
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        try:
+            self._write()
+        finally:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+                self._file.close()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -------------------------
+# Leitura
+# -------------------------
+def _read_log(filepath):
+    import numpy as np
+    from .archive import member_range, open_file
+
+    with open_file(filepath, 'rb') as f:
+        header = read_header(f)
+    start = 0
+    if os.path.exists(filepath):
+        size = os.path.getsize(filepath)
+    else:
+        # execução empacotada: lê os registros direto do zip, pelo offset do membro
+        filepath, start, size = member_range(filepath)
+    columns = header['columns']
+    dtype = np.dtype('<f8' if header['byteorder'] == 'little' else '>f8')
+    record_size = dtype.itemsize * len(columns)
+    n_records = (size - header['offset']) // record_size if columns else 0
+    data = np.fromfile(filepath, dtype=dtype, count=n_records * len(columns), offset=start + header['offset'])
+    data = data.reshape(n_records, len(columns))
+    return {name : data[:, i] for i, name in enumerate(columns)}
+
+def _read_csv(filepath):
+    import numpy as np
+    from .archive import open_file
+
+    with open_file(filepath, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = [list() for _ in header]
+        for row in reader:
+            for column, value in zip(columns, row):
+                column.append(value)
+    result = dict()
+    for name, values in zip(header, columns):
+        try:
+            result[name] = np.array([float(v) if v != '' else np.nan for v in values], dtype=np.float64)
+        except ValueError:
+            result[name] = np.array(values, dtype=object)
+    return result
+
+def read_metrics(path, name='metrics'):
+    """Lê um arquivo de métricas (`.mlog` ou `.csv`) como arrays numpy por coluna.
+
+    `path` pode ser o caminho do arquivo ou um objeto de params; nesse caso é
+    lido `params.dir_metrics() / (name + '.mlog')`.
+    """
+    if not isinstance(path, (str, os.PathLike)):
+        path = Path(path.dir_metrics(ensure_exists=False), name + SUFFIX)
+    if str(path).endswith('.csv'):
+        return _read_csv(path)
+    return _read_log(path)
@@ -0,0 +1,233 @@
+import csv
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+FIELDS = (
+    'time',
+    'proc_cpu_percent',
+    'sys_cpu_percent',
+    'rss_mb',
+    'read_mb',
+    'write_mb',
+    'gpu_util_percent',
+    'gpu_mem_used_mb',
+)
+
+_MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# -------------------------
+# Leituras do /proc (Linux); nas outras plataformas viram NaN
+# -------------------------
+def _read_rss():
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / _MB
+    except (OSError, ValueError, IndexError):
+        return math.nan
+
+def _read_io():
+    try:
+        with open('/proc/self/io', 'rb') as f:
+            values = dict(line.split(b':') for line in f.read().splitlines())
+        return int(values[b'read_bytes']) / _MB, int(values[b'write_bytes']) / _MB
+    except (OSError, ValueError, KeyError):
+        return math.nan, math.nan
+
+def _read_system_cpu():
+    # (tempo ocupado, tempo total) em ticks desde o boot
+    try:
+        with open('/proc/stat', 'rb') as f:
+            values = [int(v) for v in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    total = sum(values)
+    return total - idle, total
+
+
+class _GPUReader:
+    # NVML via pynvml: consultar o nvidia-smi a cada amostra custaria caro demais
+    def __init__(self, index=0):
+        import pynvml # type: ignore
+        pynvml.nvmlInit()
+        self.nvml = pynvml
+        self.handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+
+    def read(self):
+        util = self.nvml.nvmlDeviceGetUtilizationRates(self.handle)
+        memory = self.nvml.nvmlDeviceGetMemoryInfo(self.handle)
+        return float(util.gpu), memory.used / _MB
+
+
+class ResourceMonitor:
+    """Amostra CPU, memória, I/O e GPU do processo numa thread em segundo plano.
+
+    As amostras ficam num buffer circular de tamanho fixo (`capacity`) e são
+    gravadas em lotes de `flush_every` linhas em `params.dir_logs() / filename`.
+    Use como gerenciador de contexto em volta do treino:
+
+        with ResourceMonitor(params, interval=1.0):
+            train(params)
+    """
+
+    def __init__(self, params, interval=1.0, capacity=1024, flush_every=60, filename='resources.csv', gpu=None):
+        if flush_every > capacity:
+            raise ValueError(f'flush_every ({flush_every}) must not exceed capacity ({capacity})')
+        self.params = params
+        self.interval = interval
+        self.capacity = capacity
+        self.flush_every = flush_every
+        from .archive import writable_folder
+        self.filepath = Path(writable_folder(params.dir_logs()), filename)
+        self._buffer = [None] * capacity
+        self._count = 0
+        self._flushed = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+        self._gpu = None
+        if gpu or gpu is None:
+            try:
+                self._gpu = _GPUReader()
+            except Exception:
+                if gpu:
+                    raise
+        self._last = None
+
+    # -------------------------
+    # Amostragem
+    # -------------------------
+    def _sample(self):
+        now = time.monotonic()
+        times = os.times()
+        proc_cpu = times.user + times.system
+        sys_cpu = _read_system_cpu()
+
+        proc_percent = sys_percent = math.nan
+        if self._last is not None:
+            last_now, last_proc, last_sys = self._last
+            elapsed = now - last_now
+            if elapsed > 0:
+                proc_percent = 100.0 * (proc_cpu - last_proc) / elapsed
+            if sys_cpu is not None and last_sys is not None and sys_cpu[1] > last_sys[1]:
+                sys_percent = 100.0 * (sys_cpu[0] - last_sys[0]) / (sys_cpu[1] - last_sys[1])
+        self._last = (now, proc_cpu, sys_cpu)
+
+        gpu_util = gpu_mem = math.nan
+        if self._gpu is not None:
+            try:
+                gpu_util, gpu_mem = self._gpu.read()
+            except Exception:
+                pass
+
+        read_mb, write_mb = _read_io()
+        return (time.time(), proc_percent, sys_percent, _read_rss(), read_mb, write_mb, gpu_util, gpu_mem)
+
+    def sample(self):
+        row = self._sample()
+        with self._lock:
+            self._buffer[self._count % self.capacity] = row
+            self._count += 1
+            pending = self._count - self._flushed
+        if pending >= self.flush_every:
+            self._write()
+        return row
+
+    def samples(self):
+        """Amostras que ainda estão no buffer, da mais antiga para a mais recente."""
+        with self._lock:
+            start = max(self._count - self.capacity, 0)
+            return [self._buffer[i % self.capacity] for i in range(start, self._count)]
+
+    def flush(self):
+        self._write()
+        self._raise_error()
+
+    def _write(self):
+        with self._flush_lock:
+            with self._lock:
+                start = max(self._flushed, self._count - self.capacity)
+                rows = [self._buffer[i % self.capacity] for i in range(start, self._count)]
+                self._flushed = self._count
+            if not rows:
+                return
+            try:
+                new_file = not self.filepath.exists()
+                with open(self.filepath, 'a', newline='') as f:
+                    writer = csv.writer(f)
+                    if new_file:
+                        writer.writerow(FIELDS)
+                    writer.writerows(
+                        (f'{row[0]:.3f}', *(f'{value:.2f}' for value in row[1:])) for row in rows
+                    )
+            except BaseException:
+                # as linhas continuam no buffer circular: a próxima gravação tenta de novo
+                with self._lock:
+                    self._flushed = min(self._flushed, start)
+                raise
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # a thread sobrevive a erros de amostragem ou gravação; o erro é
+            # levantado na próxima chamada de `flush` ou `stop`
+            try:
+                self.sample()
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    # -------------------------
+    # Ciclo de vida
+    # -------------------------
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError('ResourceMonitor already started')
+        self._stop.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name='mrlab-resource-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            self.sample()
+            self._write()
+        finally:
+            self._raise_error()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def read_resources(path):
+    """Lê o arquivo gravado pelo `ResourceMonitor` como arrays numpy por coluna."""
+    import numpy as np
+
+    if not isinstance(path, (str, os.PathLike)):
+        path = Path(path.dir_logs(ensure_exists=False), 'resources.csv')
+    from .archive import open_file
+    with open_file(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [[float(v) for v in row] for row in reader if len(row) == len(header)]
+    data = np.array(rows, dtype=np.float64).reshape(-1, len(header))
+    return {name : data[:, i] for i, name in enumerate(header)}
@@ -1,35 +1,198 @@
+import copy
 import hashlib
 import json
 import re
 import uuid
-import yaml
 from collections.abc import Iterable
 from dataclasses import (
-    asdict,
     dataclass,
     field,
     fields
 )
-from datetime import datetime
-from pathlib import Path
+from datetime import date, datetime, time
+from enum import Enum
+from functools import lru_cache, partial
+from operator import attrgetter, itemgetter
+from pathlib import Path, PurePath
 from uuid import uuid4
-from typing import List
+from typing import List, NamedTuple, Union, get_args, get_origin, get_type_hints
+from .profiling import get_profiler
 
 def options(values):
     if not isinstance(values, Iterable):
         raise TypeError(f'Values options must e a iterable: got {type(values)}')
     return field(default_factory=lambda: values)
 
-@dataclass
-class BaseParams:
+class _FieldsInfo(NamedTuple):
+    names: frozenset
+    init: tuple
+    hashed: tuple
+    get_hashed: attrgetter
+    positions: dict
+    get_init: attrgetter
+    positional: bool
+    containers: tuple
+    others: tuple
+    get_others: itemgetter
 
-    _hash_id : str = field(default=None, init=False, repr=False, hash=False)
-    _timestamp: str = field(default_factory=lambda: datetime.now().isoformat(), repr=False)
+# valores que podem ser compartilhados entre instâncias sem cópia
+_IMMUTABLE = frozenset({int, float, complex, str, bytes, bool, type(None)})
+
+def _immutable_container(hint):
+    """`list`, `set` ou `dict` se a anotação declara um contêiner só de imutáveis, senão None."""
+    origin, args = get_origin(hint), get_args(hint)
+    if origin is Union:
+        args = [a for a in args if a is not type(None)]
+        return _immutable_container(args[0]) if len(args) == 1 else None
+    if origin in (list, set, dict) and args and _IMMUTABLE.issuperset(args):
+        return origin
+    return None
+
+def _type_hints(cls):
+    try:
+        return get_type_hints(cls)
+    except Exception:
+        # anotações que não podem ser resolvidas: os valores são examinados a cada cópia
+        return {}
+
+def _getter(getter, items):
+    return getter(*items) if len(items) > 1 else lambda obj: tuple(getter(i)(obj) for i in items)
+
+@lru_cache(maxsize=None)
+def _fields_info(cls):
+    cls_fields = fields(cls)
+    init_fields = [f for f in cls_fields if f.init]
+    init = tuple(f.name for f in init_fields)
+    positions = {name : i for i, name in enumerate(init)}
+    hashed = tuple(f.name for f in cls_fields if f.hash != False)
+    # a decisão de como copiar cada campo é tomada uma vez, pela anotação
+    hints = _type_hints(cls)
+    containers = tuple(
+        (i, name, container) for i, name in enumerate(init)
+        if (container := _immutable_container(hints.get(name))) is not None
+    )
+    shallow = {name for _, name, _ in containers}
+    others = tuple((i, name) for i, name in enumerate(init) if name not in shallow)
+    return _FieldsInfo(
+        names=frozenset(f.name for f in cls_fields),
+        init=init,
+        hashed=hashed,
+        get_hashed=_getter(attrgetter, hashed),
+        positions=positions,
+        get_init=_getter(attrgetter, init),
+        positional=not any(f.kw_only for f in init_fields),
+        containers=containers,
+        others=others,
+        get_others=_getter(itemgetter, [i for i, _ in others]),
+    )
+
+def _copy_value(value):
+    # contêineres só de imutáveis: cópia rasa basta; o resto como o antigo `asdict`
+    cls = value.__class__
+    if cls in _IMMUTABLE:
+        return value
+    if cls is list or cls is set:
+        if _IMMUTABLE.issuperset(map(type, value)):
+            return value.copy()
+    elif cls is dict:
+        if _IMMUTABLE.issuperset(map(type, value.values())):
+            return value.copy()
+    return copy.deepcopy(value)
+
+# o yaml só é importado quando usado: importar o mrlab fica mais rápido
+def _yaml_loader():
+    import yaml
+    # as versões em C (libyaml) são bem mais rápidas, quando disponíveis
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+def _yaml_dumper():
+    import yaml
+    return getattr(yaml, 'CDumper', yaml.Dumper)
+
+class _TemplateArgs(dict):
+    # permite usar atributos de classe (ex.: `experiment`) no template da pasta
+    def __init__(self, params):
+        super().__init__()
+        self.params = params
+
+    def __missing__(self, key):
+        if key == 'hash_id':
+            return self.params.hash_id
+        try:
+            return getattr(self.params, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+# -------------------------
+# Serialização canônica para o hash
+# -------------------------
+def _canonical_default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (uuid.UUID, PurePath)):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=_canonical_encoder.encode)
+    if hasattr(obj, 'tolist'):
+        # escalares e arrays numpy viram tipos nativos
+        return obj.tolist()
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+# mesmo formato de `json.dumps(..., sort_keys=True)`: hashes antigos continuam válidos
+_canonical_encoder = json.JSONEncoder(sort_keys=True, default=_canonical_default)
+
+def canonical_json(obj):
+    return _canonical_encoder.encode(obj)
+
+@lru_cache(maxsize=None)
+def _hash_constructor(algorithm):
+    if algorithm in ('blake2b', 'blake2s'):
+        # 16 bytes: mesmo tamanho de nome de pasta do md5
+        return partial(getattr(hashlib, algorithm), digest_size=16)
+    if algorithm in hashlib.algorithms_guaranteed:
+        return getattr(hashlib, algorithm)
+    if algorithm in hashlib.algorithms_available:
+        return partial(hashlib.new, algorithm)
+    raise ValueError(f'Unknown hash algorithm: {algorithm!r}')
+
+def hash_many(params_iterable, algorithm=None):
+    """Calcula o `hash_id` de todos os params de uma busca.
+
+    Os campos, o construtor do hash e o codificador são buscados uma vez por
+    classe, não a cada params. Com o algoritmo da classe, o `hash_id` calculado
+    fica guardado no params, como na propriedade `hash_id`.
+    """
+    encode = _canonical_encoder.encode
+    hash_ids = []
+    cls = None
+    for params in params_iterable:
+        if params.__class__ is not cls:
+            cls = params.__class__
+            info = _fields_info(cls)
+            hashed, get_hashed = info.hashed, info.get_hashed
+            own = algorithm is None or algorithm == cls.hash_algorithm
+            new_hash = _hash_constructor(algorithm or cls.hash_algorithm)
+        if own and params._hash_id is not None:
+            hash_ids.append(params._hash_id)
+            continue
+        hash_id = new_hash(encode(dict(zip(hashed, get_hashed(params)))).encode()).hexdigest()
+        if own:
+            params._hash_id = hash_id
+        hash_ids.append(hash_id)
+    return hash_ids
+
+class _ParamsMixin:
+    # métodos comuns a `BaseParams` e `SlotsParams`; os campos ficam em cada um
+    __slots__ = ()
+
+    hash_algorithm = 'md5'
 
     def _check_attrs_names(self, **kwargs):
 
-        valid_fields = {f.name for f in fields(self)}
-        invalid_args = set(kwargs) - valid_fields
+        valid_fields = _fields_info(self.__class__).names
+        invalid_args = kwargs.keys() - valid_fields
         if invalid_args:
             raise TypeError(
                 f"Invalid argument(s) for {self.__class__.__name__}:"
@@ -38,12 +201,35 @@ class BaseParams:
             )
 
     def update(self, **kwargs):
-        """Cria uma nova instância com valores atualizados"""
-        self._check_attrs_names(**kwargs)
-        base_dict = asdict(self)
-        del base_dict['_hash_id']
-        base_dict.update(kwargs)
-        return self.__class__(**base_dict)
+        """Cria uma nova instância com valores atualizados.
+
+        Os valores imutáveis (números, strings, None) são reaproveitados; os
+        demais (listas, dicts, objetos) são copiados para não serem
+        compartilhados entre as instâncias, venham ou não de `default_factory`.
+        Campos anotados como contêineres de imutáveis (`List[float]`,
+        `Dict[str, int]`...) recebem uma cópia rasa, sem examinar os elementos.
+        """
+        info = _fields_info(self.__class__)
+        # argumentos posicionais, na ordem dos campos: evita montar um dict
+        values = list(info.get_init(self))
+        for i, name, container in info.containers:
+            if name not in kwargs:
+                value = values[i]
+                values[i] = value.copy() if value.__class__ is container else _copy_value(value)
+        if not _IMMUTABLE.issuperset(map(type, info.get_others(values))):
+            for i, name in info.others:
+                if name not in kwargs:
+                    values[i] = _copy_value(values[i])
+        positions = info.positions
+        try:
+            for name, value in kwargs.items():
+                values[positions[name]] = value
+        except KeyError:
+            self._check_attrs_names(**kwargs)
+            raise
+        if info.positional:
+            return self.__class__(*values)
+        return self.__class__(**dict(zip(info.init, values)))
 
     # -------------------------
     # Leitura de arquivo
@@ -54,55 +240,65 @@ class BaseParams:
 
     @classmethod
     def from_json(cls, filepath:'str'):
-        with open(filepath, 'r') as f:
+        from .archive import open_file
+        with open_file(filepath, 'r') as f:
             config = json.load(f)
         return cls.from_dict(config)
 
     @classmethod
     def from_yaml(cls, filepath:'str'):
-        with open(filepath, 'r') as f:
-            config = yaml.safe_load(f)
+        import yaml
+        from .archive import open_file
+        with open_file(filepath, 'r') as f:
+            config = yaml.load(f, Loader=_yaml_loader())
         return cls.from_dict(config)
 
     # -------------------------
     # Conversão
     # -------------------------
     def to_dict(self):
-        return { f.name : getattr(self, f.name) for f in fields(self) if f.hash != False }
+        return { name : getattr(self, name) for name in _fields_info(self.__class__).hashed }
 
     def to_yaml(self):
-        filepath = self.get_default_folder() / 'arguments.yaml'
+        import yaml
+        from .archive import writable_folder
+        filepath = writable_folder(self.get_default_folder()) / 'arguments.yaml'
         with open(filepath, 'w') as f:
-            txt = yaml.dump(self.to_dict())
+            txt = yaml.dump(self.to_dict(), Dumper=_yaml_dumper())
             f.write(txt)
         return filepath
 
     def _json_serialization_defaults(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat
-        if isinstance(obj, uuid.UUID):
-            return str(obj)
-        else:
-            return obj
+        return _canonical_default(obj)
 
     def to_json(self):
-        filepath = self.get_default_folder() / 'arguments.json'
+        from .archive import writable_folder
+        filepath = writable_folder(self.get_default_folder()) / 'arguments.json'
         with open(filepath, 'w') as f:
             json.dump(
                 self.to_dict(),
                 f,
                 sort_keys=True,
+                default=self._json_serialization_defaults,
             )
         return filepath
 
     # -------------------------
     # Hash dos argumentos
     # -------------------------
-    def make_hash_id(self):
-        args_dict = self.to_dict()
-        args_txt = json.dumps(args_dict, sort_keys=True)
-        digest = hashlib.md5(args_txt.encode()).hexdigest()
-        return digest
+    def make_hash_id(self, algorithm=None):
+        info = _fields_info(self.__class__)
+        args_txt = _canonical_encoder.encode(dict(zip(info.hashed, info.get_hashed(self))))
+        digest = _hash_constructor(algorithm or self.hash_algorithm)(args_txt.encode())
+        return digest.hexdigest()
+
+    def make_arguments_id(self, algorithm=None):
+        """Hash dos argumentos sem o `_timestamp`: não muda quando o script é relançado."""
+        info = _fields_info(self.__class__)
+        args = dict(zip(info.hashed, info.get_hashed(self)))
+        args.pop('_timestamp', None)
+        digest = _hash_constructor(algorithm or self.hash_algorithm)(_canonical_encoder.encode(args).encode())
+        return digest.hexdigest()
 
     @property
     def hash_id(self):
@@ -119,9 +315,7 @@ class BaseParams:
 
     def get_base_folder_name_from_arguments(self):
         template = self.template_folder_name()
-        args = asdict(self)
-        args['hash_id'] = self.hash_id
-        return Path(template.format(**args))
+        return Path(template.format_map(_TemplateArgs(self)))
 
     def get_default_folder(self, key=None, ensure_exists=True):
         if key is None:
@@ -129,10 +323,15 @@ class BaseParams:
         else:
             folder = self.get_base_folder_name_from_arguments() / key
 
-        if not folder.exists() and ensure_exists:
+        if not folder.exists() and ensure_exists and not self._is_packed():
             folder.mkdir(parents=True, exist_ok=True)
         return folder
 
+    def _is_packed(self):
+        # execução terminada e empacotada: a pasta é lida de dentro do zip, não recriada
+        from .archive import is_packed
+        return is_packed(self.get_base_folder_name_from_arguments())
+
     @property
     def base_folder(self):
         return self.get_base_folder_name_from_arguments()
@@ -155,6 +354,31 @@ class BaseParams:
     def dir_images(self, ensure_exists=True):
         return self.get_default_folder('images', ensure_exists)
 
+    # -------------------------
+    # Instrumentação
+    # -------------------------
+    def timer(self, name):
+        """Cronômetro da fase `name` (contexto ou decorador); ver `mrlab.profiling`."""
+        return get_profiler(self).timer(name)
+
+@dataclass
+class BaseParams(_ParamsMixin):
+
+    _hash_id : str = field(default=None, init=False, repr=False, hash=False)
+    _timestamp: str = field(default_factory=lambda: datetime.now().isoformat(), repr=False)
+
+@dataclass(slots=True)
+class SlotsParams(_ParamsMixin):
+    """Variante de `BaseParams` com `__slots__`: instâncias menores e sem `__dict__`.
+
+    As subclasses também precisam de `@dataclass(slots=True)`. Os argumentos,
+    o `hash_id` e as pastas são os mesmos de um `BaseParams` com os mesmos campos.
+    """
+
+    # com `slots` não há atributo de classe com o default: o __init__ precisa atribuir
+    _hash_id : str = field(default_factory=lambda: None, init=False, repr=False, hash=False)
+    _timestamp: str = field(default_factory=lambda: datetime.now().isoformat(), repr=False)
+
 @dataclass
 class MyParameters(BaseParams):
 
@@ -0,0 +1,282 @@
+import json
+import os
+from pathlib import Path
+
+INDEX_FILENAME = 'index.json'
+
+# -------------------------
+# Formato
+# -------------------------
+# `dir_predictions() / name /` guarda os shards `shard-00000.npy`, ... e um
+# `index.json` com o dtype, a forma de cada linha e quantas linhas cada shard
+# tem. Um shard é um `.npy` comum: o cabeçalho reserva espaço para `shard_rows`
+# linhas e é regravado com o número real quando o shard é fechado. O leitor
+# confia só no índice, então um shard interrompido no meio continua legível
+# até a última linha registrada.
+
+def _npy_header(dtype, shape, size=None):
+    import numpy as np
+    header = repr({
+        'descr' : np.lib.format.dtype_to_descr(dtype),
+        'fortran_order' : False,
+        'shape' : tuple(shape),
+    })
+    if size is None:
+        # cabeçalho da versão 1.0 alinhado em 64 bytes, como o numpy grava
+        size = len(header) + 1 + (-(10 + len(header) + 1) % 64)
+    header = header.ljust(size - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+def _atomic_write_json(filepath, content):
+    tmp = filepath.with_name(f'.{filepath.name}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(content, f)
+    os.replace(tmp, filepath)
+
+
+def _check_dtype(dtype):
+    # objetos Python seriam gravados como ponteiros: ilegíveis em outro processo
+    if dtype.hasobject:
+        raise ValueError(f'Predictions must have a fixed-size dtype without Python objects: got {dtype}')
+    return dtype
+
+
+class PredictionsWriter:
+    """Acrescenta predições (arrays de dtype fixo) em shards `.npy` de `params.dir_predictions()`.
+
+    O primeiro `append` define o dtype e a forma de cada linha, a menos que
+    `dtype`/`shape` sejam dados. Cada shard tem até `shard_rows` linhas; o
+    índice é atualizado a cada `flush` e ao fechar um shard.
+
+        with PredictionsWriter(params, name='test') as writer:
+            for batch in loader:
+                writer.append(model(batch).argmax(1))
+    """
+
+    def __init__(self, params, name='predictions', dtype=None, shape=None, shard_rows=1 << 20):
+        import numpy as np
+        from .archive import writable_folder
+        self.folder = Path(writable_folder(params.dir_predictions()), name)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.folder / INDEX_FILENAME
+        self.shard_rows = shard_rows
+        self.dtype = None if dtype is None else _check_dtype(np.dtype(dtype))
+        self.shape = None if shape is None else tuple(shape)
+        self.shards = []
+        self._file = None
+        self._header_size = None
+        # escrever de novo no mesmo nome recomeça a série
+        for filepath in self.folder.glob('shard-*.npy'):
+            filepath.unlink()
+        self.index_path.unlink(missing_ok=True)
+
+    def __len__(self):
+        return sum(shard['rows'] for shard in self.shards)
+
+    def _open_shard(self):
+        name = f'shard-{len(self.shards):05d}.npy'
+        header = _npy_header(self.dtype, (self.shard_rows,) + self.shape)
+        self._header_size = len(header)
+        self._file = open(self.folder / name, 'wb')
+        self._file.write(header)
+        self.shards.append({'file' : name, 'rows' : 0, 'offset' : len(header)})
+
+    def _close_shard(self):
+        shard = self.shards[-1]
+        # cabeçalho com o número real de linhas, do mesmo tamanho do reservado
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, (shard['rows'],) + self.shape, self._header_size - 10))
+        self._file.close()
+        self._file = None
+
+    def append(self, array):
+        import numpy as np
+        if self.dtype is None:
+            self.dtype = _check_dtype(np.asarray(array).dtype)
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        if self.shape is None:
+            self.shape = array.shape[1:]
+        if array.shape[1:] != self.shape:
+            raise ValueError(f'Expected rows with shape {self.shape}: got {array.shape[1:]}')
+        start = 0
+        while start < len(array):
+            if self._file is None:
+                self._open_shard()
+            shard = self.shards[-1]
+            stop = min(len(array), start + self.shard_rows - shard['rows'])
+            self._file.write(array[start:stop].data)
+            shard['rows'] += stop - start
+            start = stop
+            if shard['rows'] == self.shard_rows:
+                self._close_shard()
+                self._write_index()
+
+    def _write_index(self):
+        import numpy as np
+        _atomic_write_json(self.index_path, {
+            'dtype' : None if self.dtype is None else np.lib.format.dtype_to_descr(self.dtype),
+            'shape' : None if self.shape is None else list(self.shape),
+            'rows' : len(self),
+            'shards' : self.shards,
+        })
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+        self._write_index()
+
+    def close(self):
+        if self._file is not None:
+            self._close_shard()
+        self._write_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -------------------------
+# Leitura
+# -------------------------
+def _dtype_from_index(descr):
+    import numpy as np
+    if isinstance(descr, str):
+        return np.dtype(descr)
+    # dtypes estruturados vêm como lista de campos no json
+    return np.dtype([tuple(field) for field in descr])
+
+
+class PredictionsReader:
+    """Leitura de um conjunto de predições gravado por `PredictionsWriter`.
+
+    Os shards são abertos como `np.memmap` somente leitura: fatias dentro de um
+    shard não copiam dados. `iter_chunks` percorre as linhas em blocos sem
+    carregar o conjunto inteiro.
+    """
+
+    def __init__(self, path_or_params, name='predictions'):
+        if not isinstance(path_or_params, (str, os.PathLike)):
+            path_or_params = Path(path_or_params.dir_predictions(ensure_exists=False), name)
+        from .archive import open_file
+        self.folder = Path(path_or_params)
+        with open_file(self.folder / INDEX_FILENAME, 'r') as f:
+            index = json.load(f)
+        self.dtype = None if index['dtype'] is None else _dtype_from_index(index['dtype'])
+        self.shape = tuple(index['shape'] or ())
+        self.shards = [s for s in index['shards'] if s['rows'] > 0]
+        self._starts = [0]
+        for shard in self.shards:
+            self._starts.append(self._starts[-1] + shard['rows'])
+        self._maps = [None] * len(self.shards)
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def shard(self, i):
+        import numpy as np
+        if self._maps[i] is None:
+            shard = self.shards[i]
+            filepath, start = self.folder / shard['file'], 0
+            if not filepath.exists():
+                # execução empacotada: o shard é mapeado dentro do próprio zip
+                from .archive import member_range
+                filepath, start, _ = member_range(filepath)
+            self._maps[i] = np.memmap(
+                filepath, dtype=self.dtype, mode='r',
+                offset=start + shard['offset'], shape=(shard['rows'],) + self.shape,
+            )
+        return self._maps[i]
+
+    def __getitem__(self, index):
+        import numpy as np
+        if not isinstance(index, slice):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(f'prediction index out of range: {index}')
+            i = np.searchsorted(self._starts, index, side='right') - 1
+            return self.shard(i)[index - self._starts[i]]
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            return self[start:stop][::step]
+        parts = []
+        for i in range(len(self.shards)):
+            lo, hi = max(start, self._starts[i]), min(stop, self._starts[i + 1])
+            if lo < hi:
+                parts.append(self.shard(i)[lo - self._starts[i]:hi - self._starts[i]])
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.empty((0,) + self.shape, dtype=self.dtype)
+        # só copia quando a fatia atravessa shards
+        return np.concatenate(parts)
+
+    def iter_chunks(self, chunk_rows=1 << 16):
+        for start in range(0, len(self), chunk_rows):
+            yield self[start:start + chunk_rows]
+
+    def read(self):
+        return self[:]
+
+
+def read_predictions(path_or_params, name='predictions'):
+    return PredictionsReader(path_or_params, name=name)
+
+
+# -------------------------
+# Comparação entre execuções
+# -------------------------
+def _readers(sources, name):
+    readers = [s if isinstance(s, PredictionsReader) else PredictionsReader(s, name=name) for s in sources]
+    if len({len(r) for r in readers}) > 1:
+        raise ValueError(f'All runs must have the same number of predictions: got {[len(r) for r in readers]}')
+    return readers
+
+def iter_aligned(sources, name='predictions', chunk_rows=1 << 16):
+    """Blocos alinhados (mesmas linhas) das predições de várias execuções."""
+    readers = _readers(sources, name)
+    for start in range(0, len(readers[0]) if readers else 0, chunk_rows):
+        yield [r[start:start + chunk_rows] for r in readers]
+
+def _labels(chunk):
+    # probabilidades/logits por classe viram o rótulo previsto
+    return chunk.argmax(axis=-1) if chunk.ndim > 1 else chunk
+
+def ensemble(sources, name='predictions', method='mean', chunk_rows=1 << 16):
+    """Combina as predições de várias execuções, bloco a bloco.
+
+    `method='mean'` faz a média (ex.: probabilidades); `'vote'` escolhe o
+    rótulo mais votado (em empate, o da primeira execução). Só o resultado
+    fica em memória.
+    """
+    import numpy as np
+    if method not in ('mean', 'vote'):
+        raise ValueError(f"method must be 'mean' or 'vote': got {method!r}")
+    parts = []
+    for chunks in iter_aligned(sources, name, chunk_rows):
+        if method == 'mean':
+            total = np.zeros(chunks[0].shape, dtype=np.float64)
+            for chunk in chunks:
+                total += chunk
+            parts.append(total / len(chunks))
+        else:
+            labels = np.stack([_labels(chunk) for chunk in chunks])
+            votes = np.stack([(labels == labels[j]).sum(axis=0) for j in range(len(labels))])
+            parts.append(np.take_along_axis(labels, votes.argmax(axis=0)[None], axis=0)[0])
+    return np.concatenate(parts) if parts else np.empty(0)
+
+def agreement(sources, name='predictions', chunk_rows=1 << 16):
+    """Fração das linhas em que cada par de execuções prevê o mesmo rótulo (matriz k x k)."""
+    import numpy as np
+    readers = _readers(sources, name)
+    k = len(readers)
+    equal = np.zeros((k, k), dtype=np.int64)
+    for chunks in iter_aligned(readers, name, chunk_rows):
+        labels = [_labels(chunk) for chunk in chunks]
+        for i in range(k):
+            for j in range(i, k):
+                equal[i, j] += np.count_nonzero(labels[i] == labels[j])
+    equal = np.triu(equal) + np.triu(equal, 1).T
+    return equal / max(len(readers[0]), 1) if readers else equal.astype(float)
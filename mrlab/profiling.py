@@ -0,0 +1,303 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from pathlib import Path
+
+TIMINGS_FILENAME = 'timings.json'
+STACKS_FILENAME = 'profile.folded'
+
+# histograma em escala log2 de nanossegundos: o balde de `ns` é `ns.bit_length()`
+_N_BUCKETS = 64
+# durações acumuladas numa lista por fase antes de entrar no histograma
+_DRAIN_SIZE = 4096
+
+def _bucket_value(bucket):
+    # meio geométrico do intervalo [2^(b-1), 2^b) em segundos
+    if bucket == 0:
+        return 0.0
+    return 2 ** (bucket - 0.5) / 1e9
+
+
+class _Phase:
+    __slots__ = ('count', 'total', 'min', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.histogram = [0] * _N_BUCKETS
+
+    def add_many(self, durations):
+        import numpy as np
+        values = np.asarray(durations, dtype=np.int64)
+        self.count += len(values)
+        self.total += int(values.sum())
+        low, high = int(values.min()), int(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = max(self.max, high)
+        # expoente do frexp == bit_length para inteiros positivos
+        buckets = np.minimum(np.frexp(values.astype(np.float64))[1], _N_BUCKETS - 1)
+        for bucket, count in enumerate(np.bincount(buckets, minlength=_N_BUCKETS)):
+            self.histogram[bucket] += int(count)
+
+    def percentile(self, q):
+        target = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return _bucket_value(bucket)
+        return 0.0
+
+    def summary(self):
+        return {
+            'count' : self.count,
+            'total' : self.total / 1e9,
+            'mean' : self.total / self.count / 1e9 if self.count else 0.0,
+            'min' : (self.min or 0) / 1e9,
+            'max' : self.max / 1e9,
+            'p50' : self.percentile(50),
+            'p90' : self.percentile(90),
+            'p99' : self.percentile(99),
+            # só os baldes usados: {expoente base 2 em ns : contagem}
+            'histogram' : {b : c for b, c in enumerate(self.histogram) if c},
+        }
+
+
+class _Timer:
+    __slots__ = ('profiler', 'name', 'samples', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.samples = profiler._samples(name)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        # caminho quente: só um append (atômico com o GIL, sem lock)
+        samples = self.samples
+        samples.append(end - self.start)
+        if len(samples) >= _DRAIN_SIZE or end >= self.profiler._next_flush:
+            self.profiler._drain(self.name, end)
+
+    def __call__(self, func):
+        profiler, name = self.profiler, self.name
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(profiler, name):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class Profiler:
+    """Tempos por fase de uma execução, gravados em `params.dir_logs() / 'timings.json'`.
+
+    Cada fase guarda contagem, total, mínimo, máximo e um histograma em escala
+    log2 (percentis aproximados), tudo em memória. O resumo é gravado a cada
+    `flush_interval` segundos (na saída de um timer), em `flush()` e no fim do
+    processo.
+
+        with params.timer('dataload'):
+            batch = next(loader)
+
+        @params.timer('forward')
+        def forward(batch):
+            ...
+
+    `start_sampling` liga um perfilador por amostragem: uma thread lê a pilha
+    da thread monitorada a cada `interval` segundos e `flush` grava as pilhas
+    agregadas em `profile.folded` (formato dos flame graphs).
+    """
+
+    def __init__(self, params, flush_interval=30.0):
+        self.params = params
+        self.flush_interval = flush_interval
+        self.phases = dict()
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._buffers = dict()
+        self._next_flush = time.perf_counter_ns() + int(flush_interval * 1e9) if flush_interval else float('inf')
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def timer(self, name):
+        return _Timer(self, name)
+
+    def _samples(self, name):
+        samples = self._buffers.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self._buffers.setdefault(name, [])
+        return samples
+
+    def record(self, name, ns):
+        self._samples(name).append(ns)
+
+    def _drain(self, name=None, now=None):
+        with self._lock:
+            for phase_name in ([name] if name is not None else list(self._buffers)):
+                samples = self._buffers[phase_name]
+                n = len(samples)
+                if n == 0:
+                    continue
+                chunk = samples[:n]
+                # remove só o que foi lido: appends concorrentes continuam na lista
+                del samples[:n]
+                phase = self.phases.get(phase_name)
+                if phase is None:
+                    phase = self.phases[phase_name] = _Phase()
+                phase.add_many(chunk)
+        if now is not None and now >= self._next_flush:
+            self._next_flush = now + int(self.flush_interval * 1e9)
+            self.flush()
+
+    def summary(self):
+        self._drain()
+        with self._lock:
+            return {name : phase.summary() for name, phase in self.phases.items()}
+
+    # -------------------------
+    # Amostragem de pilhas
+    # -------------------------
+    def start_sampling(self, interval=0.01, thread=None):
+        if self._sampler is not None:
+            return self
+        target = (thread or threading.main_thread()).ident
+        self._stop.clear()
+        def run():
+            while not self._stop.wait(interval):
+                frame = sys._current_frames().get(target)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{Path(code.co_filename).stem}:{code.co_name}')
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[';'.join(reversed(stack))] += 1
+        self._sampler = threading.Thread(target=run, name='mrlab-profiler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop_sampling(self):
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    # -------------------------
+    # Gravação
+    # -------------------------
+    def flush(self):
+        from .archive import writable_folder
+        folder = writable_folder(self.params.dir_logs())
+        content = {'hash_id' : self.params.hash_id, 'updated' : time.time(), 'phases' : self.summary()}
+        filepath = folder / TIMINGS_FILENAME
+        tmp = folder / f'.{TIMINGS_FILENAME}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(content, f)
+        os.replace(tmp, filepath)
+        if self.stacks:
+            # cópia: a thread de amostragem pode estar alterando o contador
+            stacks = sorted(dict(self.stacks).items(), key=lambda item: -item[1])
+            with open(folder / STACKS_FILENAME, 'w') as f:
+                for stack, count in stacks:
+                    f.write(f'{stack} {count}\n')
+        return filepath
+
+    def close(self):
+        """Para a amostragem, grava o resumo e tira o perfilador do registro do processo."""
+        with _PROFILERS_LOCK:
+            if _PROFILERS.get(self.params.hash_id) is self:
+                del _PROFILERS[self.params.hash_id]
+        self.stop_sampling()
+        self.flush()
+
+
+# -------------------------
+# Um perfilador por execução (hash_id) no processo
+# -------------------------
+# Os perfiladores ficam registrados até `close()` (ou `close_profiler`, que o
+# `SweepExecutor` e o `run_worker` chamam no fim de cada trial); os que sobram
+# são gravados no fim do processo.
+_PROFILERS = dict()
+_PROFILERS_LOCK = threading.Lock()
+_ATEXIT_REGISTERED = False
+
+def get_profiler(params, flush_interval=30.0):
+    global _ATEXIT_REGISTERED
+    profiler = _PROFILERS.get(params.hash_id)
+    if profiler is None:
+        with _PROFILERS_LOCK:
+            profiler = _PROFILERS.get(params.hash_id)
+            if profiler is None:
+                profiler = _PROFILERS[params.hash_id] = Profiler(params, flush_interval)
+            if not _ATEXIT_REGISTERED:
+                atexit.register(_flush_all)
+                _ATEXIT_REGISTERED = True
+    return profiler
+
+def close_profiler(params):
+    """Fecha o perfilador da execução de `params`, se houver um; devolve se havia."""
+    profiler = _PROFILERS.get(params.hash_id)
+    if profiler is None:
+        return False
+    profiler.close()
+    return True
+
+def _flush_all():
+    for profiler in list(_PROFILERS.values()):
+        try:
+            profiler.close()
+        except OSError:
+            pass
+
+
+# -------------------------
+# Leitura
+# -------------------------
+def read_timings(path):
+    """Resumo de tempos de uma execução; `path` é o arquivo ou um objeto de params."""
+    if not isinstance(path, (str, os.PathLike)):
+        path = Path(path.dir_logs(ensure_exists=False), TIMINGS_FILENAME)
+    from .archive import open_file
+    with open_file(path, 'r') as f:
+        return json.load(f)
+
+def collect_timings(source, columns=('count', 'total', 'mean', 'p50', 'p90', 'p99')):
+    """Tabela (dict de arrays numpy) com uma linha por execução e fase.
+
+    `source` é a pasta base de um experimento ou um iterável de params, como
+    em `collect_metrics`; os argumentos de cada execução viram colunas.
+    """
+    import numpy as np
+    from .understand import _concat_tables, _runs_from_source
+
+    runs, _ = _runs_from_source(source)
+    tables = []
+    for hash_id, metrics_folder, arguments in runs:
+        filepath = Path(metrics_folder).parent / 'logs' / TIMINGS_FILENAME
+        try:
+            phases = read_timings(filepath)['phases']
+        except (FileNotFoundError, ValueError, KeyError):
+            continue
+        names = sorted(phases)
+        table = {'hash_id' : np.full(len(names), hash_id), 'phase' : np.array(names, dtype=str)}
+        for column in columns:
+            table[column] = np.array([phases[name][column] for name in names], dtype=float)
+        for key, value in arguments.items():
+            column = np.empty(len(names), dtype=object)
+            for i in range(len(names)):
+                column[i] = value
+            table[key] = column
+        tables.append(table)
+    return _concat_tables(tables)
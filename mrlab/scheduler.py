@@ -0,0 +1,151 @@
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from .metrics import SUFFIX, read_metrics
+from .search import RandomSearch
+
+RUNNING = 'running'
+PAUSED = 'paused'
+COMPLETED = 'completed'
+
+@dataclass
+class Trial:
+    params: object
+    rung: int = 0
+    budget: float = None
+    state: str = RUNNING
+    results: dict = field(default_factory=dict)
+
+    @property
+    def hash_id(self):
+        return self.params.hash_id
+
+
+class ASHAScheduler:
+    """Successive halving assíncrono (ASHA) sobre os samplers do `RandomSearch`.
+
+    Cada trial recebe um orçamento (`budget`, ex.: épocas ou passos) do degrau
+    em que está: `min_resource * reduction_factor ** rung`, até `max_resource`.
+    Quando um trial termina o degrau, seu resultado é registrado com `report`
+    (ou lido de `dir_metrics()` por `update_from_metrics`). `next_trial` promove
+    um trial pausado que esteja entre os `1 / reduction_factor` melhores do seu
+    degrau ou, se não houver, amostra uma nova configuração. Trials promovidos
+    mantêm o mesmo `hash_id`: o treino deve continuar do último checkpoint.
+
+        scheduler = ASHAScheduler(values, initial, max_resource=81, metric='loss')
+        while (job := scheduler.next_trial()) is not None:
+            params, budget = job
+            loss = train(params, epochs=budget)
+            scheduler.report(params.hash_id, loss)
+    """
+
+    def __init__(self, values, initial, min_resource=1, max_resource=81, reduction_factor=3,
+                 metric='loss', mode='min', resource='step', n_samples=None, seed=None):
+        if mode not in ('min', 'max'):
+            raise ValueError(f"mode must be 'min' or 'max': got {mode!r}")
+        if reduction_factor < 2:
+            raise ValueError(f'reduction_factor must be at least 2: got {reduction_factor}')
+        self.min_resource = min_resource
+        self.max_resource = max_resource
+        self.reduction_factor = reduction_factor
+        self.metric = metric
+        self.mode = mode
+        self.resource = resource
+        n_samples = math.inf if n_samples is None else n_samples
+        self.search = RandomSearch(n_samples, values, initial=initial, seed=seed)
+        self.n_rungs = int(math.floor(math.log(max_resource / min_resource, reduction_factor) + 1e-9)) + 1
+        self.rungs = [dict() for _ in range(self.n_rungs)]
+        self.trials = dict()
+
+    def budget(self, rung):
+        return min(self.min_resource * self.reduction_factor ** rung, self.max_resource)
+
+    def _sign(self, value):
+        return value if self.mode == 'min' else -value
+
+    # -------------------------
+    # Distribuição de trabalho
+    # -------------------------
+    def _promotable(self, rung):
+        results = self.rungs[rung]
+        n_top = len(results) // self.reduction_factor
+        if n_top == 0:
+            return None
+        top = sorted(results, key=lambda h: self._sign(results[h]))[:n_top]
+        for hash_id in top:
+            trial = self.trials[hash_id]
+            if trial.state == PAUSED and trial.rung == rung:
+                return hash_id
+        return None
+
+    def next_trial(self):
+        for rung in reversed(range(self.n_rungs - 1)):
+            hash_id = self._promotable(rung)
+            if hash_id is not None:
+                trial = self.trials[hash_id]
+                trial.state = RUNNING
+                trial.rung = rung + 1
+                trial.budget = self.budget(trial.rung)
+                return trial.params, trial.budget
+
+        for params in self.search:
+            if params.hash_id in self.trials:
+                continue
+            trial = Trial(params=params, rung=0, budget=self.budget(0))
+            self.trials[params.hash_id] = trial
+            return trial.params, trial.budget
+        return None
+
+    def report(self, hash_id, value, rung=None):
+        trial = self.trials[hash_id]
+        rung = trial.rung if rung is None else rung
+        if rung != trial.rung:
+            raise ValueError(f'Trial {hash_id} is at rung {trial.rung}: got a result for rung {rung}')
+        trial.results[rung] = value
+        self.rungs[rung][hash_id] = value
+        trial.state = COMPLETED if rung == self.n_rungs - 1 else PAUSED
+        return trial.state
+
+    def should_stop(self, hash_id):
+        """Se o trial deve parar agora: terminou o orçamento do degrau atual."""
+        trial = self.trials[hash_id]
+        return trial.state != RUNNING
+
+    # -------------------------
+    # Resultados lidos das pastas das execuções
+    # -------------------------
+    def _read_result(self, trial):
+        folder = trial.params.dir_metrics(ensure_exists=False)
+        for filepath in (Path(folder, 'metrics' + SUFFIX), Path(folder, 'metrics.csv')):
+            if filepath.exists():
+                metrics = read_metrics(filepath)
+                break
+        else:
+            return None
+        if self.metric not in metrics or self.resource not in metrics:
+            return None
+        resource = metrics[self.resource].astype(float)
+        if len(resource) == 0 or resource.max() < trial.budget:
+            return None
+        # valor da métrica no último registro dentro do orçamento do degrau
+        within = (resource <= trial.budget).nonzero()[0]
+        return float(metrics[self.metric][within[-1]]) if len(within) else None
+
+    def update_from_metrics(self):
+        reported = []
+        for hash_id, trial in self.trials.items():
+            if trial.state != RUNNING:
+                continue
+            value = self._read_result(trial)
+            if value is not None:
+                self.report(hash_id, value)
+                reported.append(hash_id)
+        return reported
+
+    def best(self):
+        for rung in reversed(range(self.n_rungs)):
+            results = self.rungs[rung]
+            if results:
+                hash_id = min(results, key=lambda h: self._sign(results[h]))
+                return self.trials[hash_id].params, results[hash_id]
+        return None
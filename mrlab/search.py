@@ -1,60 +1,259 @@
+import inspect
 import random
+import sys
 
-from collections.abc import Iterable
-from itertools import (
-    product
-)
-from scipy.stats import rv_continuous, rv_discrete
-from .params import BaseParams
+from collections.abc import Iterable, Sequence
+from copy import copy
+from math import prod
+from .params import BaseParams, SlotsParams
 
 def _check_params_values(search_values):
     for key, value in search_values.items():
-        if not isinstance(value, Iterable) or isinstance(value, str):
+        if isinstance(value, Conditional):
+            value.values = _check_params_values({key : value.values})[key]
+        elif not isinstance(value, Iterable) or isinstance(value, str):
             search_values[key] = (value,)
+        elif not isinstance(value, Sequence):
+            search_values[key] = tuple(value)
     return search_values
 
-def grid_search_params(search_values, initial=None):
-    search_values = _check_params_values(search_values)
-    keys, values = zip(*search_values.items())
-    combos = (dict(zip(keys, v)) for v in product(*values))
-    for combo in combos:
-        if isinstance(initial, BaseParams) :
-            yield initial.update(**combo)
-        elif isinstance(initial, dict):
-            params = dict(initial)
-            params.update(combo)
-            yield params
-        elif initial is None:
-            yield combo
+def _apply_initial(initial, combo):
+    if isinstance(initial, (BaseParams, SlotsParams)):
+        return initial.update(**combo)
+    elif isinstance(initial, dict):
+        params = dict(initial)
+        params.update(combo)
+        return params
+    elif initial is None:
+        return combo
+    else:
+        raise RuntimeError(f'Invalid initial value: expected BaseParams, dict or None, got {type(initial)}')
+
+def grid_search_params(search_values, initial=None, constraints=()):
+    yield from GridSearch(search_values, initial=initial, constraints=constraints)
+
+# -------------------------
+# Espaços condicionais e com restrições
+# -------------------------
+def _predicate_keys(predicate):
+    parameters = inspect.signature(predicate).parameters.values()
+    if any(p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in parameters):
+        raise ValueError(f'Cannot infer the keys used by {predicate}: pass them explicitly')
+    return tuple(p.name for p in parameters)
+
+def _allowed(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return lambda v: v in value
+    return lambda v: v == value
+
+class Constraint:
+    """Predicado sobre algumas chaves da busca: `Constraint(lambda model, batch_size: ...)`.
+
+    As chaves são os nomes dos argumentos do predicado (ou `keys`). A restrição é
+    avaliada assim que todas as chaves dela têm valor, podando a subárvore inteira.
+    Se alguma chave for condicional e estiver ausente, a restrição não se aplica.
+    """
+
+    def __init__(self, predicate, keys=None):
+        self.predicate = predicate
+        self.keys = tuple(keys) if keys is not None else _predicate_keys(predicate)
+
+    def __call__(self, **kwargs):
+        return self.predicate(**kwargs)
+
+class Conditional:
+    """Valores de um parâmetro que só existe quando `when` é satisfeito.
+
+    `when` é um dict `{chave: valor ou lista de valores}` ou um predicado sobre
+    chaves anteriores. Quando não é satisfeito, a chave fica de fora da
+    combinação (vale o valor de `initial`).
+    """
+
+    def __init__(self, values, when):
+        self.values = values
+        if isinstance(when, dict):
+            checks = {k : _allowed(v) for k, v in when.items()}
+            self.condition = Constraint(lambda **kw: all(checks[k](v) for k, v in kw.items()), keys=tuple(when))
         else:
-            raise RuntimeError
+            self.condition = when if isinstance(when, Constraint) else Constraint(when)
+
+_ABSENT = -1
+
+class _ConstrainedSpace:
+    # Árvore do produto cartesiano percorrida chave a chave. O número de pontos
+    # válidos abaixo de um nó só depende dos valores das chaves que ainda serão
+    # consultadas por condições/restrições, então a contagem é memorizada por isso.
+
+    def __init__(self, keys, values, conditions, constraints):
+        self.keys = keys
+        self.values = values
+        position = {k : i for i, k in enumerate(keys)}
+        for c in [c for c in conditions if c is not None] + list(constraints):
+            unknown = set(c.keys) - set(position)
+            if unknown:
+                raise ValueError(f'Unknown key(s) in constraint: {unknown}')
+
+        self.conditions = []
+        for i, condition in enumerate(conditions):
+            if condition is not None and any(position[k] >= i for k in condition.keys):
+                raise ValueError(f"The condition of '{keys[i]}' must only use keys that come before it")
+            self.conditions.append(
+                None if condition is None else (condition, tuple(position[k] for k in condition.keys))
+            )
+
+        self.constraints = [[] for _ in keys]
+        for constraint in constraints:
+            used = tuple(position[k] for k in constraint.keys)
+            self.constraints[max(used, default=0)].append((constraint, used))
+
+        n = len(keys)
+        self.live = []
+        for i in range(n + 1):
+            used = set()
+            for j in range(i, n):
+                if self.conditions[j] is not None:
+                    used.update(self.conditions[j][1])
+                for _, positions in self.constraints[j]:
+                    used.update(positions)
+            self.live.append(tuple(sorted(k for k in used if k < i)))
+        self._memo = dict()
+
+    def _kwargs(self, state, positions):
+        return {self.keys[k] : self.values[k][state[k]] for k in positions}
+
+    def _options(self, i, state):
+        condition = self.conditions[i]
+        if condition is not None:
+            predicate, positions = condition
+            if any(state[k] == _ABSENT for k in positions) or not predicate(**self._kwargs(state, positions)):
+                return (_ABSENT,)
+        return range(len(self.values[i]))
+
+    def _accepts(self, i, state):
+        for constraint, positions in self.constraints[i]:
+            if any(state[k] == _ABSENT for k in positions):
+                continue
+            if not constraint(**self._kwargs(state, positions)):
+                return False
+        return True
+
+    def count(self, i=0, state=()):
+        if i == len(self.keys):
+            return 1
+        key = (i, tuple(state[k] for k in self.live[i]))
+        total = self._memo.get(key)
+        if total is None:
+            total = 0
+            for option in self._options(i, state):
+                child = state + (option,)
+                if self._accepts(i, child):
+                    total += self.count(i + 1, child)
+            self._memo[key] = total
+        return total
+
+    def decode(self, index):
+        state = ()
+        for i in range(len(self.keys)):
+            for option in self._options(i, state):
+                child = state + (option,)
+                if not self._accepts(i, child):
+                    continue
+                size = self.count(i + 1, child)
+                if index < size:
+                    state = child
+                    break
+                index -= size
+        return {
+            key : self.values[i][option]
+            for i, (key, option) in enumerate(zip(self.keys, state)) if option != _ABSENT
+        }
 
 class GridSearch:
+    """Produto cartesiano dos valores com acesso aleatório.
 
-    def __init__(self, values : dict, initial=None):
+    O i-ésimo ponto é decodificado do índice em base mista (a última chave varia
+    mais rápido, como em `itertools.product`), então `len`, indexação, fatias e
+    `shard` não materializam as combinações.
+
+    Com valores `Conditional` ou `constraints`, as combinações inválidas são
+    podadas durante o percurso da árvore do produto, e `len` conta os pontos
+    válidos sem enumerá-los.
+    """
+
+    def __init__(self, values : dict, initial=None, constraints=()):
         self.search_space = _check_params_values(values)
         self.initial = initial
-        keys, values = zip(*self.search_space.items())
-        self.combo_iter = (dict(zip(keys, v)) for v in product(*values))
+        self.keys = tuple(self.search_space)
+        conditions = [v.condition if isinstance(v, Conditional) else None for v in self.search_space.values()]
+        self._values = tuple(
+            v.values if isinstance(v, Conditional) else v for v in self.search_space.values()
+        )
+        self._sizes = tuple(len(v) for v in self._values)
+        self.constraints = [c if isinstance(c, Constraint) else Constraint(c) for c in constraints]
+        self._space = None
+        if self.constraints or any(c is not None for c in conditions):
+            self._space = _ConstrainedSpace(self.keys, self._values, conditions, self.constraints)
+            self.indices = range(self._space.count())
+        else:
+            self.indices = range(prod(self._sizes))
+        self._counter = 0
+
+    def _view(self, indices):
+        view = copy(self)
+        view.indices = indices
+        view._counter = 0
+        return view
+
+    def combo(self, index):
+        if self._space is not None:
+            return self._space.decode(index)
+        combo = dict()
+        for key, values, size in zip(reversed(self.keys), reversed(self._values), reversed(self._sizes)):
+            index, position = divmod(index, size)
+            combo[key] = values[position]
+        return {k : combo[k] for k in self.keys}
+
+    def shard(self, rank, world_size):
+        if not 0 <= rank < world_size:
+            raise ValueError(f'rank must be in [0, {world_size}): got {rank}')
+        return self._view(self.indices[rank::world_size])
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(self.indices[index])
+        return _apply_initial(self.initial, self.combo(self.indices[index]))
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        combo = next(self.combo_iter)
-        if isinstance(self.initial, BaseParams):
-            params = self.initial.update(**combo)
-        elif isinstance(self.initial, dict):
-            params = dict(self.initial)
-            params.update(combo)
-        elif self.initial is None :
-            params = combo
-        else:
-            return RuntimeError
+        if self._counter >= len(self.indices):
+            raise StopIteration
+        params = self[self._counter]
+        self._counter += 1
         return params
 
+    def reset(self):
+        self._counter = 0
+
+def _to_python(value):
+    # escalares numpy viram tipos nativos para não mudar o hash dos params;
+    # se o numpy nem foi importado, o valor não pode ser um escalar dele
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(value, np.generic):
+        return value.item()
+    return value
+
 class Sampler:
-    def sample(self):
+    def sample(self, rng=None):
+        raise NotImplementedError
+    def sample_batch(self, n, rng=None):
+        return [self.sample(rng) for _ in range(n)]
+    def from_unit(self, u):
+        """Valores correspondentes aos pontos `u` em [0, 1) (amostragem quase aleatória)."""
         raise NotImplementedError
     def __str__(self):
         return f"{self.__class__.__name__}: <...>"
@@ -62,31 +261,82 @@ class Sampler:
 class ListSampler(Sampler):
     def __init__(self, values):
         self.values = values
+        self._array = None
+
+    def sample(self, rng=None):
+        if rng is None:
+            return random.choice(self.values)
+        return self.values[rng.integers(len(self.values))]
+
+    def _as_array(self):
+        import numpy as np
+        if self._array is None:
+            array = None
+            if len({type(v) for v in self.values}) == 1:
+                try:
+                    array = np.asarray(self.values)
+                except ValueError:
+                    # listas de tamanhos diferentes
+                    pass
+            if array is None or array.ndim != 1 or array.dtype.kind not in 'biufU':
+                array = np.empty(len(self.values), dtype=object)
+                for i, value in enumerate(self.values):
+                    array[i] = value
+            self._array = array
+        return self._array
+
+    def sample_batch(self, n, rng=None):
+        import numpy as np
+        if rng is None:
+            rng = np.random.default_rng()
+        return self._as_array()[rng.integers(len(self.values), size=n)]
 
-    def sample(self):
-        return random.choice(self.values)
+    def from_unit(self, u):
+        import numpy as np
+        # cada opção ocupa um intervalo de mesmo tamanho em [0, 1)
+        index = np.minimum((np.asarray(u) * len(self.values)).astype(int), len(self.values) - 1)
+        return self._as_array()[index]
 
 class CallableSampler(Sampler):
     def __init__(self, func):
         self.func = func
-    def sample(self):
+    def sample(self, rng=None):
         return self.func()
 
 class ScipySampler(Sampler):
     def __init__(self, dist):
         self.dist = dist
 
-    def sample(self):
-        return self.dist.rvs()
+    def sample(self, rng=None):
+        return self.dist.rvs(random_state=rng)
+
+    def sample_batch(self, n, rng=None):
+        return self.dist.rvs(size=n, random_state=rng)
+
+    def from_unit(self, u):
+        import numpy as np
+        # inversa da CDF: leva pontos uniformes para a distribuição; `ppf(0)` cai
+        # fora do suporte (-inf, ou um abaixo do mínimo nas discretas)
+        values = self.dist.ppf(np.maximum(u, np.finfo(float).tiny))
+        if hasattr(self.dist, 'pmf'):
+            values = values.astype(int)
+        return values
 
 class FixedSampler(Sampler):
     def __init__(self, value):
         self.value = value
-    def sample(self):
+    def sample(self, rng=None):
         return self.value
+    def sample_batch(self, n, rng=None):
+        return [self.value] * n
+    def from_unit(self, u):
+        return [self.value] * len(u)
 
 def make_sampler(param):
-    if isinstance(param, (rv_continuous, rv_discrete)):
+    if isinstance(param, Sampler):
+        return param
+    elif hasattr(param, 'rvs'):
+        # distribuições do scipy, congeladas (`stats.uniform(0, 1)`) ou não
         return ScipySampler(param)
     elif callable(param):
         return CallableSampler(param)
@@ -95,33 +345,248 @@ def make_sampler(param):
     else:
         return FixedSampler(param)
 
+class SampleBatch:
+    """Amostras em colunas; os params só são construídos quando acessados."""
+
+    def __init__(self, columns : dict, initial=None):
+        self.columns = columns
+        self.initial = initial
+        self._size = len(next(iter(columns.values()))) if columns else 0
+
+    def combo(self, index):
+        return {k : _to_python(column[index]) for k, column in self.columns.items()}
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if not -self._size <= index < self._size:
+            raise IndexError(f'sample index out of range: {index}')
+        return _apply_initial(self.initial, self.combo(index))
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+METHODS = ('random', 'sobol', 'lhs')
+
+# amostras sorteadas juntas (e com o mesmo fluxo do gerador) pelo RandomSearch
+SAMPLE_BLOCK = 4096
+
+def _supports_unit(sampler):
+    return type(sampler).from_unit is not Sampler.from_unit
+
+def _uses_rng(sampler):
+    # funções e valores fixos não recebem o gerador
+    return not isinstance(sampler, (CallableSampler, FixedSampler))
+
+def _as_column(values):
+    import numpy as np
+    if isinstance(values, np.ndarray) and values.ndim == 1:
+        return values
+    column = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        column[i] = value
+    return column
+
+
 class RandomSearch:
+    """Amostras aleatórias de `values`.
+
+    A amostra `i` é uma função pura de `(seed, i)`: os índices são agrupados em
+    blocos de `SAMPLE_BLOCK` amostras, e cada bloco usa seu próprio fluxo do
+    gerador, derivado da semente e do número do bloco. O bloco sorteia pontos
+    uniformes de uma vez, levados a cada distribuição pela `ppf` (listas pelo
+    índice da opção), só para as linhas usadas. Então `rs[i]`, fatias, `shard(rank, world_size)` e
+    `sample_batch` geram localmente as mesmas amostras de uma execução serial,
+    sem coordenação entre os workers e em qualquer ordem. Sem `seed`, uma
+    semente é sorteada e fixada na instância. Samplers que são funções
+    arbitrárias não recebem o gerador e ficam fora dessa garantia.
+
+    Com `method='sobol'` ou `method='lhs'` (Latin hypercube) as amostras vêm de
+    uma sequência de baixa discrepância conjunta entre os parâmetros, que cobre
+    o espaço de forma mais uniforme com poucos trials. Distribuições do scipy
+    são mapeadas pela `ppf` e listas pelo índice da opção; samplers que não
+    suportam o mapeamento (funções) continuam independentes. No modo 'lhs' o
+    plano inteiro (`n_samples` pontos) é gerado de uma vez.
+    """
 
-    def __init__(self, n_samples, values:dict, initial=None):
+    def __init__(self, n_samples, values:dict, initial=None, seed=None, method='random'):
+        import numpy as np
+        if method not in METHODS:
+            raise ValueError(f'method must be one of {METHODS}: got {method!r}')
+        if method == 'lhs' and not isinstance(n_samples, int):
+            raise ValueError("method='lhs' requires a finite integer n_samples")
         self.n_samples = n_samples
         self.initial = initial
+        self.method = method
         self.samplers = {k : make_sampler(v) for k, v in values.items()}
+        if seed is None:
+            # semente fixa por instância: as amostras precisam ser reproduzíveis pelo índice
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        self.seed = seed
+        # busca sem limite (ex.: `n_samples=math.inf` no ASHA)
+        self.indices = range(n_samples if n_samples != float('inf') else sys.maxsize)
+        self._unit_keys = [k for k, s in self.samplers.items() if method != 'random' and _supports_unit(s)]
+        # fora dos modos quase aleatórios: uniformes do bloco, ou o gerador do bloco para
+        # samplers que não sabem converter pontos uniformes
+        drawn = [k for k, s in self.samplers.items() if k not in self._unit_keys and _uses_rng(s)]
+        self._random_keys = [k for k in drawn if _supports_unit(self.samplers[k])]
+        self._drawn_keys = [k for k in drawn if k not in self._random_keys]
+        self._block = None
+        self._engine = None
+        self._engine_position = 0
+        self._design = None
         self._counter = 0
 
+    def _view(self, indices):
+        view = copy(self)
+        view.indices = indices
+        view._block = None
+        view._engine = None
+        view._counter = 0
+        return view
+
+    # -------------------------
+    # Sequências quase aleatórias
+    # -------------------------
+    def _unit_points(self, start, n):
+        """Pontos `start` até `start + n` da sequência, em [0, 1)^d."""
+        import warnings
+        from scipy.stats import qmc
+        d = len(self._unit_keys)
+        if self.method == 'lhs':
+            if self._design is None:
+                self._design = qmc.LatinHypercube(d, seed=self.seed).random(self.n_samples)
+            return self._design[start:start + n]
+        if self._engine is None or self._engine_position != start:
+            self._engine = qmc.Sobol(d, scramble=True, seed=self.seed)
+            if start > 0:
+                self._engine.fast_forward(start)
+        with warnings.catch_warnings():
+            # o aviso sobre potências de 2 não se aplica a uma busca incremental
+            warnings.simplefilter('ignore', UserWarning)
+            points = self._engine.random(n)
+        self._engine_position = start + n
+        return points
+
+    def _unit_columns(self, indices):
+        import numpy as np
+        if not self._unit_keys or len(indices) == 0:
+            return {}
+        # `indices` é um range com qualquer passo: gera o bloco contíguo que o
+        # cobre e escolhe as linhas
+        lo, hi = min(indices[0], indices[-1]), max(indices[0], indices[-1])
+        points = self._unit_points(lo, hi - lo + 1)
+        if indices.step != 1:
+            points = points[np.arange(indices.start, indices.stop, indices.step) - lo]
+        return {k : self.samplers[k].from_unit(points[:, j]) for j, k in enumerate(self._unit_keys)}
+
+    # -------------------------
+    # Acesso pelo índice
+    # -------------------------
+    def block_rng(self, block):
+        """Gerador exclusivo do bloco `block` (amostras `block * SAMPLE_BLOCK` em diante)."""
+        import numpy as np
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(block,)))
+
+    def _block_values(self, block):
+        # (uniformes, colunas sorteadas, colunas convertidas) do bloco; o último
+        # bloco usado fica guardado: a iteração sorteia cada bloco uma vez
+        if self._block is not None and self._block[0] == block:
+            return self._block[1]
+        rng = self.block_rng(block)
+        unit = rng.random((len(self._random_keys), SAMPLE_BLOCK))
+        drawn = {k : _as_column(self.samplers[k].sample_batch(SAMPLE_BLOCK, rng)) for k in self._drawn_keys}
+        values = (unit, drawn, dict())
+        self._block = (block, values)
+        return values
+
+    def _sampled_columns(self, indices):
+        import numpy as np
+        if not (self._random_keys or self._drawn_keys) or len(indices) == 0:
+            return {}
+        index = np.arange(indices.start, indices.stop, indices.step)
+        blocks = index // SAMPLE_BLOCK
+        # `indices` é monótono: um trecho contíguo por bloco
+        starts = np.flatnonzero(np.diff(blocks)) + 1
+        units, pieces = [], {k : [] for k in self._drawn_keys}
+        for rows in np.split(index, starts):
+            block = int(rows[0] // SAMPLE_BLOCK)
+            unit, drawn, _ = self._block_values(block)
+            rows = rows - block * SAMPLE_BLOCK
+            if indices.step == 1:
+                # caso comum: um trecho contíguo do bloco, sem cópia
+                rows = slice(rows[0], rows[-1] + 1)
+            units.append(unit[:, rows])
+            for k in self._drawn_keys:
+                pieces[k].append(drawn[k][rows])
+        unit = units[0] if len(units) == 1 else np.concatenate(units, axis=1)
+        columns = {k : self.samplers[k].from_unit(unit[j]) for j, k in enumerate(self._random_keys)}
+        columns.update({k : np.concatenate(p) for k, p in pieces.items()})
+        return columns
+
+    def combo(self, index):
+        unit = self._unit_columns(range(index, index + 1))
+        sampled = dict()
+        if self._random_keys or self._drawn_keys:
+            block, row = divmod(index, SAMPLE_BLOCK)
+            block_unit, drawn, converted = self._block_values(block)
+            for j, k in enumerate(self._random_keys):
+                if k not in converted:
+                    converted[k] = self.samplers[k].from_unit(block_unit[j])
+                sampled[k] = converted[k][row]
+            for k in self._drawn_keys:
+                sampled[k] = drawn[k][row]
+        return {
+            k : _to_python(unit[k][0] if k in unit else sampled[k] if k in sampled else s.sample())
+            for k, s in self.samplers.items()
+        }
+
+    def shard(self, rank, world_size):
+        if not 0 <= rank < world_size:
+            raise ValueError(f'rank must be in [0, {world_size}): got {rank}')
+        return self._view(self.indices[rank::world_size])
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(self.indices[index])
+        return _apply_initial(self.initial, self.combo(self.indices[index]))
+
     def __iter__(self):
         return self
 
     def __next__(self):
-        if self._counter >= self.n_samples:
+        if self._counter >= len(self.indices):
             raise StopIteration
-        combo = {k : s.sample() for k, s in self.samplers.items()}
-        if isinstance(self.initial, BaseParams):
-            params = self.initial.update(**combo)
-        elif isinstance(self.initial, dict):
-            params = dict(self.initial)
-            params.update(combo)
-        elif self.initial is None:
-            params = combo
-        else:
-            raise RuntimeError
-
+        params = self[self._counter]
         self._counter += 1
         return params
 
-    def reset(self):
-        self._counter = 0
\ No newline at end of file
+    def _unbounded(self, indices):
+        # o range de uma busca sem limite vai até `sys.maxsize` (em qualquer sentido)
+        return bool(indices) and max(indices[0], indices[-1]) + abs(indices.step) >= sys.maxsize
+
+    def sample_batch(self, n=None):
+        """Próximas `n` amostras (todas as restantes sem `n`) em colunas; avança a iteração."""
+        indices = self.indices[self._counter:]
+        if n is None:
+            if self._unbounded(indices):
+                raise ValueError('sample_batch needs n for an unbounded search (n_samples=inf)')
+        else:
+            indices = indices[:n]
+        n = len(indices)
+        columns = self._unit_columns(indices)
+        columns.update(self._sampled_columns(indices))
+        for k, s in self.samplers.items():
+            if k not in columns:
+                columns[k] = s.sample_batch(n)
+        columns = {k : columns[k] for k in self.samplers}
+        self._counter += n
+        return SampleBatch(columns, initial=self.initial)
+
+    def reset(self, start=0):
+        self._counter = start
@@ -0,0 +1,190 @@
+import json
+import os
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+)
+from datetime import datetime
+from pathlib import Path
+from .params import BaseParams, SlotsParams
+from .profiling import close_profiler
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+STATUS_FILENAME = 'status.json'
+
+def _write_status(folder, state, **extra):
+    from .archive import writable_folder
+    writable_folder(folder)
+    info = {'state' : state, 'updated' : datetime.now().isoformat()}
+    info.update(extra)
+    filepath = folder / STATUS_FILENAME
+    tmp = folder / f'.{STATUS_FILENAME}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(info, f)
+    os.replace(tmp, filepath)
+    return filepath
+
+def read_status(params):
+    from .archive import open_file
+    filepath = params.get_default_folder(ensure_exists=False) / STATUS_FILENAME
+    try:
+        with open_file(filepath, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+# -------------------------
+# Retomada entre lançamentos do script
+# -------------------------
+# O `hash_id` inclui o `_timestamp`, que muda toda vez que o script monta um
+# novo `initial`. Cada trial deixa um marcador
+# `<raiz>/.mrlab/resume/<id dos argumentos>.json` com o seu `_timestamp`, onde a
+# raiz é a pasta acima do componente `{hash_id}` do template; um novo
+# lançamento com os mesmos argumentos adota esse `_timestamp` e cai na mesma pasta.
+RESUME_FOLDER = Path('.mrlab', 'resume')
+
+def _resume_marker(params):
+    parts = params.get_base_folder_name_from_arguments().parts
+    if params.hash_id not in parts:
+        # a pasta não depende do `_timestamp`: nada a resolver
+        return None
+    root = Path(*parts[:parts.index(params.hash_id)])
+    return root / RESUME_FOLDER / f'{params.make_arguments_id()}.json'
+
+def resume_params(params):
+    """`params` com o `_timestamp` da execução anterior com os mesmos argumentos, se houver."""
+    marker = _resume_marker(params)
+    if marker is None:
+        return params
+    try:
+        with open(marker, 'r') as f:
+            timestamp = json.load(f)['_timestamp']
+    except (FileNotFoundError, ValueError, KeyError):
+        return params
+    if timestamp == params._timestamp:
+        return params
+    return params.update(_timestamp=timestamp)
+
+def register_run(params):
+    """Grava o marcador de retomada de `params`; o primeiro lançamento com esses argumentos vence."""
+    marker = _resume_marker(params)
+    if marker is None or marker.exists():
+        return
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    tmp = marker.with_name(f'.{marker.name}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'_timestamp' : params._timestamp, 'hash_id' : params.hash_id}, f)
+    try:
+        os.link(tmp, marker)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp)
+
+def _run_trial(func, params):
+    folder = params.get_default_folder()
+    _write_status(folder, RUNNING, pid=os.getpid())
+    try:
+        result = func(params)
+    except BaseException as e:
+        _write_status(folder, FAILED, error=repr(e), traceback=traceback.format_exc())
+        raise
+    finally:
+        close_profiler(params)
+    _write_status(folder, DONE)
+    return result
+
+
+class SweepExecutor:
+    """Executa `func(params)` para cada ponto de uma busca em paralelo.
+
+    O estado de cada trial (pending/running/done/failed) fica em `status.json`
+    dentro de `params.get_default_folder()`; trials já concluídos são pulados,
+    então rodar a mesma busca de novo retoma uma varredura interrompida, mesmo
+    num novo lançamento do script (novo `_timestamp`, ver `resume_params`).
+    Com `resume=False` um novo `_timestamp` começa trials novos.
+    """
+
+    def __init__(self, func, max_workers=None, executor='process', retry_failed=True, save_arguments=True, resume=True):
+        if executor not in ('process', 'thread'):
+            raise ValueError(f"executor must be 'process' or 'thread': got {executor!r}")
+        self.func = func
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = executor
+        self.retry_failed = retry_failed
+        self.save_arguments = save_arguments
+        self.resume = resume
+        self.results = dict()
+        self.failed = dict()
+        self.skipped = []
+
+    def _make_pool(self):
+        if self.executor == 'process':
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _should_skip(self, params):
+        status = read_status(params)
+        if status is None:
+            return False
+        if status['state'] == DONE:
+            return True
+        return status['state'] == FAILED and not self.retry_failed
+
+    def _submit(self, pool, params):
+        register_run(params)
+        folder = params.get_default_folder()
+        if self.save_arguments:
+            params.to_yaml()
+        _write_status(folder, PENDING)
+        return pool.submit(_run_trial, self.func, params)
+
+    def _collect(self, done, running):
+        for future in done:
+            hash_id = running.pop(future)
+            try:
+                self.results[hash_id] = future.result()
+            except Exception as e:
+                self.failed[hash_id] = e
+
+    def run(self, search):
+        seen = set()
+        running = dict()
+        # limita os trials em voo para não materializar a busca inteira
+        max_in_flight = 2 * self.max_workers
+        with self._make_pool() as pool:
+            for params in search:
+                if not isinstance(params, (BaseParams, SlotsParams)):
+                    raise TypeError(
+                        f"SweepExecutor needs BaseParams objects to locate the run folders: got {type(params)}"
+                        f"\n\tUse a search with `initial` set to a BaseParams instance."
+                    )
+                if self.resume:
+                    params = resume_params(params)
+                hash_id = params.hash_id
+                if hash_id in seen:
+                    continue
+                seen.add(hash_id)
+                if self._should_skip(params):
+                    self.skipped.append(hash_id)
+                    continue
+                if len(running) >= max_in_flight:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    self._collect(done, running)
+                running[self._submit(pool, params)] = hash_id
+            done, _ = wait(running)
+            self._collect(done, running)
+        return self.results
+
+
+def run_sweep(func, search, max_workers=None, executor='process', retry_failed=True):
+    sweep = SweepExecutor(func, max_workers=max_workers, executor=executor, retry_failed=retry_failed)
+    sweep.run(search)
+    return sweep
@@ -0,0 +1,216 @@
+import math
+from .params import canonical_json
+from .search import (
+    ListSampler,
+    ScipySampler,
+    _apply_initial,
+    _to_python,
+    make_sampler,
+)
+
+# -------------------------
+# Estimadores por parâmetro
+# -------------------------
+# Cada parâmetro é modelado separadamente (TPE independente). O sampler
+# original é a priori: distribuições do scipy são modeladas no espaço da CDF,
+# onde a priori é uniforme em [0, 1) e a `ppf` leva de volta ao valor; listas
+# são categóricas com a priori uniforme entre as opções.
+
+_EPS = 1e-6
+
+def _trial_key(params):
+    # sem `initial` as amostras são dicionários, sem hash_id
+    if isinstance(params, str):
+        return params
+    return params.hash_id if hasattr(params, 'hash_id') else canonical_json(params)
+
+class _ContinuousModel:
+
+    def __init__(self, sampler):
+        self.dist = sampler.dist
+        self.discrete = hasattr(self.dist, 'pmf')
+
+    def to_unit(self, values):
+        import numpy as np
+        values = np.asarray(values, dtype=float)
+        u = self.dist.cdf(values)
+        if self.discrete:
+            # centro do degrau da CDF do valor
+            u = u - 0.5 * self.dist.pmf(values)
+        return np.clip(u, _EPS, 1 - _EPS)
+
+    def from_unit(self, u):
+        return self.dist.ppf(u)
+
+    @staticmethod
+    def _bandwidth(points):
+        import numpy as np
+        # como no TPE original: cada ponto usa a maior distância até os
+        # vizinhos (as bordas de [0, 1) contam), limitada pelo tamanho da amostra
+        order = np.argsort(points)
+        edges = np.concatenate([[0.0], points[order], [1.0]])
+        gaps = np.maximum(edges[1:-1] - edges[:-2], edges[2:] - edges[1:-1])
+        sigma = np.empty(len(points))
+        sigma[order] = gaps
+        return np.clip(sigma, 1.0 / min(100, len(points) + 1), 1.0)
+
+    def sample(self, points, n, rng):
+        import numpy as np
+        if len(points) == 0:
+            return rng.random(n)
+        sigma = self._bandwidth(points)
+        # mistura: a priori uniforme tem o peso de um ponto observado
+        component = rng.integers(len(points) + 1, size=n)
+        u = rng.random(n)
+        kernel = component < len(points)
+        chosen = component[kernel]
+        u[kernel] = points[chosen] + sigma[chosen] * rng.standard_normal(len(chosen))
+        return np.clip(u, _EPS, 1 - _EPS)
+
+    def log_density(self, points, u):
+        import numpy as np
+        if len(points) == 0:
+            return np.zeros(len(u))
+        sigma = self._bandwidth(points)
+        z = (u[:, None] - points[None, :]) / sigma
+        kernels = np.exp(-0.5 * z ** 2) / (sigma[None, :] * math.sqrt(2 * math.pi))
+        return np.log((kernels.sum(axis=1) + 1.0) / (len(points) + 1))
+
+    def propose(self, good, bad, n_candidates, rng):
+        good, bad = self.to_unit(good), self.to_unit(bad)
+        u = self.sample(good, n_candidates, rng)
+        score = self.log_density(good, u) - self.log_density(bad, u)
+        return _to_python(self.from_unit(u[score.argmax()]))
+
+
+class _CategoricalModel:
+
+    def __init__(self, sampler):
+        self.values = list(sampler.values)
+
+    def _probabilities(self, observed):
+        import numpy as np
+        counts = np.ones(len(self.values))
+        for value in observed:
+            counts[self.values.index(value)] += 1
+        return counts / counts.sum()
+
+    def propose(self, good, bad, n_candidates, rng):
+        import numpy as np
+        p_good, p_bad = self._probabilities(good), self._probabilities(bad)
+        candidates = rng.choice(len(self.values), size=n_candidates, p=p_good)
+        score = np.log(p_good[candidates]) - np.log(p_bad[candidates])
+        return self.values[candidates[score.argmax()]]
+
+
+def _make_model(sampler):
+    if isinstance(sampler, ScipySampler):
+        return _ContinuousModel(sampler)
+    if isinstance(sampler, ListSampler):
+        return _CategoricalModel(sampler)
+    # valores fixos e funções arbitrárias continuam vindo do próprio sampler
+    return None
+
+
+class TPESearch:
+    """Busca adaptativa com Tree-structured Parzen Estimator (TPE).
+
+    Recebe os mesmos `values` do `RandomSearch` e usa cada sampler como priori.
+    As primeiras `n_startup` amostras vêm da priori; depois, os trials com
+    resultado são divididos entre os `gamma` melhores e os demais, e cada
+    parâmetro é escolhido entre `n_candidates` candidatos pela razão entre as
+    densidades dos dois grupos. Os resultados voltam por `tell(params, valor)`
+    (ou `tell(hash_id, valor)`).
+
+    `ask(n)` pode ser chamado a qualquer momento, mesmo com trials em
+    andamento: os pendentes contam como o pior resultado já visto ("constant
+    liar"), então propostas em lote ou de workers em paralelo não se repetem
+    e ninguém espera pelos outros.
+
+        search = TPESearch(50, values, initial=params, mode='min')
+        for params in search:
+            search.tell(params, train(params))
+    """
+
+    def __init__(self, n_samples, values:dict, initial=None, seed=None, mode='min',
+                 n_startup=10, n_candidates=24, gamma=0.25):
+        import numpy as np
+        if mode not in ('min', 'max'):
+            raise ValueError(f"mode must be 'min' or 'max': got {mode!r}")
+        self.n_samples = n_samples
+        self.initial = initial
+        self.mode = mode
+        self.n_startup = n_startup
+        self.n_candidates = n_candidates
+        self.gamma = gamma
+        self.samplers = {k : make_sampler(v) for k, v in values.items()}
+        self.models = {k : _make_model(s) for k, s in self.samplers.items()}
+        self.rng = np.random.default_rng(seed)
+        # hash_id -> (combo, resultado ou None enquanto pendente)
+        self.trials = dict()
+        self._counter = 0
+
+    def _sign(self, value):
+        return value if self.mode == 'min' else -value
+
+    # -------------------------
+    # Propostas
+    # -------------------------
+    def _split(self):
+        done = [(combo, self._sign(value)) for combo, value in self.trials.values() if value is not None]
+        if not done:
+            return [], []
+        worst = max(v for _, v in done)
+        pending = [(combo, worst) for combo, value in self.trials.values() if value is None]
+        ranked = sorted(done + pending, key=lambda item: item[1])
+        # o grupo bom cresce com a raiz do número de trials, como no TPE original
+        n_good = max(1, math.ceil(self.gamma * math.sqrt(len(done))))
+        return [c for c, _ in ranked[:n_good]], [c for c, _ in ranked[n_good:]]
+
+    def _propose(self, good, bad):
+        combo = dict()
+        for key, sampler in self.samplers.items():
+            model = self.models[key]
+            if model is None or not good:
+                combo[key] = _to_python(sampler.sample(self.rng))
+            else:
+                combo[key] = model.propose([c[key] for c in good], [c[key] for c in bad], self.n_candidates, self.rng)
+        return combo
+
+    def ask(self, n=1):
+        proposals = []
+        for _ in range(n):
+            n_done = sum(value is not None for _, value in self.trials.values())
+            good, bad = self._split() if n_done >= self.n_startup else ([], [])
+            for _ in range(100):
+                combo = self._propose(good, bad)
+                params = _apply_initial(self.initial, combo)
+                hash_id = _trial_key(params)
+                if hash_id not in self.trials:
+                    break
+            # em espaços pequenos a proposta pode repetir um trial conhecido
+            self.trials.setdefault(hash_id, (combo, None))
+            proposals.append(params)
+        return proposals
+
+    def tell(self, params, value):
+        """Registra o resultado de um trial, dado pelos params ou pelo `hash_id`."""
+        hash_id = _trial_key(params)
+        combo, _ = self.trials[hash_id]
+        self.trials[hash_id] = (combo, float(value))
+
+    def best(self):
+        done = {h : v for h, (_, v) in self.trials.items() if v is not None}
+        if not done:
+            return None
+        hash_id = min(done, key=lambda h: self._sign(done[h]))
+        return _apply_initial(self.initial, self.trials[hash_id][0]), done[hash_id]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._counter >= self.n_samples:
+            raise StopIteration
+        self._counter += 1
+        return self.ask(1)[0]
@@ -0,0 +1,264 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from .profiling import close_profiler
+
+QUEUE_FOLDER = Path('.mrlab', 'queue')
+
+class LeaseLost(RuntimeError):
+    pass
+
+@dataclass
+class Lease:
+    hash_id: str
+    token: str
+    params: object
+    expires: float
+
+
+def _write_exclusive(filepath, content):
+    """Cria `filepath` com `content` só se ele ainda não existir (atômico também no NFS)."""
+    tmp = filepath.with_name(f'.{filepath.name}.{uuid.uuid4().hex}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(content, f, default=str)
+    try:
+        os.link(tmp, filepath)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.unlink(tmp)
+
+def _read_json(filepath):
+    try:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class TrialQueue:
+    """Fila de trials em disco compartilhado (NFS), sem servidor central.
+
+    Os trials ficam em `<root>/.mrlab/queue/trials/<hash_id>.json`. Um worker
+    reivindica um trial criando `leases/<hash_id>.json` de forma exclusiva; a
+    reivindicação vale por `lease_seconds` e é renovada com `heartbeat`. Leases
+    vencidas são retomadas por outros workers. A conclusão é gravada uma única
+    vez em `done/<hash_id>.json` com `link`, que é atômico no NFS.
+
+    `heartbeat`, `complete` e `fail` primeiro tiram a lease do lugar com um
+    `rename` atômico e conferem o token: um worker cuja lease venceu e foi
+    retomada recebe `LeaseLost` e não sobrescreve a lease do novo dono.
+    """
+
+    def __init__(self, root, lease_seconds=300, worker_id=None):
+        self.folder = Path(root, QUEUE_FOLDER)
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        for name in ('trials', 'leases', 'done', 'failed'):
+            (self.folder / name).mkdir(parents=True, exist_ok=True)
+        self._candidates = []
+
+    def _path(self, kind, hash_id):
+        return self.folder / kind / f'{hash_id}.json'
+
+    # -------------------------
+    # Produtor
+    # -------------------------
+    def put(self, params):
+        content = {'arguments' : params.to_dict(), 'class' : type(params).__qualname__}
+        return _write_exclusive(self._path('trials', params.hash_id), content)
+
+    def put_many(self, search):
+        return sum(self.put(params) for params in search)
+
+    # -------------------------
+    # Worker
+    # -------------------------
+    def _lease_content(self, token):
+        return {'worker' : self.worker_id, 'token' : token, 'expires' : time.time() + self.lease_seconds}
+
+    def _refill(self):
+        done = {p.stem for kind in ('done', 'failed') for p in (self.folder / kind).glob('*.json')}
+        pending = [p.stem for p in (self.folder / 'trials').glob('*.json') if p.stem not in done]
+        # ordem aleatória: workers diferentes tentam trials diferentes primeiro
+        random.shuffle(pending)
+        self._candidates = pending
+
+    def _reclaim(self, hash_id, lease_path):
+        lease = _read_json(lease_path)
+        if lease is None or lease['expires'] > time.time():
+            return False
+        stale = lease_path.with_name(f'.{lease_path.name}.{uuid.uuid4().hex}.stale')
+        try:
+            os.rename(lease_path, stale)
+        except FileNotFoundError:
+            return False
+        moved = _read_json(stale)
+        if moved is not None and moved != lease:
+            # a lease foi renovada (novo `expires`) ou trocada entre a leitura e o rename: devolve
+            try:
+                os.link(stale, lease_path)
+            except FileExistsError:
+                pass
+            os.unlink(stale)
+            return False
+        os.unlink(stale)
+        return True
+
+    def _try_claim(self, hash_id, params_cls):
+        if self._path('done', hash_id).exists() or self._path('failed', hash_id).exists():
+            return None
+        lease_path = self._path('leases', hash_id)
+        token = uuid.uuid4().hex
+        content = self._lease_content(token)
+        if not _write_exclusive(lease_path, content):
+            if not self._reclaim(hash_id, lease_path) or not _write_exclusive(lease_path, content):
+                return None
+        if self._path('done', hash_id).exists():
+            # concluído entre a checagem e a lease
+            os.unlink(lease_path)
+            return None
+        trial = _read_json(self._path('trials', hash_id))
+        params = params_cls.from_dict(trial['arguments'])
+        return Lease(hash_id=hash_id, token=token, params=params, expires=content['expires'])
+
+    def claim(self, params_cls):
+        for _ in range(2):
+            while self._candidates:
+                lease = self._try_claim(self._candidates.pop(), params_cls)
+                if lease is not None:
+                    return lease
+            self._refill()
+        return None
+
+    def _take_lease(self, lease):
+        """Tira a lease do lugar (rename atômico) se ela ainda for de `lease`; senão `LeaseLost`."""
+        lease_path = self._path('leases', lease.hash_id)
+        taken = lease_path.with_name(f'.{lease_path.name}.{lease.token}.taken')
+        try:
+            os.rename(lease_path, taken)
+        except FileNotFoundError:
+            raise LeaseLost(f'Lease for trial {lease.hash_id} was lost (expired and reclaimed)') from None
+        current = _read_json(taken)
+        if current is None or current.get('token') != lease.token:
+            # é a lease de outro worker: devolve
+            try:
+                os.link(taken, lease_path)
+            except FileExistsError:
+                pass
+            os.unlink(taken)
+            raise LeaseLost(f'Lease for trial {lease.hash_id} was lost (expired and reclaimed)')
+        return taken
+
+    def heartbeat(self, lease):
+        content = self._lease_content(lease.token)
+        lease_path = self._path('leases', lease.hash_id)
+        tmp = lease_path.with_name(f'.{lease_path.name}.{lease.token}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(content, f)
+        try:
+            taken = self._take_lease(lease)
+            try:
+                # exclusivo: se outro worker reivindicou o trial nesse meio tempo, ele fica
+                os.link(tmp, lease_path)
+            except FileExistsError:
+                raise LeaseLost(f'Lease for trial {lease.hash_id} was lost (claimed during renewal)') from None
+            finally:
+                os.unlink(taken)
+        finally:
+            os.unlink(tmp)
+        lease.expires = content['expires']
+        return lease
+
+    def complete(self, lease, result=None):
+        """Grava o resultado do trial; `LeaseLost` se a lease não for mais de quem chama."""
+        record = {'worker' : self.worker_id, 'time' : time.time(), 'result' : result}
+        taken = self._take_lease(lease)
+        try:
+            return _write_exclusive(self._path('done', lease.hash_id), record)
+        finally:
+            os.unlink(taken)
+
+    def fail(self, lease, error=None):
+        record = {'worker' : self.worker_id, 'time' : time.time(), 'error' : error}
+        failed = self._path('failed', lease.hash_id)
+        tmp = failed.with_name(f'.{failed.name}.{lease.token}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(record, f)
+        try:
+            taken = self._take_lease(lease)
+        except LeaseLost:
+            os.unlink(tmp)
+            raise
+        os.replace(tmp, failed)
+        os.unlink(taken)
+
+    def retry_failed(self):
+        failed = list((self.folder / 'failed').glob('*.json'))
+        for filepath in failed:
+            filepath.unlink(missing_ok=True)
+        return len(failed)
+
+    def release(self, lease):
+        lease_path = self._path('leases', lease.hash_id)
+        current = _read_json(lease_path)
+        if current is not None and current.get('token') == lease.token:
+            lease_path.unlink(missing_ok=True)
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def status(self):
+        counts = {name : len(list((self.folder / name).glob('*.json'))) for name in ('trials', 'leases', 'done', 'failed')}
+        counts['pending'] = counts['trials'] - counts['done'] - counts['failed']
+        return counts
+
+    def is_done(self, hash_id):
+        return self._path('done', hash_id).exists()
+
+
+def run_worker(queue, func, params_cls, max_trials=None, heartbeat_interval=None):
+    """Consome a fila até ela esvaziar, rodando `func(params)` em cada trial."""
+    heartbeat_interval = heartbeat_interval or queue.lease_seconds / 3
+    completed = 0
+    while max_trials is None or completed < max_trials:
+        lease = queue.claim(params_cls)
+        if lease is None:
+            break
+
+        stop = threading.Event()
+        def beat():
+            while not stop.wait(heartbeat_interval):
+                try:
+                    queue.heartbeat(lease)
+                except LeaseLost:
+                    return
+        thread = threading.Thread(target=beat, name='mrlab-queue-heartbeat', daemon=True)
+        thread.start()
+        try:
+            result = func(lease.params)
+        except Exception as e:
+            stop.set()
+            thread.join()
+            error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+            finish = lambda: queue.fail(lease, error=error)
+        else:
+            stop.set()
+            thread.join()
+            finish = lambda: queue.complete(lease, result=result)
+        close_profiler(lease.params)
+        try:
+            finish()
+        except LeaseLost:
+            # o trial foi retomado por outro worker, que grava o resultado
+            continue
+        completed += 1
+    return completed
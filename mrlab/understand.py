@@ -1,8 +1,560 @@
+import json
 import os
+import sqlite3
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from string import Formatter
+from . import archive
+from .params import _yaml_loader
 
-def get_runs_folders(base, result_dir='results'):
-    for firpath, dirnames, filenames  in os.walk(base):
-        pass
+ARGUMENTS_FILES = ('arguments.json', 'arguments.yaml')
+INDEX_FOLDER = '.mrlab'
+INDEX_FILENAME = 'runs.sqlite'
 
+# as execuções são identificadas pelo caminho: o mesmo hash_id pode aparecer
+# em experimentos diferentes abaixo de `base`
+_SCHEMA_VERSION = 2
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    is_run INTEGER NOT NULL,
+    children TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,
+    hash_id TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    args_file TEXT,
+    args_mtime INTEGER,
+    arguments TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_hash_id ON runs (hash_id);
+CREATE TABLE IF NOT EXISTS folders (
+    run TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    PRIMARY KEY (run, name)
+);
+"""
+
+def _load_arguments(filepath):
+    with archive.open_file(filepath, 'r') as f:
+        if str(filepath).endswith('.json'):
+            return json.load(f)
+        import yaml
+        return yaml.load(f, Loader=_yaml_loader())
+
+def _mtime(ns):
+    return ns / 1e9
+
+def _key_column(key):
+    # as consultas recebem o hash_id ou o caminho da execução
+    return 'path' if isinstance(key, os.PathLike) or os.sep in key else 'hash_id'
+
+@dataclass
+class RunInfo:
+    hash_id: str
+    path: Path
+    arguments: dict = field(default_factory=dict)
+    folders: dict = field(default_factory=dict)
+    mtime: float = None
+
+
+class RunIndex:
+    """Catálogo em disco (SQLite) das execuções encontradas abaixo de `base`.
+
+    Cada pasta que contém um `arguments.json` ou `arguments.yaml` é uma execução,
+    identificada pelo caminho; o nome da pasta é o `hash_id` (template padrão).
+    O `refresh` faz um `stat` por pasta: só as pastas cujo mtime mudou desde a
+    última passada são listadas de novo, e só nelas o arquivo de argumentos e
+    as subpastas são consultados. Gravar dentro de uma subpasta (ex.:
+    `metrics/`) não muda o mtime da execução: o mtime guardado da subpasta só
+    é atualizado quando a pasta da execução muda.
+
+    As consultas aceitam o `hash_id` ou o caminho da execução; um `hash_id`
+    que aparece em mais de uma execução só pode ser consultado pelo caminho.
+    """
+
+    def __init__(self, base, index_file=None):
+        self.base = Path(base)
+        if index_file is None:
+            index_file = self.base / INDEX_FOLDER / INDEX_FILENAME
+        self.index_file = Path(index_file)
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.index_file))
+        if self._conn.execute('PRAGMA user_version').fetchone()[0] != _SCHEMA_VERSION:
+            # o catálogo é só um cache: um formato antigo é descartado
+            self._conn.executescript('DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS runs; DROP TABLE IF EXISTS folders;')
+            self._conn.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+        self._conn.executescript(_SCHEMA)
+
+    # -------------------------
+    # Varredura incremental
+    # -------------------------
+    def _list_dir(self, path):
+        children, args_file = [], None
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    children.append(entry.name)
+                elif entry.name.endswith(archive.PACKED_SUFFIX) and entry.is_file():
+                    # execução empacotada: visitada como se fosse a pasta
+                    children.append(entry.name)
+                elif entry.name in ARGUMENTS_FILES:
+                    # json tem preferência: é mais rápido de ler
+                    if args_file is None or entry.name.endswith('.json'):
+                        args_file = entry.name
+        return sorted(children), args_file
+
+    def refresh(self):
+        conn = self._conn
+        known_dirs = {
+            path : (mtime, is_run, json.loads(children))
+            for path, mtime, is_run, children in conn.execute('SELECT path, mtime, is_run, children FROM dirs')
+        }
+        known_runs = {
+            row[0] : row[1:]
+            for row in conn.execute('SELECT path, hash_id, args_file, args_mtime FROM runs')
+        }
+
+        dirs_rows, folders_rows, mtime_rows = [], [], []
+        seen_dirs, seen_runs, changed_runs = set(), set(), []
+        to_parse = []
+        stats = {'listed' : 0}
+
+        stack = [str(self.base)]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen_dirs.add(path)
+
+            # no zip de uma execução empacotada a pasta da execução é o caminho sem o sufixo
+            packed = path.endswith(archive.PACKED_SUFFIX)
+            run_path = path[:-len(archive.PACKED_SUFFIX)] if packed else path
+
+            known = known_dirs.get(path)
+            if known is not None and known[0] == mtime and (not known[1] or run_path in known_runs):
+                _, is_run, children = known
+                if is_run:
+                    # pasta igual: argumentos e subpastas guardados valem, sem outros `stat`
+                    seen_runs.add(run_path)
+                else:
+                    stack.extend(os.path.join(path, name) for name in reversed(children))
+                continue
+
+            try:
+                children, args_file = archive.list_packed_run(path, ARGUMENTS_FILES) if packed else self._list_dir(path)
+            except (OSError, zipfile.BadZipFile):
+                # um zip qualquer, que não é uma execução
+                children, args_file = [], None
+            stats['listed'] += 1
+            if args_file is None:
+                dirs_rows.append((path, mtime, 0, json.dumps(children)))
+                stack.extend(os.path.join(path, name) for name in reversed(children))
+                continue
+
+            args_path = os.path.join(run_path, args_file)
+            try:
+                # dentro do zip, o mtime do próprio zip
+                args_mtime = mtime if packed else os.stat(args_path).st_mtime_ns
+            except FileNotFoundError:
+                # o arquivo sumiu entre a listagem e o `stat`: força nova listagem
+                dirs_rows.append((path, -1, 0, '[]'))
+                continue
+            dirs_rows.append((path, mtime, 1, json.dumps(children)))
+            seen_runs.add(run_path)
+            changed_runs.append(run_path)
+
+            hash_id = os.path.basename(run_path)
+            previous = known_runs.get(run_path)
+            if previous is None or previous[1] != args_file or previous[2] != args_mtime:
+                to_parse.append((run_path, hash_id, mtime, args_file, args_mtime))
+            else:
+                mtime_rows.append((mtime, run_path))
+
+            for name in children:
+                try:
+                    folders_rows.append((run_path, name, mtime if packed else os.stat(os.path.join(path, name)).st_mtime_ns))
+                except FileNotFoundError:
+                    pass
+
+        # os arquivos de argumentos novos ou alterados são lidos em paralelo
+        configs = load_many([os.path.join(row[0], row[3]) for row in to_parse])
+        runs_rows = [row + (json.dumps(config, default=str),) for row, config in zip(to_parse, configs)]
+        stats['parsed'] = len(runs_rows)
+
+        # só as execuções alteradas ou removidas mudam no catálogo
+        removed_dirs = set(known_dirs) - seen_dirs
+        removed_runs = set(known_runs) - seen_runs
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)', dirs_rows)
+            conn.executemany('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)', runs_rows)
+            conn.executemany('UPDATE runs SET mtime = ? WHERE path = ?', mtime_rows)
+            conn.executemany('DELETE FROM folders WHERE run = ?', ((p,) for p in changed_runs + list(removed_runs)))
+            conn.executemany('INSERT OR REPLACE INTO folders VALUES (?, ?, ?)', folders_rows)
+            conn.executemany('DELETE FROM dirs WHERE path = ?', ((p,) for p in removed_dirs))
+            conn.executemany('DELETE FROM runs WHERE path = ?', ((p,) for p in removed_runs))
+
+        stats['runs'] = len(seen_runs)
+        stats['removed'] = len(removed_runs)
+        return stats
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def _folders(self, run_path):
+        rows = self._conn.execute('SELECT name, mtime FROM folders WHERE run = ?', (run_path,))
+        return {name : _mtime(mtime) for name, mtime in rows}
+
+    def _make_run(self, row, folders=None):
+        path, hash_id, mtime, arguments = row
+        if folders is None:
+            folders = self._folders(path)
+        return RunInfo(
+            hash_id=hash_id,
+            path=Path(path),
+            arguments=json.loads(arguments) if arguments else {},
+            folders=folders,
+            mtime=_mtime(mtime),
+        )
+
+    def _rows(self, key):
+        rows = self._conn.execute(
+            f'SELECT path, hash_id, mtime, arguments FROM runs WHERE {_key_column(key)} = ?', (os.fspath(key),)
+        ).fetchall()
+        if len(rows) > 1:
+            paths = ', '.join(row[0] for row in rows)
+            raise KeyError(f'hash_id {key!r} matches several runs ({paths}): look them up by path')
+        return rows
+
+    def get(self, key, default=None):
+        rows = self._rows(key)
+        if not rows:
+            return default
+        return self._make_run(rows[0])
+
+    def runs(self):
+        folders = dict()
+        for run_path, name, mtime in self._conn.execute('SELECT run, name, mtime FROM folders'):
+            folders.setdefault(run_path, {})[name] = _mtime(mtime)
+        rows = self._conn.execute('SELECT path, hash_id, mtime, arguments FROM runs ORDER BY path')
+        return [self._make_run(row, folders.get(row[0], {})) for row in rows]
+
+    def __getitem__(self, key):
+        run = self.get(key)
+        if run is None:
+            raise KeyError(key)
+        return run
+
+    def __contains__(self, key):
+        row = self._conn.execute(f'SELECT 1 FROM runs WHERE {_key_column(key)} = ?', (os.fspath(key),)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.runs())
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_runs_folders(base, index_file=None, refresh=True):
+    with RunIndex(base, index_file=index_file) as index:
+        if refresh:
+            index.refresh()
+        return [run.path for run in index.runs()]
+
+
+# -------------------------
+# Leitura dos argumentos de muitas execuções
+# -------------------------
+# caminho -> (mtime_ns, tamanho, argumentos)
+_CONFIG_CACHE = dict()
+
+def _arguments_file(path):
+    if not archive.isdir(path):
+        return path
+    for name in ARGUMENTS_FILES:
+        filepath = os.path.join(path, name)
+        if archive.exists(filepath):
+            return filepath
+    raise FileNotFoundError(f'No arguments file ({", ".join(ARGUMENTS_FILES)}) in {path}')
+
+def _load_chunk(paths):
+    return [_load_arguments(path) for path in paths]
+
+def load_many(paths, params_cls=None, max_workers=8, executor='thread', use_cache=True):
+    """Lê os argumentos de muitas execuções de uma vez.
+
+    `paths` são arquivos `arguments.json`/`arguments.yaml` ou pastas de
+    execuções (o json tem preferência). Os arquivos são lidos em paralelo e
+    mantidos em memória pela combinação mtime e tamanho: uma nova chamada só
+    relê os arquivos alterados. Com `params_cls` devolve instâncias dela em
+    vez de dicionários.
+    """
+    if executor not in ('process', 'thread'):
+        raise ValueError(f"executor must be 'process' or 'thread': got {executor!r}")
+    paths = [os.fspath(_arguments_file(os.fspath(path))) for path in paths]
+    configs = [None] * len(paths)
+    missing = dict()
+    for i, path in enumerate(paths):
+        st = archive.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _CONFIG_CACHE.get(path) if use_cache else None
+        if cached is not None and cached[0] == key:
+            configs[i] = cached[1]
+        else:
+            missing.setdefault(path, (key, []))[1].append(i)
+
+    if missing:
+        pending = list(missing)
+        if len(pending) == 1 or max_workers == 1:
+            loaded = _load_chunk(pending)
+        else:
+            # blocos grandes: cada tarefa custa pouco e processos têm overhead
+            size = max(1, min(256, len(pending) // (max_workers * 4)))
+            chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+            pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+            with pool_cls(max_workers=max_workers) as pool:
+                loaded = [config for chunk in pool.map(_load_chunk, chunks) for config in chunk]
+        for path, config in zip(pending, loaded):
+            key, positions = missing[path]
+            if use_cache:
+                _CONFIG_CACHE[path] = (key, config)
+            for i in positions:
+                configs[i] = config
+
+    if params_cls is not None:
+        return [params_cls.from_dict(config) for config in configs]
+    # cópias rasas: quem chama pode alterar os dicionários sem afetar o cache
+    return [dict(config) for config in configs]
+
+def load_experiment(root, params_cls=None, index_file=None):
+    """Argumentos de todas as execuções abaixo de `root`, por `hash_id`.
+
+    Usa o catálogo do `RunIndex`, que guarda os argumentos já lidos: só os
+    arquivos novos ou alterados desde a última chamada são lidos de novo.
+    """
+    with RunIndex(root, index_file=index_file) as index:
+        index.refresh()
+        runs = index.runs()
+    if len({run.hash_id for run in runs}) < len(runs):
+        raise ValueError(f'Several runs under {root} share a hash_id: use RunIndex.runs() to tell them apart')
+    if params_cls is not None:
+        return {run.hash_id : params_cls.from_dict(run.arguments) for run in runs}
+    return {run.hash_id : run.arguments for run in runs}
+
+
+# -------------------------
+# Agregação das métricas de várias execuções
+# -------------------------
+METRICS_FOLDER = 'metrics'
+METRICS_SUFFIXES = ('.csv', '.mlog')
+
+def _runs_from_source(source, cache_dir=None):
+    if isinstance(source, (str, os.PathLike)):
+        with RunIndex(source) as index:
+            index.refresh()
+            runs = [(run.hash_id, run.path / METRICS_FOLDER, run.arguments) for run in index.runs()]
+        if cache_dir is None:
+            cache_dir = Path(source, INDEX_FOLDER)
+        return runs, cache_dir
+
+    runs = []
+    for params in source:
+        folder = params.get_default_folder(ensure_exists=False)
+        runs.append((params.hash_id, folder / METRICS_FOLDER, params.to_dict()))
+        if cache_dir is None:
+            cache_dir = folder.parent / INDEX_FOLDER
+    return runs, cache_dir
+
+def _metrics_signature(folder):
+    return [
+        [name, mtime, size]
+        for name, mtime, size in sorted(archive.scandir_files(folder))
+        if name.endswith(METRICS_SUFFIXES)
+    ]
+
+# colunas de texto (dtype object) vão para o npz como unicode, sem pickle, mais
+# uma máscara com as linhas ausentes (NaN); na leitura voltam a ser object
+_MISSING_PREFIX = '__missing__:'
+
+def _is_missing(value):
+    return isinstance(value, float) and value != value
+
+def _storable_arrays(table):
+    import numpy as np
+    arrays = dict()
+    for name, values in table.items():
+        if values.dtype == object:
+            missing = np.array([_is_missing(v) for v in values], dtype=bool)
+            arrays[_MISSING_PREFIX + name] = missing
+            values = np.array(['' if m else str(v) for v, m in zip(values, missing)], dtype=str)
+        arrays[name] = values
+    return arrays
+
+def _restore_arrays(arrays):
+    import numpy as np
+    table = dict()
+    for name, values in arrays.items():
+        if name.startswith(_MISSING_PREFIX):
+            continue
+        missing = arrays.get(_MISSING_PREFIX + name)
+        if missing is not None:
+            values = values.astype(object)
+            values[missing] = np.nan
+        table[name] = values
+    return table
+
+def _read_run_metrics(folder, signature):
+    import numpy as np
+    from .metrics import read_metrics
+
+    tables = []
+    for name, _, _ in signature:
+        table = read_metrics(Path(folder, name))
+        size = len(next(iter(table.values()))) if table else 0
+        table['metrics_file'] = np.full(size, Path(name).stem)
+        tables.append(table)
+    return _concat_tables(tables)
+
+def _concat_tables(tables):
+    import numpy as np
+
+    tables = [t for t in tables if t]
+    columns = list(dict.fromkeys(name for t in tables for name in t))
+    result = dict()
+    for name in columns:
+        parts = []
+        for t in tables:
+            size = len(next(iter(t.values())))
+            if name in t:
+                parts.append(t[name])
+            else:
+                parts.append(np.full(size, np.nan))
+        kinds = {p.dtype.kind for p in parts}
+        if len(kinds) > 1 and not kinds <= set('biuf'):
+            parts = [p.astype(object) for p in parts]
+        result[name] = np.concatenate(parts) if parts else np.array([])
+    return result
+
+def _load_cache(filepath):
+    import numpy as np
+
+    try:
+        with np.load(filepath) as data:
+            manifest = json.loads(str(data['__manifest__']))
+            columns = _restore_arrays({k : data[k] for k in data.files if k != '__manifest__'})
+        return manifest, columns
+    except (OSError, ValueError, KeyError):
+        return {}, {}
+
+def _save_cache(filepath, manifest, table):
+    import numpy as np
+
+    arrays = _storable_arrays(table)
+    tmp = filepath.with_name(f'.{filepath.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as f:
+        np.savez(f, __manifest__=np.array(json.dumps(manifest)), **arrays)
+    os.replace(tmp, filepath)
+
+def _slice_table(table, start, stop):
+    return {k : v[start:stop] for k, v in table.items()}
+
+def collect_metrics(source, max_workers=8, use_cache=True, cache_dir=None):
+    """Junta as métricas de várias execuções numa tabela em colunas.
+
+    `source` é uma pasta base (lida pelo `RunIndex`) ou um iterável de params
+    (ex.: um `GridSearch`). Cada linha das métricas (`metrics/*.csv` e `*.mlog`)
+    ganha as colunas `hash_id`, `metrics_file` e os argumentos da execução; em
+    caso de conflito de nome, a coluna de métrica prevalece.
+
+    As métricas de todas as execuções ficam consolidadas em
+    `<base>/.mrlab/metrics.npz`; numa nova chamada só são relidas as execuções
+    cujos arquivos de métricas mudaram (nome, mtime ou tamanho).
+    """
+    import numpy as np
+
+    runs, cache_root = _runs_from_source(source, cache_dir)
+    cache_file = None
+    manifest, cached = {}, {}
+    if use_cache and cache_root is not None:
+        Path(cache_root).mkdir(parents=True, exist_ok=True)
+        cache_file = Path(cache_root, 'metrics.npz')
+        manifest, cached = _load_cache(cache_file)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        signatures = list(pool.map(lambda run: _metrics_signature(run[1]), runs))
+        stale = [
+            i for i, (run, signature) in enumerate(zip(runs, signatures))
+            if signature and manifest.get(str(run[1]), [None, None, None])[2] != signature
+        ]
+        fresh = pool.map(lambda i: _read_run_metrics(runs[i][1], signatures[i]), stale)
+        fresh = dict(zip(stale, fresh))
+
+    tables, new_manifest, sizes = [], {}, []
+    offset = 0
+    for i, ((_, folder, _), signature) in enumerate(zip(runs, signatures)):
+        # o manifesto é indexado pela pasta: o mesmo hash_id pode estar em dois experimentos
+        key = str(folder)
+        if i in fresh:
+            table = fresh[i]
+        elif signature:
+            start, stop, _ = manifest[key]
+            table = _slice_table(cached, start, stop)
+        else:
+            table = {}
+        size = len(next(iter(table.values()))) if table else 0
+        sizes.append(size)
+        if size:
+            tables.append(table)
+            new_manifest[key] = [offset, offset + size, signature]
+            offset += size
+    metrics = _concat_tables(tables)
+
+    if cache_file is not None and (fresh or new_manifest.keys() != manifest.keys()):
+        _save_cache(cache_file, new_manifest, metrics)
+
+    # colunas por execução: hash_id e argumentos, repetidos pelo número de linhas
+    sizes = np.array(sizes)
+    table = dict(metrics)
+    table['hash_id'] = np.repeat(np.array([run[0] for run in runs], dtype=str), sizes)
+    names = list(dict.fromkeys(name for _, _, arguments in runs for name in arguments))
+    for name in names:
+        if name in table:
+            continue
+        values = np.empty(len(runs), dtype=object)
+        for i, (_, _, arguments) in enumerate(runs):
+            # atribuição item a item: listas não podem virar uma dimensão extra
+            values[i] = arguments.get(name)
+        table[name] = np.repeat(values, sizes)
+    return table
+
+def leaderboard(table, metric, mode='min', by='hash_id'):
+    """Melhor linha de cada execução segundo `metric`, da melhor para a pior."""
+    import numpy as np
+
+    values = np.asarray(table[metric], dtype=np.float64)
+    keys = np.asarray(table[by])
+    valid = ~np.isnan(values)
+    order = np.argsort(values if mode == 'min' else -values, kind='stable')
+    order = order[valid[order]]
+    _, first = np.unique(keys[order], return_index=True)
+    best = order[np.sort(first)]
+    return {name : np.asarray(column)[best] for name, column in table.items()}
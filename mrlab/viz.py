@@ -0,0 +1,229 @@
+import json
+import os
+from pathlib import Path
+from . import archive
+from .metrics import SUFFIX, read_metrics
+
+CACHE_FILENAME = '.downsampled.npz'
+
+# -------------------------
+# Redução de pontos
+# -------------------------
+def _bucket_bounds(n, n_buckets):
+    import numpy as np
+    return np.linspace(0, n, n_buckets + 1).astype(np.int64)
+
+def minmax_indices(y, n_out):
+    """Índices do mínimo e do máximo de `y` em `n_out // 2` baldes de mesmo tamanho."""
+    import numpy as np
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+    if n <= n_out:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    # completa o último balde com NaN para vetorizar com uma matriz (baldes x tamanho)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, size)
+    valid = ~np.isnan(padded).all(axis=1)
+    filled = np.where(np.isnan(padded), np.inf, padded)
+    lo = filled.argmin(axis=1)
+    hi = np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1)
+    offsets = np.arange(n_buckets) * size
+    indices = np.concatenate([(offsets + lo)[valid], (offsets + hi)[valid]])
+    return np.unique(indices[indices < n])
+
+def lttb_indices(x, y, n_out):
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets.
+
+    Curvas longas passam antes por uma pré-seleção min/max (vetorizada) com
+    alguns pontos por balde (MinMaxLTTB); o LTTB então percorre os `n_out`
+    baldes sobre esses poucos pontos, com operações numpy em cada balde.
+    """
+    import numpy as np
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    candidates = np.arange(n)
+    if n > 4 * n_out:
+        candidates = minmax_indices(y, 4 * n_out)
+        # primeiro e último pontos sempre ficam
+        candidates = np.union1d(candidates, [0, n - 1])
+    cx, cy = x[candidates], y[candidates]
+    bounds = _bucket_bounds(len(candidates) - 2, n_out - 2) + 1
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, len(candidates) - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            nxt = slice(bounds[i + 1], bounds[i + 2])
+            mx, my = cx[nxt].mean(), cy[nxt].mean()
+        else:
+            mx, my = cx[-1], cy[-1]
+        # área do triângulo (ponto escolhido antes, candidato, média do próximo balde)
+        area = np.abs((cx[a] - mx) * (cy[start:stop] - cy[a]) - (cx[a] - cx[start:stop]) * (my - cy[a]))
+        a = start + int(area.argmax()) if stop > start else a
+        selected[i + 1] = a
+    return candidates[np.unique(selected)]
+
+def downsample(x, y, n_out=1000, method='lttb'):
+    import numpy as np
+    x, y = np.asarray(x), np.asarray(y)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    if method == 'lttb':
+        indices = lttb_indices(x, y, n_out)
+    elif method == 'minmax':
+        indices = minmax_indices(y, n_out)
+    else:
+        raise ValueError(f"method must be 'lttb' or 'minmax': got {method!r}")
+    return x[indices], y[indices]
+
+
+# -------------------------
+# Curvas das execuções, com cache
+# -------------------------
+def _metrics_file(folder, name):
+    for suffix in (SUFFIX, '.csv'):
+        filepath = Path(folder, name + suffix)
+        if archive.exists(filepath):
+            return filepath
+    return None
+
+def _load_cache(filepath):
+    import numpy as np
+    try:
+        with np.load(filepath) as data:
+            manifest = json.loads(str(data['__manifest__']))
+            return manifest, {k : data[k] for k in data.files if k != '__manifest__'}
+    except (FileNotFoundError, ValueError, KeyError, OSError):
+        return dict(), dict()
+
+def _save_cache(filepath, manifest, arrays):
+    import numpy as np
+    tmp = filepath.with_name(f'.{filepath.name}.{os.getpid()}.tmp.npz')
+    np.savez(tmp, __manifest__=np.array(json.dumps(manifest)), **arrays)
+    os.replace(tmp, filepath)
+
+def load_curve(folder, metric, x='step', name='metrics', n_points=1000, method='lttb', use_cache=True):
+    """Curva `metric` x `x` reduzida de uma pasta de métricas, ou None se não houver.
+
+    O resultado fica em `<pasta>/.downsampled.npz`, junto do mtime e tamanho do
+    arquivo de origem: só é recalculado quando o arquivo muda.
+    """
+    filepath = _metrics_file(folder, name)
+    if filepath is None:
+        return None
+    st = archive.stat(filepath)
+    signature = [filepath.name, st.st_mtime_ns, st.st_size]
+    key = f'{name}:{x}:{metric}:{n_points}:{method}'
+    cache_file = Path(folder, CACHE_FILENAME)
+    # execuções empacotadas não são alteradas: o cache só vale para pastas no disco
+    use_cache = use_cache and os.path.isdir(folder)
+    if use_cache:
+        manifest, arrays = _load_cache(cache_file)
+        if manifest.get(key) == signature:
+            return arrays[key + ':x'], arrays[key + ':y']
+
+    table = read_metrics(filepath)
+    if metric not in table or x not in table:
+        return None
+    cx, cy = downsample(table[x].astype(float), table[metric].astype(float), n_points, method)
+    if use_cache:
+        manifest, arrays = _load_cache(cache_file)
+        manifest[key] = signature
+        arrays[key + ':x'], arrays[key + ':y'] = cx, cy
+        _save_cache(cache_file, manifest, arrays)
+    return cx, cy
+
+def _runs(source):
+    # lista de params ou a pasta base de um experimento (via catálogo)
+    if isinstance(source, (str, os.PathLike)):
+        from .understand import RunIndex
+        with RunIndex(source) as index:
+            index.refresh()
+            return [(run.path / 'metrics', run.arguments) for run in index.runs()]
+    return [(params.dir_metrics(ensure_exists=False), params.to_dict()) for params in source]
+
+def load_curves(source, metric, x='step', name='metrics', n_points=1000, method='lttb', use_cache=True, max_workers=8):
+    """Curvas reduzidas de várias execuções: lista de (argumentos, x, y)."""
+    from concurrent.futures import ThreadPoolExecutor
+    runs = _runs(source)
+    load = lambda run: load_curve(run[0], metric, x, name, n_points, method, use_cache)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        curves = list(pool.map(load, runs))
+    return [(arguments, *curve) for (_, arguments), curve in zip(runs, curves) if curve is not None]
+
+
+# -------------------------
+# Gráficos
+# -------------------------
+def _colors(values):
+    import numpy as np
+    from matplotlib import colormaps
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+    if numeric and len(set(values)) > 10:
+        array = np.asarray(values, dtype=float)
+        lo, hi = np.nanmin(array), np.nanmax(array)
+        norm = (array - lo) / (hi - lo) if hi > lo else np.zeros(len(array))
+        return colormaps['viridis'](norm), None
+    labels = sorted(set(map(str, values)))
+    cmap = colormaps['tab10' if len(labels) <= 10 else 'tab20']
+    lookup = {label : cmap(i % cmap.N) for i, label in enumerate(labels)}
+    return [lookup[str(v)] for v in values], lookup
+
+def plot_curves(source, metric, x='step', color_by=None, group_by=None, name='metrics',
+                n_points=1000, method='lttb', use_cache=True, ax=None, alpha=0.7, linewidth=1.0):
+    """Sobrepõe as curvas de `metric` de várias execuções, reduzidas a `n_points` pontos.
+
+    `source` é uma lista de params ou a pasta base de um experimento. As cores
+    seguem o campo `color_by` dos params; com `group_by` cada valor do campo
+    ganha um painel. Todas as curvas de um painel são desenhadas numa única
+    `LineCollection`.
+    """
+    import numpy as np
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    curves = load_curves(source, metric, x, name, n_points, method, use_cache)
+    groups = dict()
+    for arguments, cx, cy in curves:
+        key = arguments.get(group_by) if group_by is not None else None
+        groups.setdefault(str(key), []).append((arguments, cx, cy))
+
+    if ax is None:
+        fig, axes = plt.subplots(1, len(groups) or 1, squeeze=False, sharey=True,
+                                 figsize=(5 * max(len(groups), 1), 4))
+        axes = list(axes[0])
+    else:
+        fig, axes = ax.figure, [ax] * max(len(groups), 1)
+
+    color_values = [arguments.get(color_by) for arguments, _, _ in curves] if color_by else []
+    colors, lookup = _colors(color_values) if color_by else (None, None)
+    color_of = {id(curve) : colors[i] for i, curve in enumerate(curves)} if color_by else {}
+
+    for axis, (key, members) in zip(axes, sorted(groups.items())):
+        segments = [np.column_stack([cx, cy]) for _, cx, cy in members]
+        lines = LineCollection(segments, linewidths=linewidth, alpha=alpha,
+                               colors=[color_of.get(id(m), 'C0') for m in members])
+        axis.add_collection(lines)
+        axis.autoscale()
+        axis.set_xlabel(x)
+        if group_by is not None:
+            axis.set_title(f'{group_by} = {key}')
+    axes[0].set_ylabel(metric)
+    if lookup is not None:
+        from matplotlib.lines import Line2D
+        handles = [Line2D([], [], color=c, label=label) for label, c in lookup.items()]
+        axes[-1].legend(handles=handles, title=color_by)
+    elif color_by:
+        from matplotlib.cm import ScalarMappable
+        from matplotlib.colors import Normalize
+        values = np.asarray(color_values, dtype=float)
+        mappable = ScalarMappable(norm=Normalize(np.nanmin(values), np.nanmax(values)), cmap='viridis')
+        fig.colorbar(mappable, ax=axes, label=color_by)
+    return fig
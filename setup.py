@@ -1,3 +1,3 @@
 from setuptools import setup, find_packages
 
-setup(name="mrlab", version="0.0.0", packages=find_packages())
+setup(name="mrlab", version="0.0.0", packages=find_packages(), python_requires=">=3.10")
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+from dataclasses import dataclass
+from mrlab import archive
+from mrlab.cache import memoized_run
+from mrlab.checkpoints import CheckpointManager
+from mrlab.metrics import MetricsWriter, read_metrics
+from mrlab.params import BaseParams
+from mrlab.predictions import PredictionsWriter, read_predictions
+from mrlab.sweep import DONE, _write_status, read_status
+from mrlab.understand import RunIndex, collect_metrics, load_many
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def make_run(tmp_path, lr=0.1):
+    params = Params(lr=lr, outputdir=str(tmp_path / 'exp'))
+    params.to_yaml()
+    with MetricsWriter(params) as writer:
+        for step in range(100):
+            writer.log(step=step, loss=1.0 / (step + 1))
+    with PredictionsWriter(params, shard_rows=16) as writer:
+        writer.append(np.arange(40, dtype=np.float32).reshape(20, 2))
+    params.dir_checkpoints()
+    return params
+
+def test_pack_and_read_transparently(tmp_path):
+    params = make_run(tmp_path)
+    folder = params.get_default_folder()
+    target = archive.pack_run(params)
+
+    assert target == folder.with_name(folder.name + '.zip')
+    assert not folder.exists()
+    # a pasta da execução empacotada não é recriada
+    assert params.dir_metrics() == folder / 'metrics'
+    assert not folder.exists()
+
+    loaded = Params.from_yaml(folder / 'arguments.yaml')
+    assert loaded.to_dict() == params.to_dict()
+    table = read_metrics(params)
+    np.testing.assert_array_equal(table['step'], np.arange(100))
+    predictions = read_predictions(params)
+    np.testing.assert_array_equal(predictions[:], np.arange(40, dtype=np.float32).reshape(20, 2))
+    assert isinstance(predictions[0:10], np.memmap)
+
+    assert archive.isdir(folder / 'checkpoints')
+    assert archive.exists(folder / 'metrics' / 'metrics.mlog')
+    assert not archive.exists(folder / 'missing.txt')
+    with pytest.raises(FileNotFoundError):
+        archive.open_file(folder / 'missing.txt')
+
+    archive.unpack_run(params)
+    assert folder.is_dir() and not target.exists()
+    np.testing.assert_array_equal(read_metrics(params)['loss'], table['loss'])
+
+def test_index_and_collect_packed_runs(tmp_path):
+    runs = [make_run(tmp_path, lr) for lr in (0.1, 0.01)]
+    _write_status(runs[0].get_default_folder(), DONE)
+    base = tmp_path / 'exp'
+    with RunIndex(base) as index:
+        index.refresh()
+
+    # só a execução terminada é empacotada
+    packed = archive.pack_runs(base)
+    assert packed == [archive.packed_path(runs[0].base_folder)]
+    assert read_status(runs[0])['state'] == DONE
+
+    with RunIndex(base) as index:
+        index.refresh()
+        assert sorted(run.hash_id for run in index) == sorted(p.hash_id for p in runs)
+        run = index[runs[0].hash_id]
+        assert run.path == runs[0].base_folder
+        assert run.arguments['lr'] == 0.1
+        assert set(run.folders) == {'checkpoints', 'metrics', 'predictions'}
+
+    assert load_many([runs[0].base_folder]) == [runs[0].to_dict()]
+    table = collect_metrics(base)
+    assert len(table['step']) == 200
+    assert set(table['hash_id']) == {p.hash_id for p in runs}
+
+def test_readers_and_writers_of_packed_runs(tmp_path):
+    params = make_run(tmp_path)
+
+    @memoized_run(stage='train', code_version=None)
+    def train(params):
+        return params.lr * 2
+
+    assert train(params) == 0.2
+    with CheckpointManager(params) as manager:
+        manager.save({'weights' : [1, 2]}, step=1)
+    archive.pack_run(params)
+
+    # leitura direto do zip
+    assert train.is_cached(params)
+    assert train(params) == 0.2
+    assert CheckpointManager(params).load() == {'weights' : [1, 2]}
+
+    # escrita pede para desempacotar antes
+    with pytest.raises(archive.PackedRunError):
+        MetricsWriter(params)
+    with pytest.raises(archive.PackedRunError):
+        PredictionsWriter(params)
+    with pytest.raises(archive.PackedRunError):
+        CheckpointManager(params).save({}, step=2)
+    with pytest.raises(archive.PackedRunError):
+        train(params, force=True)
+    with pytest.raises(archive.PackedRunError):
+        params.to_yaml()
+    assert not params.base_folder.exists()
+
+def test_open_archives_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, 'MAX_OPEN_ZIPS', 2)
+    runs = [make_run(tmp_path, lr) for lr in (0.1, 0.2, 0.3, 0.4, 0.5)]
+    for params in runs:
+        archive.pack_run(params)
+    # um membro aberto continua legível depois que o seu zip sai do cache
+    f = archive.open_file(runs[0].base_folder / 'arguments.yaml')
+    for params in runs:
+        assert Params.from_yaml(params.base_folder / 'arguments.yaml').lr == params.lr
+        assert len(archive._ZIPS) <= 2
+    assert 'lr' in f.read()
+    f.close()
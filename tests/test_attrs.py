@@ -1,9 +1,16 @@
 
 
+import hashlib
+import json
+import numpy as np
+import pickle
 import pytest
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List
 from tempfile import TemporaryDirectory
-from mrlab.params import BaseParams
+from mrlab.params import BaseParams, SlotsParams, canonical_json, hash_many
 
 @dataclass
 class Params(BaseParams):
@@ -65,3 +72,98 @@ def test_dir_images(args, params):
 
 def test_dir_predictions(args, params):
     assert args.dir_predictions() == params.dir_predictions()
+
+@dataclass
+class ParamsWithList(BaseParams):
+    lr:float = None
+    weights:List[float] = field(default_factory=lambda: [0.1, 0.3])
+
+    def template_folder_name(self):
+        return "{experiment}/{hash_id}"
+
+    experiment = 'exp01'
+
+@dataclass(slots=True)
+class SlottedParams(SlotsParams):
+    lr:float = None
+    batch_size:int = None
+    weights:List[float] = field(default_factory=lambda: [0.1, 0.3])
+
+    def template_folder_name(self):
+        return "{hash_id}"
+
+def test_update(params):
+    new = params.update(lr=1e-3, batch_size=16)
+    assert isinstance(new, Params)
+    assert (new.lr, new.batch_size) == (1e-3, 16)
+    assert new.optimizer == params.optimizer
+    assert new._timestamp == params._timestamp
+    assert new.hash_id != params.hash_id
+    assert params.update().hash_id == params.hash_id
+
+def test_update_invalid_name(params):
+    with pytest.raises(TypeError):
+        params.update(learning_rate=1e-3)
+
+def test_update_does_not_share_containers():
+    params = ParamsWithList(lr=0.1)
+    new = params.update(lr=0.2)
+    assert new.weights == params.weights
+    new.weights.append(1.0)
+    assert params.weights == [0.1, 0.3]
+
+    # listas passadas no construtor (campo sem `default_factory`) também são copiadas
+    params = Params(lr=[1, 2], optimizer={'betas' : [0.9, 0.99]})
+    new = params.update(batch_size=8)
+    new.lr.append(3)
+    new.optimizer['betas'].append(0.5)
+    assert params.lr == [1, 2]
+    assert params.optimizer == {'betas' : [0.9, 0.99]}
+
+def test_slots_params():
+    params = SlottedParams(lr=0.1, batch_size=8)
+    assert not hasattr(params, '__dict__')
+    new = params.update(batch_size=16)
+    assert isinstance(new, SlottedParams)
+    assert new.batch_size == 16 and new.weights == [0.1, 0.3]
+    assert new.weights is not params.weights
+    assert pickle.loads(pickle.dumps(new)) == new
+    # a variante com slots é opcional: `BaseParams` continua com `__dict__`
+    assert hasattr(ParamsWithList(), '__dict__')
+
+def test_template_with_class_attribute():
+    params = ParamsWithList(lr=0.1)
+    assert params.base_folder == Path('exp01', params.hash_id)
+
+def test_hash_id_is_backward_compatible(params):
+    legacy = hashlib.md5(json.dumps(params.to_dict(), sort_keys=True).encode()).hexdigest()
+    assert params.hash_id == legacy
+
+def test_hash_id_canonical_types(params):
+    assert params.update(batch_size=np.int64(8), lr=np.float32(0.5)).hash_id == params.update(lr=0.5).hash_id
+    with_list = ParamsWithList(lr=0.1, weights=[0.1, 0.2])
+    assert with_list.update(weights=(0.1, 0.2)).hash_id == with_list.hash_id
+    assert with_list.update(weights=np.array([0.1, 0.2])).hash_id == with_list.hash_id
+    assert params.update(optimizer=datetime(2024, 1, 1)).hash_id == params.update(optimizer='2024-01-01T00:00:00').hash_id
+    assert params.update(optimizer={'b', 'a'}).hash_id == params.update(optimizer=['a', 'b']).hash_id
+
+def test_hash_algorithm(params):
+    digest = params.make_hash_id('blake2b')
+    assert len(digest) == len(params.hash_id) and digest != params.hash_id
+    assert params.make_hash_id('sha256') == hashlib.sha256(canonical_json(params.to_dict()).encode()).hexdigest()
+    with pytest.raises(ValueError):
+        params.make_hash_id('unknown')
+
+def test_hash_many(params):
+    many = [params.update(lr=lr) for lr in (0.1, 0.2, 0.1)]
+    assert hash_many(many) == [p.make_hash_id() for p in many]
+    assert hash_many(many, algorithm='blake2b') == [p.make_hash_id('blake2b') for p in many]
+    assert len(set(hash_many(many))) == 2
+    # o hash do algoritmo da classe fica guardado; outros algoritmos não
+    fresh = [params.update(lr=lr) for lr in (0.3, 0.4)]
+    hash_many(fresh, algorithm='blake2b')
+    assert all(p._hash_id is None for p in fresh)
+    assert hash_many(fresh) == [p._hash_id for p in fresh]
+    # classes diferentes na mesma busca
+    slotted = SlottedParams()
+    assert hash_many([slotted, *fresh]) == [slotted.make_hash_id(), *(p.hash_id for p in fresh)]
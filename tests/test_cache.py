@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from mrlab.cache import memoized_run
+from mrlab.params import BaseParams
+from mrlab.search import GridSearch
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def test_result_is_reused(tmp_path):
+    calls = []
+
+    @memoized_run
+    def train(params):
+        calls.append(params.lr)
+        return {'loss' : params.lr * 2}
+
+    params = Params(lr=0.5, outputdir=str(tmp_path))
+    assert train(params) == {'loss' : 1.0}
+    assert train(params.update()) == {'loss' : 1.0}
+    assert calls == [0.5]
+    assert train.is_cached(params)
+    assert train(params, force=True) == {'loss' : 1.0}
+    assert calls == [0.5, 0.5]
+
+def test_new_grid_points_only(tmp_path):
+    calls = []
+
+    @memoized_run(stage='train', code_version=None)
+    def train(params):
+        calls.append(params.lr)
+        return params.lr
+
+    # cada lançamento do script monta um novo `initial`, com outro `_timestamp`
+    for params in GridSearch({'lr' : [1, 2, 3]}, initial=Params(outputdir=str(tmp_path))):
+        train(params)
+    for params in GridSearch({'lr' : [1, 2, 3, 4, 5]}, initial=Params(outputdir=str(tmp_path))):
+        train(params)
+    assert calls == [1, 2, 3, 4, 5]
+    assert train.is_cached(Params(lr=4, outputdir=str(tmp_path)))
+    assert len([p for p in tmp_path.iterdir() if not p.name.startswith('.')]) == 5
+
+def test_stages_and_code_version(tmp_path):
+    version = ['v1']
+    calls = []
+
+    @memoized_run(stage='preprocess', code_version=lambda: version[0])
+    def preprocess(params):
+        calls.append('preprocess')
+        return [1, 2, 3]
+
+    @memoized_run(stage='train', code_version=None)
+    def train(params):
+        calls.append('train')
+        return sum(preprocess(params))
+
+    params = Params(lr=0.1, outputdir=str(tmp_path))
+    assert train(params) == 6
+    assert train(params) == 6
+    assert calls == ['train', 'preprocess']
+
+    version[0] = 'v2'
+    assert not preprocess.is_cached(params)
+    train.invalidate(params)
+    assert train(params) == 6
+    assert calls == ['train', 'preprocess', 'train', 'preprocess']
+
+def test_default_stage_name(tmp_path):
+    @memoized_run(code_version=None)
+    def preprocess(params):
+        return params.lr
+
+    params = Params(lr=0.1, outputdir=str(tmp_path))
+    assert preprocess.stage == 'test_default_stage_name.locals.preprocess'
+    assert preprocess(params) == 0.1
+    marker, result = preprocess.paths(params)
+    assert marker.name == 'test_default_stage_name.locals.preprocess.json'
+    assert result.is_file()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from dataclasses import dataclass
+from mrlab.params import BaseParams
+from mrlab.checkpoints import CheckpointManager
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+@pytest.fixture
+def params(tmp_path):
+    return Params(lr=0.1, outputdir=str(tmp_path))
+
+def saved_files(params):
+    return sorted(p.name for p in params.dir_checkpoints().glob('checkpoint-*'))
+
+def test_save_and_load(params):
+    with CheckpointManager(params) as manager:
+        for step in range(3):
+            manager.save({'step' : step}, step=step)
+        manager.wait()
+        assert manager.load() == {'step' : 2}
+        assert manager.latest().name == manager.filename(2)
+    assert len(saved_files(params)) == 3
+    assert not list(params.dir_checkpoints().glob('.*.tmp'))
+
+def test_retention(params):
+    losses = [0.9, 0.1, 0.5, 0.2, 0.8, 0.7]
+    with CheckpointManager(params, keep_last=2, keep_best=2, metric='loss') as manager:
+        for step, loss in enumerate(losses):
+            manager.save({'step' : step}, step=step, metrics={'loss' : loss})
+    assert saved_files(params) == [manager.filename(s) for s in (1, 3, 4, 5)]
+    assert manager.best().name == manager.filename(1)
+
+def test_manifest_is_reloaded(params):
+    with CheckpointManager(params, keep_last=1) as manager:
+        manager.save([1, 2, 3], step=10)
+    manager = CheckpointManager(params, keep_last=1)
+    assert manager.latest().name == manager.filename(10)
+    assert manager.load() == [1, 2, 3]
+    manager.close()
+
+def test_errors_are_raised(params):
+    def broken_save(obj, path):
+        raise RuntimeError('disk full')
+    manager = CheckpointManager(params, save_fn=broken_save)
+    manager.save({}, step=0)
+    with pytest.raises(RuntimeError):
+        manager.wait()
+    manager.close()
+    assert manager.latest() is None
+
+def test_metrics_are_converted(params):
+    with CheckpointManager(params, keep_best=1, metric='loss') as manager:
+        manager.save({}, step=0, metrics={'loss' : np.float32(0.5)})
+        with pytest.raises(TypeError):
+            manager.save({}, step=1, metrics={'loss' : 'nan?'})
+    manager = CheckpointManager(params)
+    assert [e['step'] for e in manager.entries] == [0]
+    assert manager.entries[0]['metrics'] == {'loss' : 0.5}
+    assert manager.latest().name == manager.filename(0)
+    manager.close()
+
+def test_keep_best_requires_metric(params):
+    with pytest.raises(ValueError):
+        CheckpointManager(params, keep_best=1)
@@ -0,0 +1,78 @@
+import subprocess
+import threading
+import time
+import pytest
+import yaml
+from mrlab import envinfo
+
+def git(*args, cwd):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+@pytest.fixture
+def repo(tmp_path):
+    git('init', '-q', '-b', 'main', cwd=tmp_path)
+    git('config', 'user.name', 'Tester', cwd=tmp_path)
+    git('config', 'user.email', 'tester@example.com', cwd=tmp_path)
+    git('remote', 'add', 'origin', 'https://example.com/repo.git', cwd=tmp_path)
+    (tmp_path / 'file.txt').write_text('content')
+    git('add', 'file.txt', cwd=tmp_path)
+    git('commit', '-q', '-m', 'first', cwd=tmp_path)
+    (tmp_path / 'sub').mkdir()
+    return tmp_path
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('MRLAB_CACHE_DIR', str(tmp_path / 'cache'))
+    envinfo.get_static_info.cache_clear()
+
+def test_git_info_matches_git(repo):
+    info = envinfo.get_git_repository_info(repo / 'sub')['git']
+    assert info['head'] == git('rev-parse', 'HEAD', cwd=repo)
+    assert info['branch'] == 'main'
+    assert info['url'] == 'https://example.com/repo.git'
+    assert info['username'] == 'Tester'
+    assert info['email'] == 'tester@example.com'
+
+def test_git_packed_refs_and_detached(repo):
+    head = git('rev-parse', 'HEAD', cwd=repo)
+    git('pack-refs', '--all', cwd=repo)
+    assert not (repo / '.git' / 'refs' / 'heads' / 'main').exists()
+    assert envinfo.get_git_head(repo) == head
+
+    git('checkout', '-q', '--detach', cwd=repo)
+    info = envinfo.get_git_repository_info(repo)['git']
+    assert info['branch'] == 'HEAD'
+    assert info['head'] == head
+
+def test_git_info_outside_repo(tmp_path):
+    info = envinfo.get_git_repository_info(tmp_path)['git']
+    assert info['head'] is None and info['branch'] is None
+
+def test_env_report(tmp_path):
+    filepath = envinfo.env_report(dest=tmp_path, with_cuda_info=False)
+    with open(filepath) as f:
+        info = yaml.safe_load(f)
+    assert {'platform', 'python', 'conda', 'git'} <= set(info)
+    assert list((tmp_path / 'cache').glob('envinfo-*.json'))
+
+    envinfo.get_static_info.cache_clear()
+    filepath = envinfo.env_report(dest=tmp_path, filename='again.yaml', with_cuda_info=False)
+    with open(filepath) as f:
+        again = yaml.safe_load(f)
+    assert again['platform'] == info['platform']
+    assert again['python'] == info['python']
+
+def test_env_report_timeout(tmp_path, monkeypatch):
+    def slow_cuda_info(timeout=None):
+        time.sleep(2)
+        return {'cuda' : {}}
+    monkeypatch.setattr(envinfo, 'get_cuda_info', slow_cuda_info)
+
+    start = time.monotonic()
+    filepath = envinfo.env_report(dest=tmp_path, with_git_info=False, timeout=0.2)
+    assert time.monotonic() - start < 1.5
+    with open(filepath) as f:
+        info = yaml.safe_load(f)
+    assert 'error' in info['cuda']
+    # a seção travada não segura a saída do processo
+    assert all(t.daemon for t in threading.enumerate() if t.name.startswith('mrlab-envinfo'))
@@ -0,0 +1,94 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from dataclasses import dataclass
+from mrlab.params import BaseParams
+from mrlab.metrics import MetricsWriter, read_metrics
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+@pytest.fixture
+def params(tmp_path):
+    return Params(lr=0.1, outputdir=str(tmp_path))
+
+def test_write_and_read(params):
+    with MetricsWriter(params, flush_rows=64) as writer:
+        for step in range(1000):
+            writer.log(step=step, loss=1.0 / (step + 1), acc=step / 1000)
+    assert writer.filepath.parent == params.dir_metrics()
+    metrics = read_metrics(params)
+    assert list(metrics) == ['step', 'loss', 'acc']
+    np.testing.assert_array_equal(metrics['step'], np.arange(1000))
+    np.testing.assert_allclose(metrics['loss'], 1.0 / (np.arange(1000) + 1))
+
+def test_missing_values_and_unknown_columns(params):
+    with MetricsWriter(params, columns=['step', 'loss', 'val_loss']) as writer:
+        writer.log(step=0, loss=1.0)
+        writer.log({'step' : 1, 'val_loss' : 0.5})
+        with pytest.raises(KeyError):
+            writer.log(step=2, accuracy=0.9)
+    metrics = read_metrics(params)
+    assert np.isnan(metrics['val_loss'][0]) and np.isnan(metrics['loss'][1])
+
+def test_recovers_truncated_tail(params):
+    with MetricsWriter(params) as writer:
+        for step in range(10):
+            writer.log(step=step, loss=float(step))
+    with open(writer.filepath, 'ab') as f:
+        f.write(b'\x00' * 11)  # registro incompleto de uma queda
+    assert len(read_metrics(params)['step']) == 10
+
+    with MetricsWriter(params) as writer:
+        writer.log(step=10, loss=10.0)
+    metrics = read_metrics(params)
+    np.testing.assert_array_equal(metrics['step'], np.arange(11))
+
+    with pytest.raises(ValueError):
+        MetricsWriter(params, columns=['epoch'])
+
+def test_invalid_values_fail_at_call_site(params):
+    with MetricsWriter(params, flush_rows=2) as writer:
+        writer.log(step=0, loss=np.float32(1.0))
+        with pytest.raises(TypeError):
+            writer.log(step=1, loss=None)
+        with pytest.raises(TypeError):
+            writer.log(step=1, loss='high')
+        writer.log(step=1, loss=0.5)
+    np.testing.assert_array_equal(read_metrics(params)['loss'], [1.0, 0.5])
+
+def test_background_errors_are_reported(params, monkeypatch):
+    writer = MetricsWriter(params, flush_rows=1, flush_interval=0.01)
+    def broken():
+        raise OSError('disk full')
+    monkeypatch.setattr(writer, '_write', broken)
+    writer.log(step=0, loss=1.0)
+    time.sleep(0.1)
+    assert writer._thread.is_alive()
+    monkeypatch.undo()
+    time.sleep(0.05)
+    # a linha não se perde e o erro chega a quem chama
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.close()
+    assert len(read_metrics(params)['step']) == 1
+
+def test_background_flush(params):
+    writer = MetricsWriter(params, flush_rows=10 ** 6, flush_interval=0.01)
+    writer.log(step=0, loss=1.0)
+    time.sleep(0.2)
+    assert len(read_metrics(params)['step']) == 1
+    writer.close()
+
+def test_read_csv(params):
+    df = pd.DataFrame({'step' : [0, 1], 'loss' : [1.0, 0.5], 'split' : ['a', 'b']})
+    df.to_csv(params.dir_metrics() / 'metrics.csv', index=False)
+    metrics = read_metrics(params.dir_metrics() / 'metrics.csv')
+    np.testing.assert_array_equal(metrics['loss'], [1.0, 0.5])
+    assert list(metrics['split']) == ['a', 'b']
@@ -0,0 +1,65 @@
+import time
+import numpy as np
+import pytest
+from dataclasses import dataclass
+from mrlab.params import BaseParams
+from mrlab.monitor import FIELDS, ResourceMonitor, read_resources
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+@pytest.fixture
+def params(tmp_path):
+    return Params(lr=0.1, outputdir=str(tmp_path))
+
+def test_monitor_writes_samples(params):
+    with ResourceMonitor(params, interval=0.01, capacity=16, flush_every=4) as monitor:
+        data = [list(range(10000)) for _ in range(50)]
+        time.sleep(0.1)
+    assert monitor.filepath.parent == params.dir_logs()
+    resources = read_resources(params)
+    assert tuple(resources) == FIELDS
+    n = len(resources['time'])
+    assert n >= 3
+    assert n == monitor._count
+    assert np.all(np.diff(resources['time']) >= 0)
+    assert np.nanmax(resources['rss_mb']) > 0
+    assert len(monitor.samples()) == min(n, 16)
+    del data
+
+def test_ring_buffer_keeps_latest(params):
+    monitor = ResourceMonitor(params, capacity=4, flush_every=4)
+    rows = [monitor.sample() for _ in range(10)]
+    assert monitor.samples() == rows[-4:]
+    monitor.flush()
+    assert len(read_resources(monitor.filepath)['time']) == 10
+
+def test_invalid_flush_every(params):
+    with pytest.raises(ValueError):
+        ResourceMonitor(params, capacity=4, flush_every=8)
+
+def test_background_errors_are_raised_on_flush(params):
+    monitor = ResourceMonitor(params, interval=0.005, capacity=16, flush_every=4)
+    sample = monitor._sample
+    calls = []
+    def failing_sample():
+        calls.append(None)
+        if len(calls) in (2, 3):
+            raise OSError('device gone')
+        return sample()
+    monitor._sample = failing_sample
+    monitor.start()
+    deadline = time.monotonic() + 5
+    while len(calls) < 5 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    # a thread continua amostrando depois do erro
+    assert monitor._thread.is_alive()
+    with pytest.raises(OSError, match='device gone'):
+        monitor.flush()
+    monitor.stop()
+    assert len(read_resources(params)['time']) == monitor._count
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from dataclasses import dataclass
+from mrlab.params import BaseParams
+from mrlab.predictions import PredictionsReader, PredictionsWriter, agreement, ensemble, read_predictions
+
+@dataclass
+class Params(BaseParams):
+    seed:int = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def write(params, array, **kwargs):
+    with PredictionsWriter(params, **kwargs) as writer:
+        for start in range(0, len(array), 7):
+            writer.append(array[start:start + 7])
+
+def test_write_and_read_shards(tmp_path):
+    params = Params(seed=0, outputdir=str(tmp_path))
+    probs = np.random.default_rng(0).random((100, 3)).astype(np.float32)
+    write(params, probs, shard_rows=32)
+
+    reader = read_predictions(params)
+    assert len(reader) == 100
+    assert len(reader.shards) == 4
+    assert isinstance(reader[10:20], np.memmap)
+    np.testing.assert_array_equal(reader[:], probs)
+    np.testing.assert_array_equal(reader[30:40], probs[30:40])
+    np.testing.assert_array_equal(reader[-1], probs[-1])
+    np.testing.assert_array_equal(np.concatenate(list(reader.iter_chunks(25))), probs)
+    # cada shard é um .npy comum
+    np.testing.assert_array_equal(np.load(reader.folder / 'shard-00003.npy'), probs[96:])
+
+def test_flush_makes_rows_visible(tmp_path):
+    params = Params(seed=0, outputdir=str(tmp_path))
+    writer = PredictionsWriter(params, name='labels', dtype=np.int64, shard_rows=10)
+    writer.append(np.arange(15))
+    writer.flush()
+    np.testing.assert_array_equal(PredictionsReader(params, name='labels')[:], np.arange(15))
+    with pytest.raises(ValueError):
+        writer.append(np.zeros((2, 2)))
+    writer.close()
+
+def test_rejects_object_dtypes(tmp_path):
+    params = Params(seed=0, outputdir=str(tmp_path))
+    with pytest.raises(ValueError):
+        PredictionsWriter(params).append(np.array(['a', None], dtype=object))
+    with pytest.raises(ValueError):
+        PredictionsWriter(params, dtype=[('label', 'i8'), ('extra', 'O')])
+
+def test_ensemble_and_agreement(tmp_path):
+    labels = np.array([[0, 1, 2, 2], [0, 1, 1, 2], [1, 1, 2, 0]])
+    runs = [Params(seed=i, outputdir=str(tmp_path)) for i in range(3)]
+    for params, row in zip(runs, labels):
+        write(params, np.eye(3)[row])
+
+    np.testing.assert_array_equal(ensemble(runs, method='vote', chunk_rows=3), [0, 1, 2, 2])
+    mean = ensemble(runs, chunk_rows=3)
+    np.testing.assert_allclose(mean.sum(axis=1), 1.0)
+    np.testing.assert_array_equal(mean.argmax(axis=1), [0, 1, 2, 2])
+
+    matrix = agreement(runs, chunk_rows=3)
+    np.testing.assert_allclose(np.diag(matrix), 1.0)
+    np.testing.assert_allclose(matrix[0, 1], 0.75)
+    np.testing.assert_allclose(matrix[1, 2], 0.25)
+    np.testing.assert_allclose(matrix, matrix.T)
@@ -0,0 +1,75 @@
+import time
+import numpy as np
+from dataclasses import dataclass
+from mrlab.params import BaseParams
+from mrlab.profiling import Profiler, collect_timings, get_profiler, read_timings
+
+@dataclass
+class Params(BaseParams):
+    batch_size:int = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def test_timer_context_and_decorator(tmp_path):
+    params = Params(batch_size=8, outputdir=str(tmp_path))
+
+    @params.timer('forward')
+    def forward():
+        time.sleep(0.002)
+
+    for _ in range(10):
+        with params.timer('dataload'):
+            time.sleep(0.001)
+        forward()
+
+    profiler = get_profiler(params)
+    profiler.flush()
+    phases = read_timings(params)['phases']
+    assert phases['dataload']['count'] == 10
+    assert phases['forward']['count'] == 10
+    assert phases['forward']['total'] >= 0.02
+    assert phases['dataload']['min'] <= phases['dataload']['p50'] * 2
+    assert phases['dataload']['p50'] <= phases['dataload']['p99'] <= phases['dataload']['max'] * 2
+
+def test_sampling_profiler(tmp_path):
+    params = Params(batch_size=16, outputdir=str(tmp_path))
+    profiler = Profiler(params, flush_interval=None).start_sampling(interval=0.001)
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    profiler.close()
+    stacks = (params.dir_logs() / 'profile.folded').read_text().splitlines()
+    assert any('test_sampling_profiler' in line for line in stacks)
+
+def test_collect_timings(tmp_path):
+    runs = [Params(batch_size=b, outputdir=str(tmp_path)) for b in (8, 64)]
+    for params in runs:
+        profiler = Profiler(params, flush_interval=None)
+        for _ in range(params.batch_size):
+            profiler.record('dataload', 1_000_000)
+        profiler.record('step', 5_000_000)
+        profiler.flush()
+        params.to_yaml()
+    table = collect_timings(tmp_path)
+    assert len(table['phase']) == 4
+    dataload = table['phase'] == 'dataload'
+    np.testing.assert_allclose(sorted(table['total'][dataload]), [0.008, 0.064])
+    assert set(table['batch_size'][dataload]) == {8, 64}
+
+def test_close_evicts_profiler(tmp_path):
+    from mrlab import profiling
+    params = Params(batch_size=32, outputdir=str(tmp_path))
+    with params.timer('step'):
+        pass
+    assert params.hash_id in profiling._PROFILERS
+    assert profiling._ATEXIT_REGISTERED
+    assert profiling.close_profiler(params)
+    assert params.hash_id not in profiling._PROFILERS
+    assert read_timings(params)['phases']['step']['count'] == 1
+    assert not profiling.close_profiler(params)
+    # um novo timer cria um perfilador novo
+    assert get_profiler(params) is not get_profiler(Params(batch_size=33, outputdir=str(tmp_path)))
+    profiling._flush_all()
+    assert not profiling._PROFILERS
@@ -0,0 +1,64 @@
+import pytest
+from dataclasses import dataclass
+from scipy import stats
+from mrlab.params import BaseParams
+from mrlab.metrics import MetricsWriter
+from mrlab.scheduler import COMPLETED, PAUSED, ASHAScheduler
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def loss(params, budget):
+    # quanto mais perto de 0.3, melhor; mais orçamento sempre ajuda
+    return abs(params.lr - 0.3) + 1.0 / budget
+
+@pytest.fixture
+def initial(tmp_path):
+    return Params(outputdir=str(tmp_path))
+
+def test_budgets(initial):
+    scheduler = ASHAScheduler({'lr' : stats.uniform(0, 1)}, initial, min_resource=1, max_resource=27)
+    assert scheduler.n_rungs == 4
+    assert [scheduler.budget(r) for r in range(4)] == [1, 3, 9, 27]
+
+def test_successive_halving(initial):
+    scheduler = ASHAScheduler(
+        {'lr' : stats.uniform(0, 1)}, initial, max_resource=9, n_samples=27, seed=0
+    )
+    budgets = []
+    while (job := scheduler.next_trial()) is not None:
+        params, budget = job
+        budgets.append(budget)
+        scheduler.report(params.hash_id, loss(params, budget))
+
+    assert len(scheduler.trials) == 27
+    assert budgets.count(1) == 27
+    # assíncrono: o top 1/3 de cada degrau é promovido assim que aparece
+    assert 9 <= budgets.count(3) < 27
+    assert 3 <= budgets.count(9) < budgets.count(3)
+    completed = [t for t in scheduler.trials.values() if t.state == COMPLETED]
+    assert len(completed) == budgets.count(9)
+    best_params, best_loss = scheduler.best()
+    lrs = sorted((abs(t.params.lr - 0.3), t.params.lr) for t in scheduler.trials.values())
+    assert best_params.lr == lrs[0][1]
+    assert sum(budgets) < 27 * 9
+
+def test_update_from_metrics(initial):
+    scheduler = ASHAScheduler(
+        {'lr' : stats.uniform(0, 1)}, initial, max_resource=3, n_samples=3, seed=1
+    )
+    jobs = [scheduler.next_trial() for _ in range(3)]
+    for params, budget in jobs:
+        assert not scheduler.should_stop(params.hash_id)
+        with MetricsWriter(params) as writer:
+            for step in range(budget + 1):
+                writer.log(step=step, loss=loss(params, step + 1))
+    reported = scheduler.update_from_metrics()
+    assert len(reported) == 3
+    assert all(scheduler.trials[h].state == PAUSED for h in reported)
+    assert all(scheduler.should_stop(h) for h in reported)
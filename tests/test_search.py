@@ -0,0 +1,240 @@
+import math
+import numpy as np
+import pytest
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from itertools import product
+from mrlab.params import BaseParams
+from scipy import stats
+from mrlab.search import Conditional, Constraint, GridSearch, RandomSearch, grid_search_params
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    batch_size:int = None
+    optimizer:str = None
+    logging_steps:str = None
+    weights:list = None
+
+    def template_folder_name(self):
+        return "{hash_id}"
+
+@pytest.fixture
+def search_space():
+    return {
+        "lr": [1e-5, 5e-5, 1e-4],
+        "batch_size": [4, 8],
+        "optimizer": ["AdamW", "SGD"],
+        "logging_steps" : 'steps'
+    }
+
+def expected_combos(search_space):
+    keys = list(search_space)
+    values = [v if isinstance(v, list) else [v] for v in search_space.values()]
+    return [dict(zip(keys, v)) for v in product(*values)]
+
+def test_grid_matches_product(search_space):
+    expected = expected_combos(search_space)
+    grid = GridSearch(search_space)
+    assert len(grid) == len(expected) == 12
+    assert list(grid) == expected
+    assert [grid[i] for i in range(len(grid))] == expected
+    assert grid[-1] == expected[-1]
+    with pytest.raises(IndexError):
+        grid[12]
+
+def test_grid_slicing(search_space):
+    expected = expected_combos(search_space)
+    grid = GridSearch(search_space)
+    view = grid[3:9:2]
+    assert len(view) == 3
+    assert list(view) == expected[3:9:2]
+
+def test_grid_shards_are_disjoint(search_space):
+    expected = expected_combos(search_space)
+    shards = [list(GridSearch(search_space).shard(rank, 5)) for rank in range(5)]
+    merged = [combo for shard in shards for combo in shard]
+    assert len(merged) == len(expected)
+    assert sorted(map(repr, merged)) == sorted(map(repr, expected))
+    with pytest.raises(ValueError):
+        GridSearch(search_space).shard(5, 5)
+
+def test_grid_large_space_is_lazy():
+    grid = GridSearch({f'p{i}' : range(10) for i in range(8)})
+    assert len(grid) == 10 ** 8
+    assert grid[123456789 % len(grid)] == {f'p{i}' : int(d) for i, d in enumerate('23456789')}
+    assert len(grid.shard(3, 7)) == len(range(3, 10 ** 8, 7))
+
+def test_grid_with_initial(search_space):
+    expected = expected_combos(search_space)
+    initial = Params()
+    grid = GridSearch(search_space, initial=initial)
+    params = grid[5]
+    assert isinstance(params, Params)
+    assert params.to_dict() == initial.update(**expected[5]).to_dict()
+
+def test_grid_search_params(search_space):
+    expected = expected_combos(search_space)
+    assert list(grid_search_params(search_space)) == expected
+    initial = {'outputdir' : 'out'}
+    for params, combo in zip(grid_search_params(search_space, initial), expected):
+        assert params == dict(initial, **combo)
+
+def test_random_search_is_seeded():
+    values = {'lr' : stats.loguniform(1e-5, 1e-1), 'optimizer' : ['AdamW', 'SGD'], 'logging_steps' : 'steps'}
+    first = list(RandomSearch(20, values, seed=42))
+    second = list(RandomSearch(20, values, seed=42))
+    assert first == second
+    assert all(isinstance(p['lr'], float) for p in first)
+    assert {p['optimizer'] for p in first} <= {'AdamW', 'SGD'}
+
+def test_random_search_sample_batch():
+    values = {
+        'lr' : stats.uniform(0, 1),
+        'batch_size' : stats.randint(1, 64),
+        'optimizer' : ['AdamW', 'SGD'],
+        'weights' : [[0.1, 0.9], [0.5, 0.5]],
+        'logging_steps' : 'steps',
+    }
+    rs = RandomSearch(1000, values, initial=Params(), seed=0)
+    batch = rs.sample_batch()
+    assert len(batch) == 1000
+    assert batch.columns['lr'].shape == (1000,)
+    assert ((batch.columns['lr'] >= 0) & (batch.columns['lr'] < 1)).all()
+    params = batch[10]
+    assert isinstance(params, Params)
+    assert type(params.lr) is float
+    assert type(params.batch_size) is int
+    assert type(params.optimizer) is str
+    assert params.weights in values['weights']
+    assert params.logging_steps == 'steps'
+    assert len(list(batch)) == 1000
+    again = RandomSearch(1000, values, seed=0).sample_batch()
+    assert again[10] == {k : v for k, v in params.to_dict().items() if k in values}
+
+@pytest.mark.parametrize('method', ['sobol', 'lhs'])
+def test_quasi_random_search(method):
+    values = {'lr' : stats.uniform(0, 1), 'optimizer' : ['AdamW', 'SGD', 'Adam', 'RMSprop'], 'logging_steps' : 'steps'}
+    first = list(RandomSearch(64, values, seed=3, method=method))
+    assert first == list(RandomSearch(64, values, seed=3, method=method))
+    assert all(type(p['lr']) is float for p in first)
+    # cobertura uniforme: cada quarto de [0, 1) e cada opção recebem 1/4 dos pontos
+    quarters = np.bincount([int(p['lr'] * 4) for p in first], minlength=4)
+    assert (quarters == 16).all()
+    assert sorted(Counter(p['optimizer'] for p in first).values()) == [16] * 4
+
+    resumed = RandomSearch(64, values, seed=3, method=method)
+    resumed.reset(start=40)
+    assert list(resumed) == first[40:]
+    batch = RandomSearch(64, values, seed=3, method=method).sample_batch()
+    assert [batch.combo(i) for i in range(64)] == first
+
+    # lotes seguidos continuam a sequência, sem repetir pontos
+    rs = RandomSearch(64, values, seed=3, method=method)
+    halves = [rs.sample_batch(32), rs.sample_batch(32)]
+    assert [b.combo(i) for b in halves for i in range(32)] == first
+    assert len(rs.sample_batch()) == 0
+    backwards = RandomSearch(64, values, seed=3, method=method)[::-2].sample_batch()
+    assert [backwards.combo(i) for i in range(32)] == first[::-2]
+
+def test_sample_batch_unbounded():
+    rs = RandomSearch(math.inf, {'lr' : stats.uniform(0, 1)}, seed=0, method='sobol')
+    with pytest.raises(ValueError):
+        rs.sample_batch()
+    assert len(rs.sample_batch(8)) == 8
+    assert len(rs.shard(1, 4).sample_batch(4)) == 4
+    assert len(rs[:10].sample_batch()) == 10
+
+def test_quasi_random_keeps_callables_independent():
+    values = {'lr' : stats.loguniform(1e-5, 1e-1), 'batch_size' : lambda: 32}
+    rs = RandomSearch(8, values, seed=0, method='sobol')
+    assert [p['batch_size'] for p in rs] == [32] * 8
+    with pytest.raises(ValueError):
+        RandomSearch(8, values, method='halton')
+
+def test_random_search_is_counter_based():
+    values = {'lr' : stats.loguniform(1e-5, 1e-1), 'optimizer' : ['AdamW', 'SGD'], 'batch_size' : [8, 16, 32]}
+    serial = list(RandomSearch(30, values, seed=7))
+    rs = RandomSearch(30, values, seed=7)
+    assert rs[12] == serial[12]
+    assert rs[-1] == serial[-1]
+    assert list(rs[5:10]) == serial[5:10]
+    shards = [list(RandomSearch(30, values, seed=7).shard(rank, 4)) for rank in range(4)]
+    assert sum(len(s) for s in shards) == 30
+    assert all(shard == serial[rank::4] for rank, shard in enumerate(shards))
+
+    sobol = list(RandomSearch(16, values, seed=7, method='sobol'))
+    assert list(RandomSearch(16, values, seed=7, method='sobol').shard(1, 3)) == sobol[1::3]
+
+def test_sample_batch_matches_indexing():
+    values = {
+        'lr' : stats.loguniform(1e-5, 1e-1),
+        'optimizer' : ['AdamW', 'SGD'],
+        'layers' : [[64], [128, 64]],
+        'logging_steps' : 'steps',
+    }
+    rs = RandomSearch(600, values, seed=5)
+    serial = [rs[i] for i in range(600)]
+    batch = RandomSearch(600, values, seed=5).sample_batch()
+    assert [batch.combo(i) for i in range(600)] == serial
+    # os shards são independentes da ordem em que rodam
+    for order in ([0, 1, 2], [2, 1, 0]):
+        rs = RandomSearch(600, values, seed=5)
+        for rank in order:
+            shard = rs.shard(rank, 3)
+            first = shard.sample_batch(70)
+            rest = shard.sample_batch()
+            rows = [first.combo(i) for i in range(70)] + [rest.combo(i) for i in range(len(rest))]
+            assert rows == serial[rank::3]
+
+def brute_force(space, constraints=()):
+    return [c for c in expected_combos(space) if all(f(c) for f in constraints)]
+
+def test_grid_with_constraints():
+    limit = {'small' : 64, 'large' : 16}
+    space = {'model' : ['small', 'large'], 'batch_size' : [8, 16, 32, 64], 'lr' : [0.1, 0.01]}
+    expected = brute_force(dict(space), [lambda c: c['batch_size'] <= limit[c['model']]])
+    grid = GridSearch(space, constraints=[lambda model, batch_size: batch_size <= limit[model]])
+    assert len(grid) == len(expected) == 12
+    assert list(grid) == expected
+    assert grid[-1] == expected[-1]
+    shards = [list(grid.shard(rank, 3)) for rank in range(3)]
+    assert sum(map(len, shards)) == 12
+
+def test_grid_with_conditional():
+    space = {
+        'optimizer' : ['AdamW', 'SGD'],
+        'momentum' : Conditional([0.9, 0.99], when={'optimizer' : 'SGD'}),
+        'lr' : [0.1, 0.01],
+    }
+    grid = GridSearch(space)
+    assert len(grid) == 2 + 4
+    combos = list(grid)
+    assert {'optimizer' : 'AdamW', 'lr' : 0.1} in combos
+    assert {'optimizer' : 'SGD', 'momentum' : 0.99, 'lr' : 0.01} in combos
+    assert all(('momentum' in c) == (c['optimizer'] == 'SGD') for c in combos)
+
+    params = GridSearch(space, initial=Params(batch_size=4))[0]
+    assert params.optimizer == 'AdamW' and params.lr == 0.1
+
+def test_constrained_grid_is_counted_lazily():
+    # 10^12 pontos no produto; só valem os com p0 + p11 par
+    space = {f'p{i}' : range(10) for i in range(12)}
+    grid = GridSearch(space, constraints=[Constraint(lambda p0, p11: (p0 + p11) % 2 == 0)])
+    assert len(grid) == 10 ** 12 // 2
+    combo = grid[123456789]
+    assert (combo['p0'] + combo['p11']) % 2 == 0
+
+def test_invalid_conditions():
+    with pytest.raises(ValueError):
+        GridSearch({'a' : Conditional([1, 2], when={'b' : 1}), 'b' : [1, 2]})
+    with pytest.raises(ValueError):
+        GridSearch({'a' : [1, 2]}, constraints=[lambda c: True])
+
+def test_import_does_not_load_heavy_modules():
+    code = 'import sys, mrlab.search, mrlab.understand; print(",".join(sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    loaded = set(result.stdout.strip().split(','))
+    assert not loaded & {'numpy', 'scipy', 'yaml', 'pandas'}
@@ -0,0 +1,70 @@
+import pytest
+from dataclasses import dataclass
+from mrlab.params import BaseParams
+from mrlab.search import GridSearch
+from mrlab.sweep import DONE, FAILED, SweepExecutor, read_status, run_sweep
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    batch_size:int = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def train(params):
+    if params.batch_size > 16:
+        raise ValueError('batch size too large')
+    (params.dir_metrics() / 'metrics.csv').write_text('step,loss\n0,1.0\n')
+    return params.lr * params.batch_size
+
+@pytest.fixture
+def search_space():
+    return {'lr' : [0.1, 0.01], 'batch_size' : [8, 16, 32]}
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_sweep_runs_all_trials(search_space, tmp_path, executor):
+    initial = Params(outputdir=str(tmp_path))
+    sweep = run_sweep(train, GridSearch(search_space, initial=initial), max_workers=2, executor=executor)
+    assert len(sweep.results) == 4
+    assert len(sweep.failed) == 2
+    for params in GridSearch(search_space, initial=initial):
+        state = read_status(params)['state']
+        assert state == (FAILED if params.batch_size > 16 else DONE)
+
+def test_sweep_resume(search_space, tmp_path):
+    run_sweep(train, GridSearch(search_space, initial=Params(outputdir=str(tmp_path))), executor='thread')
+
+    # um novo lançamento do script monta outro `initial`, com outro `_timestamp`
+    sweep = SweepExecutor(train, executor='thread', retry_failed=False)
+    sweep.run(GridSearch(search_space, initial=Params(outputdir=str(tmp_path))))
+    assert len(sweep.skipped) == 6
+    assert not sweep.results
+
+    sweep = SweepExecutor(train, executor='thread')
+    sweep.run(GridSearch(search_space, initial=Params(outputdir=str(tmp_path))))
+    assert len(sweep.skipped) == 4
+    assert len(sweep.failed) == 2
+    assert len([p for p in tmp_path.iterdir() if not p.name.startswith('.')]) == 6
+
+    sweep = SweepExecutor(train, executor='thread', resume=False)
+    sweep.run(GridSearch(search_space, initial=Params(outputdir=str(tmp_path))))
+    assert not sweep.skipped
+
+def test_sweep_requires_params(search_space):
+    with pytest.raises(TypeError):
+        run_sweep(train, GridSearch(search_space), executor='thread')
+
+def test_sweep_closes_profilers(search_space, tmp_path):
+    from mrlab.profiling import _PROFILERS, read_timings
+
+    def timed_train(params):
+        with params.timer('step'):
+            return train(params)
+
+    initial = Params(outputdir=str(tmp_path))
+    run_sweep(timed_train, GridSearch(search_space, initial=initial), executor='thread')
+    for params in GridSearch(search_space, initial=initial):
+        assert params.hash_id not in _PROFILERS
+        assert read_timings(params)['phases']['step']['count'] == 1
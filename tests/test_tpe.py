@@ -0,0 +1,62 @@
+import math
+import pytest
+from dataclasses import dataclass
+from scipy import stats
+from mrlab.params import BaseParams
+from mrlab.search import RandomSearch
+from mrlab.tpe import TPESearch
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    optimizer:str = None
+    layers:list = None
+    logging_steps:str = None
+
+VALUES = {
+    'lr' : stats.loguniform(1e-6, 1e-1),
+    'optimizer' : ['adamw', 'adam', 'sgd'],
+    'layers' : [[64], [128, 64]],
+    'logging_steps' : 'steps',
+}
+
+def objective(p):
+    return (math.log10(p.lr) + 3) ** 2 + (p.optimizer != 'adamw') + 0.1 * len(p.layers)
+
+def run(search, n_trials, batch=1):
+    best = math.inf
+    for _ in range(n_trials // batch):
+        for params in search.ask(batch) if isinstance(search, TPESearch) else [next(search) for _ in range(batch)]:
+            value = objective(params)
+            if isinstance(search, TPESearch):
+                search.tell(params, value)
+            best = min(best, value)
+    return best
+
+def test_tpe_is_seeded_and_uses_priors():
+    initial = Params()
+    first = list(TPESearch(15, VALUES, initial=initial, seed=1))
+    second = list(TPESearch(15, VALUES, initial=initial, seed=1))
+    assert first == second
+    assert all(p.logging_steps == 'steps' and p.optimizer in VALUES['optimizer'] for p in first)
+    assert all(1e-6 <= p.lr <= 1e-1 and type(p.lr) is float for p in first)
+
+def test_batched_proposals_are_distinct():
+    search = TPESearch(100, VALUES, initial=Params(), seed=0, n_startup=5)
+    for params in search.ask(5):
+        search.tell(params.hash_id, objective(params))
+    pending = search.ask(8)
+    assert len({p.hash_id for p in pending}) == 8
+    for params in pending[::-1]:
+        search.tell(params, objective(params))
+    best, value = search.best()
+    assert value == objective(best) == min(v for _, v in search.trials.values())
+
+def test_tpe_beats_random_search():
+    tpe = sorted(run(TPESearch(60, VALUES, initial=Params(), seed=s), 60, batch=4) for s in range(5))
+    rand = sorted(run(RandomSearch(60, VALUES, initial=Params(), seed=s), 60, batch=4) for s in range(5))
+    assert tpe[2] < rand[2]
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        TPESearch(10, VALUES, mode='median')
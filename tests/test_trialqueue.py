@@ -0,0 +1,90 @@
+import json
+import multiprocessing
+import time
+import pytest
+from dataclasses import dataclass
+from mrlab.params import BaseParams
+from mrlab.search import GridSearch
+from mrlab.trialqueue import LeaseLost, TrialQueue, run_worker
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    batch_size:int = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+@pytest.fixture
+def grid(tmp_path):
+    return GridSearch({'lr' : [0.1, 0.01, 0.001], 'batch_size' : [8, 16, 32, 64]}, initial=Params(outputdir=str(tmp_path)))
+
+def train(params):
+    marker = params.get_default_folder() / 'runs.txt'
+    with open(marker, 'a') as f:
+        f.write('x')
+    return params.lr * params.batch_size
+
+def worker(root, worker_id):
+    return run_worker(TrialQueue(root, worker_id=worker_id), train, Params)
+
+def test_put_is_idempotent(grid, tmp_path):
+    queue = TrialQueue(tmp_path)
+    assert queue.put_many(grid) == 12
+    grid.reset()
+    assert queue.put_many(grid) == 0
+    assert queue.status()['pending'] == 12
+
+def test_claim_complete(grid, tmp_path):
+    queue = TrialQueue(tmp_path)
+    queue.put_many(grid)
+    lease = queue.claim(Params)
+    assert isinstance(lease.params, Params)
+    assert lease.params.hash_id == lease.hash_id
+    assert queue.complete(lease, result=1.0)
+    assert queue.is_done(lease.hash_id)
+    assert queue.status() == {'trials' : 12, 'leases' : 0, 'done' : 1, 'failed' : 0, 'pending' : 11}
+
+def test_expired_lease_is_reclaimed(grid, tmp_path):
+    grid = grid[:1]
+    first = TrialQueue(tmp_path, lease_seconds=0.05, worker_id='a')
+    second = TrialQueue(tmp_path, lease_seconds=0.05, worker_id='b')
+    first.put_many(grid)
+    lease = first.claim(Params)
+    assert second.claim(Params) is None
+    time.sleep(0.1)
+    stolen = second.claim(Params)
+    assert stolen is not None and stolen.hash_id == lease.hash_id
+    with pytest.raises(LeaseLost):
+        first.heartbeat(lease)
+    # a lease do novo dono continua no lugar
+    assert second.heartbeat(stolen) is stolen
+    with pytest.raises(LeaseLost):
+        first.complete(lease)
+    assert not first.is_done(lease.hash_id)
+    assert second.complete(stolen)
+    with pytest.raises(LeaseLost):
+        first.complete(lease)
+
+def test_failures_are_not_retried(grid, tmp_path):
+    queue = TrialQueue(tmp_path)
+    queue.put_many(grid[:2])
+    def broken(params):
+        raise ValueError('diverged')
+    assert run_worker(queue, broken, Params) == 2
+    assert queue.status()['failed'] == 2
+    assert queue.retry_failed() == 2
+    assert run_worker(queue, train, Params) == 2
+
+def test_workers_run_each_trial_once(grid, tmp_path):
+    TrialQueue(tmp_path).put_many(grid)
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        counts = pool.starmap(worker, [(tmp_path, f'w{i}') for i in range(4)])
+    assert sum(counts) == 12
+    grid.reset()
+    for params in grid:
+        assert (params.get_default_folder() / 'runs.txt').read_text() == 'x'
+    done = TrialQueue(tmp_path).folder / 'done'
+    results = [json.loads(p.read_text())['result'] for p in done.glob('*.json')]
+    assert len(results) == 12
@@ -0,0 +1,174 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import shutil
+from dataclasses import dataclass
+from mrlab import understand
+from mrlab.metrics import MetricsWriter
+from mrlab.params import BaseParams
+from mrlab.understand import RunIndex, collect_metrics, get_runs_folders, leaderboard
+
+@dataclass
+class Params(BaseParams):
+    lr:float = None
+    batch_size:int = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+@pytest.fixture
+def runs(tmp_path):
+    runs = [Params(lr=lr, batch_size=8, outputdir=str(tmp_path / 'exp')) for lr in (0.1, 0.01, 0.001)]
+    for params in runs:
+        params.to_yaml()
+        params.dir_metrics()
+    return runs
+
+def test_get_runs_folders(runs, tmp_path):
+    folders = get_runs_folders(tmp_path)
+    assert sorted(folders) == sorted(p.base_folder for p in runs)
+
+def test_index_lookup(runs, tmp_path):
+    with RunIndex(tmp_path) as index:
+        index.refresh()
+        assert len(index) == 3
+        run = index[runs[0].hash_id]
+        assert run.path == runs[0].base_folder
+        assert run.arguments['lr'] == 0.1
+        assert 'metrics' in run.folders
+        assert runs[1].hash_id in index
+
+def test_incremental_refresh(runs, tmp_path):
+    with RunIndex(tmp_path) as index:
+        first = index.refresh()
+        assert first['parsed'] == 3
+        second = index.refresh()
+        assert second['parsed'] == 0
+        assert second['listed'] == 0
+
+        new = Params(lr=0.5, outputdir=str(tmp_path / 'exp'))
+        new.to_yaml()
+        third = index.refresh()
+        assert third['parsed'] == 1
+        assert third['runs'] == 4
+
+        (runs[0].base_folder / 'arguments.yaml').unlink()
+        os.rmdir(runs[0].dir_metrics())
+        os.rmdir(runs[0].base_folder)
+        fourth = index.refresh()
+        assert fourth['removed'] == 1
+        assert runs[0].hash_id not in index
+
+def test_warm_refresh_only_stats_directories(runs, tmp_path, monkeypatch):
+    with RunIndex(tmp_path) as index:
+        index.refresh()
+        calls = []
+        original = os.stat
+        monkeypatch.setattr(os, 'stat', lambda path, *args, **kwargs: calls.append(path) or original(path, *args, **kwargs))
+        stats = index.refresh()
+        monkeypatch.undo()
+        assert stats['listed'] == 0 and stats['runs'] == 3
+        # a base, `exp` e as três execuções: nada dentro delas
+        assert len(calls) == 5
+        assert 'metrics' in index[runs[0].hash_id].folders
+
+def test_same_hash_id_in_two_experiments(runs, tmp_path):
+    copy = tmp_path / 'other' / runs[0].hash_id
+    shutil.copytree(runs[0].base_folder, copy)
+    with RunIndex(tmp_path) as index:
+        index.refresh()
+        assert len(index) == 4
+        assert index[runs[0].base_folder].path == runs[0].base_folder
+        assert index[copy].path == copy
+        assert index[runs[1].hash_id].path == runs[1].base_folder
+        with pytest.raises(KeyError):
+            index[runs[0].hash_id]
+    with pytest.raises(ValueError):
+        understand.load_experiment(tmp_path)
+
+def test_index_persists(runs, tmp_path):
+    with RunIndex(tmp_path) as index:
+        index.refresh()
+    with RunIndex(tmp_path) as index:
+        assert len(index) == 3
+        assert index.refresh()['parsed'] == 0
+
+def write_metrics(params, losses):
+    df = pd.DataFrame({'step' : np.arange(len(losses)), 'loss' : losses})
+    df.to_csv(params.dir_metrics() / 'metrics.csv', index=False)
+
+def test_collect_metrics(runs, tmp_path):
+    for i, params in enumerate(runs):
+        write_metrics(params, [1.0, 0.5 - i / 10, 0.7])
+    table = collect_metrics(tmp_path)
+    assert len(table['loss']) == 9
+    assert set(table['hash_id']) == {p.hash_id for p in runs}
+    assert set(table['lr']) == {0.1, 0.01, 0.001}
+    assert set(table['metrics_file']) == {'metrics'}
+
+    board = leaderboard(table, 'loss')
+    assert list(board['hash_id']) == [p.hash_id for p in reversed(runs)]
+    np.testing.assert_allclose(board['loss'], [0.3, 0.4, 0.5])
+
+def test_collect_metrics_from_search(runs, tmp_path):
+    for params in runs:
+        write_metrics(params, [1.0, 0.5])
+    table = collect_metrics(runs)
+    assert len(table['step']) == 6
+    assert set(table['batch_size']) == {8}
+
+def test_collect_metrics_cache(runs, tmp_path, monkeypatch):
+    for params in runs:
+        write_metrics(params, [1.0, 0.5])
+    first = collect_metrics(tmp_path)
+    assert (tmp_path / '.mrlab' / 'metrics.npz').exists()
+
+    calls = []
+    original = understand._read_run_metrics
+    monkeypatch.setattr(understand, '_read_run_metrics', lambda *a: calls.append(a) or original(*a))
+    second = collect_metrics(tmp_path)
+    assert not calls
+    np.testing.assert_array_equal(np.sort(first['loss']), np.sort(second['loss']))
+
+    with MetricsWriter(runs[0], name='extra') as writer:
+        writer.log(step=0, acc=0.9)
+    third = collect_metrics(tmp_path)
+    assert len(calls) == 1
+    assert len(third['step']) == 7
+    assert np.nanmax(third['acc'].astype(float)) == 0.9
+
+def test_collect_metrics_cache_keeps_missing_text(runs, tmp_path):
+    (runs[0].dir_metrics() / 'metrics.csv').write_text('step,split\n0,train\n1,eval\n')
+    (runs[1].dir_metrics() / 'metrics.csv').write_text('step\n0\n1\n')
+    cold = collect_metrics(tmp_path)
+    warm = collect_metrics(tmp_path)
+    assert cold['split'].dtype == warm['split'].dtype == object
+    order_cold, order_warm = np.argsort(cold['hash_id'], kind='stable'), np.argsort(warm['hash_id'], kind='stable')
+    for a, b in zip(cold['split'][order_cold], warm['split'][order_warm]):
+        assert a == b or (a != a and b != b)
+    assert sum(v != v for v in warm['split']) == 2
+
+def test_load_many(runs, tmp_path, monkeypatch):
+    runs[0].to_json()
+    folders = [p.base_folder for p in runs]
+    configs = understand.load_many(folders, max_workers=2)
+    assert [c['lr'] for c in configs] == [0.1, 0.01, 0.001]
+
+    loaded = understand.load_many([f / 'arguments.yaml' for f in folders], params_cls=Params)
+    assert [p.hash_id for p in loaded] == [p.hash_id for p in runs]
+
+    calls = []
+    original = understand._load_arguments
+    monkeypatch.setattr(understand, '_load_arguments', lambda path: calls.append(path) or original(path))
+    understand.load_many(folders)
+    assert not calls
+    (runs[1].base_folder / 'arguments.yaml').write_text('lr: 0.5\n')
+    assert understand.load_many(folders)[1] == {'lr' : 0.5}
+    assert len(calls) == 1
+
+def test_load_experiment(runs, tmp_path):
+    loaded = understand.load_experiment(tmp_path, params_cls=Params)
+    assert loaded.keys() == {p.hash_id for p in runs}
+    assert all(loaded[p.hash_id].hash_id == p.hash_id for p in runs)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from dataclasses import dataclass
+from mrlab import viz
+from mrlab.metrics import MetricsWriter
+from mrlab.params import BaseParams
+from mrlab.viz import downsample, load_curves, lttb_indices
+
+@dataclass
+class Params(BaseParams):
+    seed:int = None
+    optimizer:str = None
+    outputdir:str = None
+
+    def template_folder_name(self):
+        return "{outputdir}/{hash_id}"
+
+def reference_lttb(x, y, n_out):
+    # implementação direta do algoritmo, ponto a ponto
+    bounds = np.linspace(0, len(x) - 2, n_out - 1).astype(int) + 1
+    selected, a = [0], 0
+    for i in range(n_out - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            mx, my = x[bounds[i + 1]:bounds[i + 2]].mean(), y[bounds[i + 1]:bounds[i + 2]].mean()
+        else:
+            mx, my = x[-1], y[-1]
+        areas = [abs((x[a] - mx) * (y[j] - y[a]) - (x[a] - x[j]) * (my - y[a])) for j in range(start, stop)]
+        a = start + int(np.argmax(areas))
+        selected.append(a)
+    return selected + [len(x) - 1]
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(0)
+    x = np.arange(300, dtype=float)
+    y = np.cumsum(rng.standard_normal(300))
+    np.testing.assert_array_equal(lttb_indices(x, y, 100), reference_lttb(x, y, 100))
+
+def test_downsample_keeps_extremes():
+    x = np.arange(1_000_000, dtype=float)
+    y = np.sin(x / 1e4)
+    y[123_457] = 50.0
+    y[654_321] = -50.0
+    for method in ('lttb', 'minmax'):
+        dx, dy = downsample(x, y, 500, method=method)
+        assert len(dx) <= 500
+        assert dy.max() == 50.0 and dy.min() == -50.0
+        assert (np.diff(dx) > 0).all()
+
+def test_curves_are_cached(tmp_path, monkeypatch):
+    runs = [Params(seed=i, optimizer=opt, outputdir=str(tmp_path)) for i, opt in enumerate(['adam', 'sgd'])]
+    for params in runs:
+        with MetricsWriter(params, columns=['step', 'loss']) as writer:
+            for step in range(5000):
+                writer.log(step=step, loss=1 / (step + 1) + params.seed)
+    curves = load_curves(runs, 'loss', n_points=100)
+    assert [len(x) for _, x, _ in curves] == [100, 100]
+    assert [args['optimizer'] for args, _, _ in curves] == ['adam', 'sgd']
+
+    calls = []
+    original = viz.read_metrics
+    monkeypatch.setattr(viz, 'read_metrics', lambda *a: calls.append(a) or original(*a))
+    again = load_curves(runs, 'loss', n_points=100)
+    assert not calls
+    np.testing.assert_array_equal(again[1][2], curves[1][2])
+    load_curves(runs, 'loss', n_points=50)
+    assert len(calls) == 2
+
+def test_plot_curves(tmp_path):
+    pytest.importorskip('matplotlib')
+    import matplotlib
+    matplotlib.use('Agg')
+    runs = [Params(seed=i, optimizer=opt, outputdir=str(tmp_path)) for i, opt in enumerate(['adam', 'sgd', 'adam'])]
+    for params in runs:
+        params.to_yaml()
+        with MetricsWriter(params, columns=['step', 'loss']) as writer:
+            for step in range(100):
+                writer.log(step=step, loss=params.seed / (step + 1))
+    fig = viz.plot_curves(runs, 'loss', color_by='optimizer')
+    assert len(fig.axes[0].collections[0].get_segments()) == 3
+    fig = viz.plot_curves(tmp_path, 'loss', color_by='seed', group_by='optimizer')
+    assert [axis.get_title() for axis in fig.axes] == ['optimizer = adam', 'optimizer = sgd']
+    assert len(fig.axes[0].collections[0].get_segments()) == 2